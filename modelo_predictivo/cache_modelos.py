@@ -0,0 +1,94 @@
+# Caché persistente de modelos Prophet ajustados
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+from prophet.serialize import model_from_json, model_to_json
+
+
+def huella_datos(df):
+    """Hash SHA-256 de las columnas ds e y de los datos de entrenamiento."""
+    filas = pd.util.hash_pandas_object(df[["ds", "y"]], index=False).values
+    return hashlib.sha256(filas.tobytes()).hexdigest()
+
+
+# Atributos de un Prophet sin ajustar que cambian el modelo resultante
+ATRIBUTOS_CONFIGURACION = (
+    "growth", "changepoints", "n_changepoints", "changepoint_range", "yearly_seasonality",
+    "weekly_seasonality", "daily_seasonality", "holidays", "seasonality_mode", "seasonality_prior_scale",
+    "changepoint_prior_scale", "holidays_prior_scale", "holidays_mode", "mcmc_samples", "interval_width",
+    "uncertainty_samples", "scaling", "seasonalities", "extra_regressors", "country_holidays",
+)
+
+
+def huella_configuracion(modelo):
+    """Hash SHA-256 de la configuración de un Prophet sin ajustar (ver ATRIBUTOS_CONFIGURACION)."""
+    configuracion = {nombre: getattr(modelo, nombre, None) for nombre in ATRIBUTOS_CONFIGURACION}
+    texto = json.dumps(configuracion, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def parametros_iniciales(modelo):
+    """Parámetros de un modelo ajustado, en el formato que acepta Prophet.fit(init=...)."""
+    parametros = {nombre: modelo.params[nombre][0][0] for nombre in ["k", "m", "sigma_obs"]}
+    parametros.update({nombre: modelo.params[nombre][0] for nombre in ["delta", "beta"]})
+    return parametros
+
+
+class CacheModelos:
+    """Guarda un modelo ajustado por solvente junto con la huella de sus datos y de su configuración.
+
+    - Si los datos no cambiaron, se reutiliza el modelo guardado sin volver a ajustar.
+    - Si solo se agregaron filas al final, se ajusta partiendo de los parámetros del
+      modelo anterior (arranque en caliente); el ahorro es modesto, porque la optimización
+      es solo una parte del ajuste.
+    - En cualquier otro caso, o si cambió la configuración del modelo, se ajusta desde cero.
+    """
+
+    def __init__(self, directorio="cache_modelos"):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, solvente):
+        # El nombre del solvente puede tener espacios y acentos: se usa un hash como nombre de archivo
+        return os.path.join(self.directorio, hashlib.sha1(solvente.encode("utf-8")).hexdigest()[:16] + ".json")
+
+    def _leer(self, solvente):
+        try:
+            with open(self._ruta(solvente), encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return None
+
+    def _escribir(self, solvente, modelo, df, configuracion):
+        entrada = {"solvente": solvente, "filas": len(df), "huella": huella_datos(df),
+                   "configuracion": configuracion, "modelo": model_to_json(modelo)}
+        temporal = self._ruta(solvente) + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(entrada, archivo)
+        os.replace(temporal, self._ruta(solvente))  # Reemplazo atómico: nunca queda un archivo a medias
+
+    def ajustar(self, solvente, df, crear_modelo):
+        """Devuelve (modelo, origen) con origen "cache", "incremental" o "completo".
+
+        `crear_modelo` construye un Prophet sin ajustar con la configuración deseada.
+        """
+        modelo = crear_modelo()
+        configuracion = huella_configuracion(modelo)
+        entrada = self._leer(solvente)
+        if entrada and entrada.get("configuracion") != configuracion:
+            entrada = None  # Otro modelo (o una entrada anterior a la huella de configuración)
+        if entrada and entrada["filas"] == len(df) and entrada["huella"] == huella_datos(df):
+            return model_from_json(entrada["modelo"]), "cache"
+
+        if entrada and entrada["filas"] < len(df) and entrada["huella"] == huella_datos(df.iloc[:entrada["filas"]]):
+            previo = model_from_json(entrada["modelo"])
+            modelo.fit(df, init=parametros_iniciales(previo))
+            origen = "incremental"
+        else:
+            modelo.fit(df)
+            origen = "completo"
+        self._escribir(solvente, modelo, df, configuracion)
+        return modelo, origen
@@ -0,0 +1,136 @@
+# Exportación de los resultados del modelo predictivo: Parquet, CSV o Excel
+#
+# Cada tabla (consumo_historico, prediccion_consumo, pedidos_historicos, prediccion_pedidos,
+# pedidos_montecarlo y proveedores) se recibe como una lista de DataFrames, uno por solvente,
+# y se escribe sin modificarlos: las fechas se guardan con su tipo nativo en todos los formatos.
+# proveedores y riesgo_quiebre van en una sola tabla (una hoja en Excel). proveedores lleva la
+# columna Solvente para poder particionarla y filtrarla; en Excel se escribe sin ella, con las
+# mismas columnas que el proveedores.xlsx original.
+
+import os
+import re
+import shutil
+import unicodedata
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional: sin pyarrow se exporta en CSV o Excel
+    pa = pq = None
+
+FORMATOS = ["parquet", "csv", "excel"]
+
+# Tablas que se escriben completas en una sola hoja de Excel, no una hoja por solvente
+TABLAS_UNICAS = ("proveedores", "riesgo_quiebre")
+
+# Abreviaturas de las hojas de Excel de los solventes originales
+ABREVIATURAS = {
+    "Metanol": "met",
+    "Hexano": "hex",
+    "Éter de petróleo liviano": "eterliv",
+    "Éter de petróleo pesado": "eterpes"
+}
+
+
+def formatos_disponibles():
+    return FORMATOS if pq is not None else [f for f in FORMATOS if f != "parquet"]
+
+
+def nombre_seguro(nombre):
+    """Versión del nombre sin acentos ni espacios, apta para archivos y hojas."""
+    sin_acentos = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^0-9a-z]+", "_", sin_acentos.lower()).strip("_")
+
+
+def nombres_hojas(prefijo, solventes):
+    """Nombre de hoja de Excel para cada solvente: como máximo 31 caracteres y sin repetir."""
+    nombres = []
+    for solvente in solventes:
+        nombre = f"{prefijo}_{ABREVIATURAS.get(solvente) or nombre_seguro(solvente)}"[:31]
+        base, n = nombre, 2
+        while nombre in nombres:
+            sufijo = f"_{n}"
+            nombre, n = base[:31 - len(sufijo)] + sufijo, n + 1
+        nombres.append(nombre)
+    return nombres
+
+
+def tabla_proveedores(catalogo, solventes):
+    return pd.DataFrame(
+        [{"Solvente": s, "Proveedor": p, "Lead Time (días)": t} for s in solventes for p, t in catalogo[s]]
+    )
+
+
+def guardar_parquet(tablas, directorio="."):
+    """Un dataset Parquet por tabla, particionado por solvente (Solvente=<nombre>/).
+
+    Cada solvente se escribe por separado, sin concatenar la tabla completa en memoria.
+    Un dataset anterior con el mismo nombre se reemplaza.
+    """
+    if pq is None:
+        raise RuntimeError("Para exportar en Parquet hace falta instalar pyarrow")
+    for nombre, partes in tablas.items():
+        ruta = os.path.join(directorio, nombre)
+        shutil.rmtree(ruta, ignore_errors=True)
+        for parte in partes:
+            if len(parte):
+                pq.write_to_dataset(pa.Table.from_pandas(parte, preserve_index=False), ruta,
+                                    partition_cols=["Solvente"])
+        if not os.path.isdir(ruta):
+            # Tabla sin filas (p. ej. ningún pedido en el horizonte): un archivo vacío con el esquema
+            os.makedirs(ruta)
+            pq.write_table(pa.Table.from_pandas(partes[0], preserve_index=False), os.path.join(ruta, "vacio.parquet"))
+
+
+def guardar_csv(tablas, directorio="."):
+    """Un CSV por tabla, escrito solvente por solvente (fechas en formato ISO)."""
+    for nombre, partes in tablas.items():
+        with open(os.path.join(directorio, f"{nombre}.csv"), "w", encoding="utf-8", newline="") as archivo:
+            for i, parte in enumerate(partes):
+                parte.to_csv(archivo, header=i == 0, index=False, date_format="%Y-%m-%d")
+
+
+def guardar_excel(tablas, solventes, directorio="."):
+    """Un libro por tabla con una hoja por solvente (camino lento, para uso manual).
+
+    Las fechas quedan como fechas de Excel con formato dd/mm/aaaa.
+    """
+    for nombre, partes in tablas.items():
+        ruta = os.path.join(directorio, f"{nombre}.xlsx")
+        with pd.ExcelWriter(ruta, engine="xlsxwriter", datetime_format="dd/mm/yyyy",
+                            date_format="dd/mm/yyyy") as writer:
+            if nombre in TABLAS_UNICAS:
+                tabla = partes[0].drop(columns="Solvente") if nombre == "proveedores" else partes[0]
+                tabla.to_excel(writer, sheet_name=nombre, index=False)
+                continue
+            for parte, hoja in zip(partes, nombres_hojas(nombre, solventes)):
+                parte.to_excel(writer, sheet_name=hoja, index=False)
+
+
+def exportar(solventes, historico, predicciones, pedidos_historicos, pedidos_predicciones, catalogo,
+             formatos=("parquet",), directorio=".", pedidos_montecarlo=None, riesgo_quiebre=None):
+    """Escribe las cuatro tablas de resultados y la de proveedores en los formatos pedidos.
+
+    Con los resultados de la simulación Monte Carlo (ver simulacion_montecarlo) se agregan
+    las tablas pedidos_montecarlo y riesgo_quiebre.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    tablas = {
+        "consumo_historico": historico,
+        "prediccion_consumo": predicciones,
+        "pedidos_historicos": pedidos_historicos,
+        "prediccion_pedidos": pedidos_predicciones,
+        "proveedores": [tabla_proveedores(catalogo, solventes)],
+    }
+    if pedidos_montecarlo:
+        tablas["pedidos_montecarlo"] = pedidos_montecarlo
+    if riesgo_quiebre:
+        tablas["riesgo_quiebre"] = [pd.concat(riesgo_quiebre, ignore_index=True)]
+    if "parquet" in formatos:
+        guardar_parquet(tablas, directorio)
+    if "csv" in formatos:
+        guardar_csv(tablas, directorio)
+    if "excel" in formatos:
+        guardar_excel(tablas, solventes, directorio)
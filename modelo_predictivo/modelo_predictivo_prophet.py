@@ -1,3 +1,9 @@
+import argparse
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
 import pandas as pd
 import numpy as np
 from prophet import Prophet
@@ -5,6 +11,10 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.lines as mlines
 
+from cache_modelos import CacheModelos
+from exportacion import exportar, formatos_disponibles, nombre_seguro
+from simulacion_montecarlo import simular_solvente
+
 # Configuración inicial
 solventes = ["Metanol", "Hexano", "Éter de petróleo liviano", "Éter de petróleo pesado"]
 proveedores = {
@@ -19,45 +29,108 @@ cantidad_pedido = 2
 nivel_reorden = 0.5
 fechas = pd.date_range(start="2020-01-01", end="2024-10-31", freq='D')
 
+# Perfil estacional de cada solvente: (consumo diario base, consumo en temporada alta, meses de temporada alta)
+perfiles_estacionales = {
+    "Metanol": (0.03, 0.04, [3, 4, 9, 10]),
+    "Hexano": (0.028, 0.038, [6, 7, 12, 1]),
+    "Éter de petróleo liviano": (0.025, 0.035, [6, 7, 8]),
+    "Éter de petróleo pesado": (0.027, 0.037, [3, 4, 5, 11, 12])
+}
+
 # Generación de datos sintéticos
 def consumo_estacional(solvente, mes):
-    if solvente == "Metanol":
-        return 0.04 if mes in [3, 4, 9, 10] else 0.03
-    elif solvente == "Hexano":
-        return 0.038 if mes in [6, 7, 12, 1] else 0.028
-    elif solvente == "Éter de petróleo liviano":
-        return 0.035 if mes in [6, 7, 8] else 0.025
-    elif solvente == "Éter de petróleo pesado":
-        return 0.037 if mes in [3, 4, 5, 11, 12] else 0.027
-
-datos_diarios = []
-for fecha in fechas:
-    mes = fecha.month
-    ruido_diario = np.random.normal(loc=1, scale=0.1)
-    for solvente in solventes:
-        consumo_dia_base = consumo_estacional(solvente, mes)
-        consumo_dia_total = consumo_dia_base * ruido_diario * np.random.uniform(0.8, 1.2)
-        proveedor, lead_time = proveedores[solvente][np.random.randint(0, 2)]
-        datos_diarios.append({
-            "Fecha": fecha,
-            "Solvente": solvente,
-            "Consumo Diario (L)": consumo_dia_total,
-            "Proveedor": proveedor,
-            "Lead Time (días)": lead_time
-        })
-
-df_diario = pd.DataFrame(datos_diarios)
-df_diario = df_diario.groupby(["Fecha", "Solvente"], as_index=False).agg({
-    "Consumo Diario (L)": "sum",
-    "Proveedor": "first",
-    "Lead Time (días)": "first"
-})
-
-def calcular_agotamiento_y_pedidos(df, solvente):
-    inventario_actual = almacen_inicial
-    consumo_acumulado = 0
-    dias_termino_contenedor = []
-    pedidos = []
+    base, alto, meses_altos = perfiles_estacionales[solvente]
+    return alto if mes in meses_altos else base
+
+def tabla_mensual(solventes, perfiles):
+    """Matriz (solventes x 12 meses) con el consumo diario base de cada solvente en cada mes."""
+    tabla = np.empty((len(solventes), 12))
+    for i, solvente in enumerate(solventes):
+        base, alto, meses_altos = perfiles[solvente]
+        tabla[i] = base
+        tabla[i, np.asarray(meses_altos) - 1] = alto
+    return tabla
+
+def catalogo_sintetico(cantidad, semilla=None):
+    """Solventes, perfiles estacionales y proveedores inventados, para probar con muchos reactivos."""
+    rng = np.random.default_rng(semilla)
+    nombres = [f"Reactivo {i:04d}" for i in range(1, cantidad + 1)]
+    bases = rng.uniform(0.02, 0.035, cantidad)
+    altos = bases * rng.uniform(1.2, 1.5, cantidad)
+    perfiles, catalogo = {}, {}
+    for i, nombre in enumerate(nombres):
+        meses_altos = np.sort(rng.choice(np.arange(1, 13), size=rng.integers(2, 6), replace=False))
+        perfiles[nombre] = (float(bases[i]), float(altos[i]), meses_altos.tolist())
+        catalogo[nombre] = [(f"Proveedor {i + 1:04d}{letra}", int(dias))
+                            for letra, dias in zip("AB", rng.integers(5, 21, size=2))]
+    return nombres, perfiles, catalogo
+
+def generar_datos_diarios(fechas=fechas, solventes=solventes, perfiles=perfiles_estacionales, catalogo=proveedores,
+                          semilla=None):
+    """Consumo diario sintético: una fila por fecha y solvente, armada con operaciones sobre arreglos.
+
+    El consumo de cada día es el del perfil estacional del mes, por un ruido común a todos
+    los solventes de ese día y por un factor uniforme propio de cada fila. El proveedor de
+    cada fila se sortea entre los del solvente. Con `semilla` los datos son reproducibles.
+    """
+    rng = np.random.default_rng(semilla)
+    n_dias, n_solventes = len(fechas), len(solventes)
+
+    consumo_base = tabla_mensual(solventes, perfiles)[:, fechas.month.to_numpy() - 1].T  # (días x solventes)
+    ruido_diario = rng.normal(loc=1, scale=0.1, size=(n_dias, 1))
+    consumo = consumo_base * ruido_diario * rng.uniform(0.8, 1.2, size=(n_dias, n_solventes))
+
+    # Todos los proveedores en un solo arreglo: el índice de cada fila es el desplazamiento
+    # de su solvente más la opción sorteada
+    opciones = [catalogo[solvente] for solvente in solventes]
+    cantidades = np.array([len(o) for o in opciones])
+    desplazamientos = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+    nombres_proveedor = np.array([nombre for o in opciones for nombre, _ in o], dtype=object)
+    lead_times = np.array([dias for o in opciones for _, dias in o], dtype="int64")
+    elegidos = desplazamientos + rng.integers(0, cantidades, size=(n_dias, n_solventes))
+
+    # Filas ordenadas por fecha y, dentro de cada fecha, por nombre de solvente (como el
+    # groupby de la versión con bucles): basta con reordenar las columnas antes de aplanar
+    nombres = np.array(solventes, dtype=object)
+    orden = np.argsort(nombres, kind="stable")
+    elegidos = elegidos[:, orden].ravel()
+
+    return pd.DataFrame({
+        "Fecha": np.repeat(fechas.to_numpy(), n_solventes),
+        "Solvente": np.tile(nombres[orden], n_dias),
+        "Consumo Diario (L)": consumo[:, orden].ravel(),
+        "Proveedor": nombres_proveedor[elegidos],
+        "Lead Time (días)": lead_times[elegidos]
+    })
+
+def _primer_indice(acumulado, umbral, desde, creciente=True, tolerancia=1e-9):
+    """Primer índice >= desde en el que el consumo acumulado alcanza el umbral (o len si no ocurre).
+
+    El umbral se da por alcanzado a menos de `tolerancia` litros: el acumulado y la suma día
+    por día redondean distinto, y sin margen un consumo que llega justo al umbral (por
+    ejemplo, diez días de 0.1 L contra 1 L) podría contarse un día más tarde.
+    """
+    umbral -= tolerancia
+    if creciente:
+        return max(int(np.searchsorted(acumulado, umbral, side="left")), desde)
+    # Con consumos negativos el acumulado no está ordenado: búsqueda lineal (vectorizada)
+    posiciones = np.flatnonzero(acumulado[desde:] >= umbral)
+    return desde + int(posiciones[0]) if len(posiciones) else len(acumulado)
+
+def calcular_agotamiento_y_pedidos(df, solvente, rng=None, opciones=None):
+    """Fechas de fin de contenedor y pedidos anticipados a partir del consumo diario.
+
+    Equivale a recorrer el consumo día por día, pero trabaja sobre el consumo acumulado:
+    cada evento (fin de contenedor o pedido) se ubica con una búsqueda binaria, así que el
+    costo depende de la cantidad de eventos y no de la cantidad de días. Los proveedores de
+    todos los pedidos se sortean juntos con `rng` (np.random.Generator); pasar un generador
+    con semilla hace el resultado reproducible. `opciones` son los (proveedor, lead time) del
+    solvente; por defecto, los de `proveedores`.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if opciones is None:
+        opciones = proveedores[solvente]
 
     # Ajustar las columnas a los nombres esperados
     if "Cantidad de uso (L)" in df.columns:
@@ -65,65 +138,100 @@ def calcular_agotamiento_y_pedidos(df, solvente):
     elif "yhat" in df.columns:
         df = df.rename(columns={"yhat": "y"})  # Para predicciones
 
-    fecha_agotamiento = None  # Variable para rastrear la última fecha de agotamiento
+    consumo = df["y"].to_numpy(dtype=float)
+    fechas_uso = pd.to_datetime(df["Fecha de uso"]).to_numpy()
+    n = len(consumo)
+    acumulado = np.cumsum(consumo)
+    creciente = not np.any(consumo < 0)  # Una predicción podría tener valores negativos
 
-    for _, row in df.iterrows():
-        consumo_acumulado += row["y"]
-        inventario_actual -= row["y"]
+    # Registrar fin de contenedor: el consumo desde el último cambio alcanza la capacidad
+    indices_agotamiento = []
+    i = _primer_indice(acumulado, capacidad_contenedor, 0, creciente)
+    while i < n:
+        indices_agotamiento.append(i)
+        i = _primer_indice(acumulado, acumulado[i] + capacidad_contenedor, i + 1, creciente)
 
-        # Registrar fin de contenedor
-        if consumo_acumulado >= capacidad_contenedor:
-            fecha_agotamiento = row["Fecha de uso"]
-            dias_termino_contenedor.append({"Fecha de Agotamiento": fecha_agotamiento, "Solvente": solvente})
-            consumo_acumulado = 0
+    # Pedidos: el k-ésimo se hace el primer día en que el inventario (inicial - consumido +
+    # pedidos anteriores) queda en el nivel de reorden o por debajo, a lo sumo uno por día
+    indices_pedido = []
+    i = _primer_indice(acumulado, almacen_inicial - nivel_reorden, 0, creciente)
+    while i < n:
+        indices_pedido.append(i)
+        k = len(indices_pedido)
+        i = _primer_indice(acumulado, almacen_inicial + cantidad_pedido * k - nivel_reorden, i + 1, creciente)
 
-        # Predecir agotamiento y generar pedidos anticipadamente
-        if inventario_actual <= nivel_reorden:
-            dias_restantes = max(0, int(inventario_actual // row["y"]))
-            fecha_predicha_agotamiento = pd.to_datetime(row["Fecha de uso"]) + pd.Timedelta(days=dias_restantes)
-            proveedor, lead_time = proveedores[solvente][np.random.randint(0, 2)]
-            fecha_pedido = fecha_predicha_agotamiento - pd.Timedelta(days=lead_time)
+    df_agotamiento = pd.DataFrame({
+        "Fecha de Agotamiento": fechas_uso[indices_agotamiento],
+        "Solvente": solvente
+    })
 
-            pedidos.append({
-                "Fecha de Agotamiento": fecha_predicha_agotamiento,
-                "Fecha Pedido": fecha_pedido,
-                "Fecha Recepción": fecha_predicha_agotamiento,
-                "Solvente": solvente,
-                "Cantidad Pedido (L)": cantidad_pedido,
-                "Proveedor": proveedor,
-                "Lead Time (días)": lead_time
-            })
+    indices_pedido = np.asarray(indices_pedido, dtype=int)
+    inventario = almacen_inicial - acumulado[indices_pedido] + cantidad_pedido * np.arange(len(indices_pedido))
+    consumo_dia = consumo[indices_pedido]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias_restantes = np.where(consumo_dia != 0, np.floor_divide(inventario, consumo_dia), 0)
+    dias_restantes = np.maximum(dias_restantes, 0).astype("int64")
+    fecha_predicha_agotamiento = fechas_uso[indices_pedido] + dias_restantes.astype("timedelta64[D]")
 
-            inventario_actual += cantidad_pedido
+    elegidos = rng.integers(0, len(opciones), size=len(indices_pedido))
+    nombres_proveedor = np.array([nombre for nombre, _ in opciones], dtype=object)[elegidos]
+    lead_times = np.array([dias for _, dias in opciones], dtype="int64")[elegidos]
 
-    df_agotamiento = pd.DataFrame(dias_termino_contenedor)
-    df_pedidos = pd.DataFrame(pedidos)
+    df_pedidos = pd.DataFrame({
+        "Fecha de Agotamiento": fecha_predicha_agotamiento,
+        "Fecha Pedido": fecha_predicha_agotamiento - lead_times.astype("timedelta64[D]"),
+        "Fecha Recepción": fecha_predicha_agotamiento,
+        "Solvente": solvente,
+        "Cantidad Pedido (L)": cantidad_pedido,
+        "Proveedor": nombres_proveedor,
+        "Lead Time (días)": lead_times
+    })
 
     return df_agotamiento, df_pedidos
 
-def predecir_consumo_y_pedidos(solvente, fecha_inicio="2024-11-01", fecha_fin="2027-12-31"):
+def semillas_solvente(semilla, solvente):
+    """Semilla propia de cada solvente (SeedSequence): reproducible e independiente del proceso que la use."""
+    if semilla is None:
+        return np.random.SeedSequence()
+    return np.random.SeedSequence([semilla, zlib.crc32(solvente.encode("utf-8"))])
+def pronosticar_solvente(solvente, df_diario, fecha_inicio="2024-11-01", fecha_fin="2027-12-31", dir_cache=None,
+                         semilla=None, opciones=None, trayectorias=0):
+    """Ajusta Prophet para un solvente y calcula agotamientos y pedidos, sin graficar.
+
+    Es la unidad de trabajo que se reparte entre procesos: solo depende de sus argumentos.
+    Con `dir_cache`, el modelo ajustado se guarda y se reutiliza entre ejecuciones; con
+    `semilla`, la elección de proveedores de los pedidos y el intervalo de incertidumbre son
+    reproducibles. `opciones` son los proveedores del solvente (necesario para solventes que
+    no están en `proveedores`).
+    Con `trayectorias` > 0 se agrega la simulación Monte Carlo de pedidos y quiebres de stock
+    sobre el intervalo de incertidumbre del pronóstico (ver simulacion_montecarlo).
+    """
     # Preparar los datos históricos
     df_solvente = df_diario[df_diario["Solvente"] == solvente][["Fecha", "Consumo Diario (L)"]].copy()
     df_solvente.rename(columns={"Fecha": "ds", "Consumo Diario (L)": "y"}, inplace=True)
     
-    # Ajustar el modelo Prophet
-    modelo = Prophet(yearly_seasonality=True, daily_seasonality=False)
-    modelo.fit(df_solvente)
+    # Ajustar el modelo Prophet (o reutilizarlo de la caché si los datos no cambiaron)
+    crear_modelo = lambda: Prophet(yearly_seasonality=True, daily_seasonality=False)
+    if dir_cache:
+        modelo, origen = CacheModelos(dir_cache).ajustar(solvente, df_solvente, crear_modelo)
+        print(f"{solvente}: modelo {origen}")
+    else:
+        modelo = crear_modelo()
+        modelo.fit(df_solvente)
     
     # Generar predicciones
     fechas_prediccion = pd.date_range(start=fecha_inicio, end=fecha_fin, freq='D')
     df_prediccion = pd.DataFrame({"ds": fechas_prediccion})
+    # Semillas derivadas (SeedSequence.spawn): ni Prophet ni la simulación alteran los
+    # proveedores sorteados con `rng`
+    semillas = semillas_solvente(semilla, solvente)
+    semilla_intervalo, semilla_montecarlo = semillas.spawn(2)
+    if semilla is not None:
+        # Prophet sortea el intervalo de incertidumbre con el generador global de numpy:
+        # sin fijarlo, yhat_lower/yhat_upper (y la simulación Monte Carlo) cambian en cada ejecución
+        np.random.seed(semilla_intervalo.generate_state(1))
     pronostico = modelo.predict(df_prediccion)
     
-    # Gráfico de predicción
-    fig, ax = plt.subplots(figsize=(10, 6))
-    modelo.plot(pronostico, ax=ax)  # Crear el gráfico original de Prophet
-    
-    # Configurar títulos en español
-    ax.set_title(f"Predicción de Consumo - {solvente}", fontsize=14)
-    ax.set_xlabel("Fecha")
-    ax.set_ylabel("Consumo (L)")
-    
     # Datos históricos y predicciones
     df_historico = df_solvente.rename(columns={"ds": "Fecha de uso", "y": "Cantidad de uso (L)"})
     df_historico["Solvente"] = solvente
@@ -131,18 +239,58 @@ def predecir_consumo_y_pedidos(solvente, fecha_inicio="2024-11-01", fecha_fin="2
     df_prediccion_merged["Solvente"] = solvente
     
     # Calcular fechas de agotamiento y pedidos
-    df_dias_termino_historico, df_pedidos_historico = calcular_agotamiento_y_pedidos(df_historico, solvente)
-    df_dias_termino_prediccion, df_pedidos_prediccion = calcular_agotamiento_y_pedidos(df_prediccion_merged, solvente)
+    rng = np.random.default_rng(semillas)
+    df_dias_termino_historico, df_pedidos_historico = calcular_agotamiento_y_pedidos(df_historico, solvente, rng, opciones)
+    df_dias_termino_prediccion, df_pedidos_prediccion = calcular_agotamiento_y_pedidos(df_prediccion_merged, solvente, rng, opciones)
+
+    resultado_montecarlo = {}
+    if trayectorias:
+        df_pedidos_mc, df_riesgo = simular_solvente(solvente, pronostico, opciones or proveedores[solvente],
+                                                    almacen_inicial, cantidad_pedido, nivel_reorden, trayectorias,
+                                                    np.random.default_rng(semilla_montecarlo),
+                                                    ancho_intervalo=modelo.interval_width)
+        resultado_montecarlo = {"pedidos_montecarlo": df_pedidos_mc, "riesgo_quiebre": df_riesgo}
+
+    return {
+        "historico": df_historico,
+        "prediccion": df_prediccion_merged,
+        "pedidos_historico": df_pedidos_historico,
+        "pedidos_prediccion": df_pedidos_prediccion,
+        "pronostico": pronostico[["ds", "yhat", "yhat_lower", "yhat_upper"]],
+        "dias_termino_historico": df_dias_termino_historico,
+        "dias_termino_prediccion": df_dias_termino_prediccion,
+        **resultado_montecarlo,
+    }
+
+def dibujar_prediccion(solvente, resultado):
+    """Figura de predicción con el mismo estilo que Prophet, a partir del resultado ya calculado.
+
+    Las fechas de agotamiento y de pedido se dibujan cada una como una sola colección de
+    líneas verticales, en lugar de un artista por fecha.
+    """
+    historico = resultado["historico"]
+    pronostico = resultado["pronostico"]
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(historico["Fecha de uso"], historico["Cantidad de uso (L)"], 'k.')  # Datos históricos
+    ax.plot(pronostico["ds"], pronostico["yhat"], ls='-', c='#0072B2')  # Pronóstico
+    ax.fill_between(pronostico["ds"], pronostico["yhat_lower"], pronostico["yhat_upper"], color='#0072B2', alpha=0.2)
+    ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
     
-    # Agregar líneas verticales para las fechas de agotamiento
-    for fecha_agotamiento in pd.concat([df_dias_termino_historico["Fecha de Agotamiento"], 
-                                        df_dias_termino_prediccion["Fecha de Agotamiento"]]).dropna():
-        ax.axvline(pd.to_datetime(fecha_agotamiento), color="#AEAEAE", linestyle=":", linewidth=0.8, label="Fecha de Agotamiento")
+    # Configurar títulos en español
+    ax.set_title(f"Predicción de Consumo - {solvente}", fontsize=14)
+    ax.set_xlabel("Fecha")
+    ax.set_ylabel("Consumo (L)")
     
-    # Agregar líneas verticales para las fechas de pedidos
-    for fecha_pedido in pd.concat([df_pedidos_historico["Fecha Pedido"], 
-                                   df_pedidos_prediccion["Fecha Pedido"]]).dropna():
-        ax.axvline(pd.to_datetime(fecha_pedido), color="#45918A", linestyle="-.", linewidth=0.8, label="Fecha de Pedido")
+    # Líneas verticales de alto completo (coordenadas de ejes en y) para agotamientos y pedidos
+    fechas_agotamiento = pd.concat([resultado["dias_termino_historico"]["Fecha de Agotamiento"],
+                                    resultado["dias_termino_prediccion"]["Fecha de Agotamiento"]]).dropna()
+    ax.vlines(pd.to_datetime(fechas_agotamiento), 0, 1, transform=ax.get_xaxis_transform(),
+              colors="#AEAEAE", linestyles=":", linewidth=0.8)
+    fechas_pedido = pd.concat([resultado["pedidos_historico"]["Fecha Pedido"],
+                               resultado["pedidos_prediccion"]["Fecha Pedido"]]).dropna()
+    ax.vlines(pd.to_datetime(fechas_pedido), 0, 1, transform=ax.get_xaxis_transform(),
+              colors="#45918A", linestyles="-.", linewidth=0.8)
     
     # Leyenda personalizada en español
     observed_legend = mlines.Line2D([], [], marker='o', color='black', linestyle='None', markersize=5, label="Datos Históricos")
@@ -154,58 +302,122 @@ def predecir_consumo_y_pedidos(solvente, fecha_inicio="2024-11-01", fecha_fin="2
     ax.legend(handles=[observed_legend, forecast_legend, uncertainty_legend, agotamiento_legend, pedido_legend], 
               loc="center left", bbox_to_anchor=(1, 0.5))
 
-    plt.tight_layout()  # Ajustar para que la leyenda no recorte el gráfico
+    fig.tight_layout()  # Ajustar para que la leyenda no recorte el gráfico
+    return fig
+
+def graficar_prediccion(solvente, resultado):
+    """Muestra el gráfico en una ventana (bloquea hasta que se cierra)."""
+    dibujar_prediccion(solvente, resultado)
     plt.show()
-    
-    return df_historico, df_prediccion_merged, df_pedidos_historico, df_pedidos_prediccion
-
-def guardar_archivos_excel(historico, predicciones, pedidos_historicos, pedidos_predicciones, proveedores):
-    hojas_historico = ["consumo_historico_met", "consumo_historico_hex", "consumo_historico_eterliv", "consumo_historico_eterpes"]
-    hojas_predicciones = ["prediccion_consumo_met", "prediccion_consumo_hex", "prediccion_consumo_eterliv", "prediccion_consumo_eterpes"]
-    hojas_pedidos_hist = ["pedidos_historicos_met", "pedidos_historicos_hex", "pedidos_historicos_eterliv", "pedidos_historicos_eterpes"]
-    hojas_pedidos_pred = ["prediccion_pedidos_met", "prediccion_pedidos_hex", "prediccion_pedidos_eterliv", "prediccion_pedidos_eterpes"]
-
-    with pd.ExcelWriter("consumo_historico.xlsx", engine="xlsxwriter") as writer:
-        for df, hoja in zip(historico, hojas_historico):
-            df["Fecha de uso"] = pd.to_datetime(df["Fecha de uso"]).dt.strftime('%d/%m/%Y')
-            df.to_excel(writer, sheet_name=hoja, index=False)
-
-    with pd.ExcelWriter("prediccion_consumo.xlsx", engine="xlsxwriter") as writer:
-        for df, hoja in zip(predicciones, hojas_predicciones):
-            df["Fecha de uso"] = pd.to_datetime(df["Fecha de uso"]).dt.strftime('%d/%m/%Y')
-            df.to_excel(writer, sheet_name=hoja, index=False)
-
-    with pd.ExcelWriter("pedidos_historicos.xlsx", engine="xlsxwriter") as writer:
-        for df, hoja in zip(pedidos_historicos, hojas_pedidos_hist):
-            df["Fecha de Agotamiento"] = pd.to_datetime(df["Fecha de Agotamiento"]).dt.strftime('%d/%m/%Y')
-            df["Fecha Pedido"] = pd.to_datetime(df["Fecha Pedido"]).dt.strftime('%d/%m/%Y')
-            df["Fecha Recepción"] = pd.to_datetime(df["Fecha Recepción"]).dt.strftime('%d/%m/%Y')
-            df.to_excel(writer, sheet_name=hoja, index=False)
-
-    with pd.ExcelWriter("prediccion_pedidos.xlsx", engine="xlsxwriter") as writer:
-        for df, hoja in zip(pedidos_predicciones, hojas_pedidos_pred):
-            df["Fecha de Agotamiento"] = pd.to_datetime(df["Fecha de Agotamiento"]).dt.strftime('%d/%m/%Y')
-            df["Fecha Pedido"] = pd.to_datetime(df["Fecha Pedido"]).dt.strftime('%d/%m/%Y')
-            df["Fecha Recepción"] = pd.to_datetime(df["Fecha Recepción"]).dt.strftime('%d/%m/%Y')
-            df.to_excel(writer, sheet_name=hoja, index=False)
-
-    # Guardar el archivo de proveedores
-    df_proveedores = pd.DataFrame(
-        [{"Proveedor": p, "Lead Time (días)": t} for datos in proveedores.values() for p, t in datos]
-    )
-    with pd.ExcelWriter("proveedores.xlsx", engine="xlsxwriter") as writer:
-        df_proveedores.to_excel(writer, sheet_name="proveedores", index=False)
+
+def guardar_grafico(solvente, resultado, directorio):
+    """Dibuja el gráfico sin pantalla y lo guarda como PNG; devuelve la ruta."""
+    ruta = os.path.join(directorio, f"prediccion_{nombre_seguro(solvente)}.png")
+    fig = dibujar_prediccion(solvente, resultado)
+    fig.savefig(ruta, dpi=100)
+    plt.close(fig)
+    return ruta
+
+def _iniciar_graficador():
+    plt.switch_backend("Agg")  # El proceso de gráficos no abre ventanas
+
+def predecir_consumo_y_pedidos(solvente, df_diario, fecha_inicio="2024-11-01", fecha_fin="2027-12-31"):
+    resultado = pronosticar_solvente(solvente, df_diario, fecha_inicio, fecha_fin)
+    graficar_prediccion(solvente, resultado)
+    return resultado["historico"], resultado["prediccion"], resultado["pedidos_historico"], resultado["pedidos_prediccion"]
+
+def predecir_todos(df_diario, solventes, trabajadores=None, graficos="mostrar", dir_cache=None, semilla=None,
+                   catalogo=None, dir_graficos="graficos", trayectorias=0):
+    """Ajusta y pronostica todos los solventes, en paralelo con un pool de procesos.
+
+    Con trabajadores=1 se ejecuta en serie en el proceso actual; con None se usa un
+    proceso por núcleo. `graficos` puede ser "mostrar" (ventanas, en el proceso principal
+    y en el orden de `solventes`), "archivo" (PNG en `dir_graficos`, dibujados por un
+    proceso aparte a medida que llegan los resultados) o None (sin gráficos). Devuelve
+    las listas historico, predicciones, pedidos_hist y pedidos_pred, igual que el bucle
+    secuencial, más pedidos_mc y riesgo con la simulación Monte Carlo de cada solvente
+    (vacías si `trayectorias` es 0; la simulación corre en el mismo proceso que el ajuste).
+    `catalogo` reemplaza a `proveedores` (por ejemplo, el de catalogo_sintetico);
+    se pasa explícitamente porque los procesos hijos no ven los cambios hechos a las
+    variables globales.
+    """
+    catalogo = catalogo or proveedores
+
+    # A cada proceso se le envían solo los datos de su solvente (un solo recorrido de df_diario)
+    datos = dict(tuple(df_diario.groupby("Solvente", sort=False)))
+
+    tareas = [(solvente, datos[solvente], "2024-11-01", "2027-12-31", dir_cache, semilla, catalogo[solvente],
+               trayectorias) for solvente in solventes]
+
+    with ExitStack() as pila:  # Al salir cierra los pools (también si hubo un error)
+        graficador, pendientes = None, []
+        if graficos == "archivo":
+            os.makedirs(dir_graficos, exist_ok=True)
+            graficador = pila.enter_context(ProcessPoolExecutor(max_workers=1, initializer=_iniciar_graficador))
+        if trabajadores == 1:
+            resultados = (pronosticar_solvente(*tarea) for tarea in tareas)
+        else:
+            ejecutor = pila.enter_context(ProcessPoolExecutor(max_workers=trabajadores))
+            resultados = ejecutor.map(pronosticar_solvente, *zip(*tareas))
+
+        historico, predicciones, pedidos_hist, pedidos_pred, pedidos_mc, riesgo = [], [], [], [], [], []
+        for solvente, resultado in zip(solventes, resultados):
+            if graficos == "mostrar":
+                graficar_prediccion(solvente, resultado)
+            elif graficador is not None:
+                pendientes.append(graficador.submit(guardar_grafico, solvente, resultado, dir_graficos))
+            historico.append(resultado["historico"])
+            predicciones.append(resultado["prediccion"])
+            pedidos_hist.append(resultado["pedidos_historico"])
+            pedidos_pred.append(resultado["pedidos_prediccion"])
+            if trayectorias:
+                pedidos_mc.append(resultado["pedidos_montecarlo"])
+                riesgo.append(resultado["riesgo_quiebre"])
+        for futuro in pendientes:
+            futuro.result()  # Propaga los errores del proceso de gráficos
+    return historico, predicciones, pedidos_hist, pedidos_pred, pedidos_mc, riesgo
 
 # Proceso principal
-historico, predicciones, pedidos_hist, pedidos_pred = [], [], [], []
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predicción de consumo y pedidos de solventes con Prophet")
+    parser.add_argument("--trabajadores", type=int, default=os.cpu_count(),
+                        help="Procesos para ajustar los modelos en paralelo (1 = en serie)")
+    parser.add_argument("--cache-modelos", default="cache_modelos",
+                        help="Directorio de la caché de modelos ajustados (vacío = sin caché)")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="Semilla para que los datos sintéticos y la elección de proveedores sean reproducibles")
+    parser.add_argument("--reactivos", type=int, default=0,
+                        help="Cantidad de reactivos sintéticos a generar (0 = los cuatro solventes reales)")
+    parser.add_argument("--anios", type=int, default=None,
+                        help="Años de historia sintética hasta el 31/10/2024 (por defecto desde el 01/01/2020)")
+    parser.add_argument("--graficos", choices=["mostrar", "archivo", "ninguno"], default="mostrar",
+                        help="Mostrar los gráficos en ventanas, guardarlos como PNG o no dibujarlos (modo desatendido)")
+    parser.add_argument("--dir-graficos", default="graficos", help="Directorio de los PNG con --graficos archivo")
+    parser.add_argument("--formatos", nargs="+", choices=formatos_disponibles(),
+                        default=[formatos_disponibles()[0], "excel"],
+                        help="Formatos de salida: parquet (particionado por solvente), csv y/o excel (lento); "
+                             "por defecto parquet (o csv sin pyarrow) y los .xlsx de siempre")
+    parser.add_argument("--dir-salida", default=".", help="Directorio donde se escriben los resultados")
+    parser.add_argument("--trayectorias", type=int, default=0,
+                        help="Trayectorias de la simulación Monte Carlo de pedidos y quiebres "
+                             "(0 = sin simulación; por ejemplo, 2000)")
+    args = parser.parse_args()
+    if args.graficos != "mostrar":
+        plt.switch_backend("Agg")  # Sin pantalla: nunca se abre una ventana que bloquee la ejecución
 
-for solvente in solventes:
-    hist, pred, pedidos_h, pedidos_p = predecir_consumo_y_pedidos(solvente)
-    historico.append(hist)
-    predicciones.append(pred)
-    pedidos_hist.append(pedidos_h)
-    pedidos_pred.append(pedidos_p)
+    if args.reactivos:
+        solventes, perfiles_estacionales, proveedores = catalogo_sintetico(args.reactivos, args.semilla)
+    if args.anios:
+        fin_historia = pd.Timestamp("2024-10-31")
+        fechas = pd.date_range(start=fin_historia - pd.DateOffset(years=args.anios) + pd.Timedelta(days=1),
+                               end=fin_historia, freq='D')
 
-guardar_archivos_excel(historico, predicciones, pedidos_hist, pedidos_pred, proveedores)
-print("Archivos generados exitosamente.")
+    df_diario = generar_datos_diarios(fechas, solventes, perfiles_estacionales, proveedores, args.semilla)
+    historico, predicciones, pedidos_hist, pedidos_pred, pedidos_mc, riesgo = predecir_todos(
+        df_diario, solventes, args.trabajadores, dir_cache=args.cache_modelos or None, semilla=args.semilla,
+        catalogo=proveedores, graficos=None if args.graficos == "ninguno" else args.graficos,
+        dir_graficos=args.dir_graficos, trayectorias=args.trayectorias)
 
+    exportar(solventes, historico, predicciones, pedidos_hist, pedidos_pred, proveedores, args.formatos, args.dir_salida,
+             pedidos_mc, riesgo)
+    print("Archivos generados exitosamente.")
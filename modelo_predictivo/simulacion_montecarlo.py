@@ -0,0 +1,140 @@
+# Simulación Monte Carlo de pedidos y quiebres de stock sobre el pronóstico de Prophet
+#
+# calcular_agotamiento_y_pedidos usa solo el pronóstico puntual (yhat). Aquí se generan
+# miles de trayectorias de consumo a partir del intervalo de incertidumbre del pronóstico
+# (yhat_lower, yhat_upper) y, en cada una, se sortea el proveedor (y con él el lead time) de
+# cada pedido. De cada solvente se obtiene:
+#
+# - por pedido: la probabilidad de que haga falta dentro del horizonte, cuantiles de la fecha
+#   de agotamiento y de la fecha límite para pedir (agotamiento - lead time), y la
+#   probabilidad de quiebre si se pide al llegar al nivel de reorden;
+# - en total: la probabilidad de al menos un quiebre, los días sin stock y los pedidos esperados.
+#
+# Todas las trayectorias de un solvente se calculan juntas como una matriz (trayectorias x días);
+# el reparto entre núcleos lo hace el pool de procesos de predecir_todos.
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+CUANTILES = (0.1, 0.5, 0.9)
+
+
+def desvios_pronostico(pronostico, ancho_intervalo=0.8):
+    """Desvío estándar diario del pronóstico, separado en una parte independiente y una común.
+
+    Prophet calcula el intervalo como cuantiles de una normal con probabilidad
+    `ancho_intervalo`. El desvío más chico del horizonte corresponde al ruido de observación,
+    que es independiente de un día a otro. Lo que el intervalo crece a lo largo del horizonte
+    es la incertidumbre de la tendencia: afecta a todos los días de una trayectoria a la vez.
+    Devuelve (desvío independiente, arreglo con el desvío común de cada día).
+    """
+    z = NormalDist().inv_cdf(0.5 + ancho_intervalo / 2)
+    ancho = pronostico["yhat_upper"].to_numpy(dtype=float) - pronostico["yhat_lower"].to_numpy(dtype=float)
+    desvio = np.maximum(ancho, 0) / (2 * z)
+    independiente = float(desvio.min()) if len(desvio) else 0.0
+    return independiente, np.sqrt(desvio ** 2 - independiente ** 2)
+
+
+def trayectorias_consumo(pronostico, trayectorias, rng, ancho_intervalo=0.8):
+    """Consumo acumulado de cada trayectoria: matriz (trayectorias x días), no decreciente."""
+    independiente, comun = desvios_pronostico(pronostico, ancho_intervalo)
+    yhat = pronostico["yhat"].to_numpy(dtype=np.float32)
+    consumo = rng.standard_normal((trayectorias, len(yhat)), dtype=np.float32)
+    consumo *= np.float32(independiente)
+    consumo += yhat
+    consumo += rng.standard_normal((trayectorias, 1), dtype=np.float32) * comun.astype(np.float32)
+    np.maximum(consumo, 0, out=consumo)  # No hay consumos negativos
+    return np.cumsum(consumo, axis=1, dtype=np.float64)
+
+
+def primeros_dias(acumulado, umbrales):
+    """Primer día en que el consumo acumulado de cada trayectoria alcanza cada umbral.
+
+    Devuelve una matriz (trayectorias x umbrales); el valor es la cantidad de días si el
+    umbral no se alcanza en el horizonte. Como cada fila está ordenada, se desplaza cada una
+    por encima de la anterior y se resuelven todas con una sola búsqueda binaria.
+    """
+    n_trayectorias, n_dias = acumulado.shape
+    desplazamiento = max(float(acumulado[:, -1].max()), float(np.max(umbrales, initial=0))) + 1
+    filas = np.arange(n_trayectorias)[:, None]
+    plano = (acumulado + filas * desplazamiento).ravel()
+    posiciones = np.searchsorted(plano, (np.asarray(umbrales)[None, :] + filas * desplazamiento).ravel())
+    return np.minimum(posiciones.reshape(n_trayectorias, len(umbrales)) - filas * n_dias, n_dias)
+
+
+def _fechas(inicio, dias, n_dias):
+    """Fechas a partir de índices de día; NaT para lo que queda fuera del horizonte."""
+    dias = np.asarray(dias, dtype=float)
+    dentro = np.isfinite(dias) & (dias < n_dias)
+    fechas = inicio + np.where(dentro, dias, 0).astype("int64").astype("timedelta64[D]")
+    return np.where(dentro, fechas, np.datetime64("NaT"))
+
+
+def simular_solvente(solvente, pronostico, opciones, almacen_inicial, cantidad_pedido, nivel_reorden,
+                     trayectorias=2000, rng=None, cuantiles=CUANTILES, ancho_intervalo=0.8):
+    """Simula `trayectorias` escenarios de consumo y pedidos de un solvente.
+
+    `pronostico` tiene las columnas ds, yhat, yhat_lower y yhat_upper de Prophet (un día por
+    fila); `opciones` son los (proveedor, lead time) del solvente. La política es la de
+    calcular_agotamiento_y_pedidos: el pedido k se hace cuando el inventario (inicial -
+    consumido + pedidos anteriores) llega al nivel de reorden, y el stock se agota cuando el
+    consumo alcanza el inventario inicial más los k - 1 pedidos anteriores. Hay quiebre si el
+    pedido llega después de ese día.
+
+    Devuelve (pedidos, riesgo): un DataFrame con una fila por pedido y otro con una sola
+    fila de resumen del solvente.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    acumulado = trayectorias_consumo(pronostico, trayectorias, rng, ancho_intervalo)
+    n_dias = acumulado.shape[1]
+    inicio = pd.to_datetime(pronostico["ds"]).to_numpy()[0].astype("datetime64[D]")
+
+    # Cantidad máxima de pedidos que puede necesitar alguna trayectoria dentro del horizonte
+    exceso = float(acumulado[:, -1].max()) - (almacen_inicial - nivel_reorden)
+    n_pedidos = max(int(np.ceil(exceso / cantidad_pedido)) + 1, 0)
+    anteriores = almacen_inicial + cantidad_pedido * np.arange(n_pedidos)
+    # Día en que se llega al nivel de reorden y día en que se agota el stock sin el pedido k
+    dias_pedido, dias_agotamiento = np.split(
+        primeros_dias(acumulado, np.concatenate((anteriores - nivel_reorden, anteriores))), 2, axis=1)
+
+    # Proveedor de cada pedido de cada trayectoria, sorteado como en calcular_agotamiento_y_pedidos
+    lead_times = np.array([dias for _, dias in opciones], dtype="int64")[
+        rng.integers(0, len(opciones), size=(trayectorias, n_pedidos))]
+
+    pedido = dias_pedido < n_dias
+    agotado = dias_agotamiento < n_dias
+    llegada = dias_pedido + lead_times
+    quiebre = agotado & (llegada > dias_agotamiento)
+    dias_sin_stock = np.where(quiebre, np.minimum(llegada, n_dias) - dias_agotamiento, 0)
+
+    # Cuantiles de la fecha límite para pedir (agotamiento - lead time) y de la de agotamiento.
+    # Las trayectorias que no se agotan en el horizonte cuentan como infinitas (más tarde), y
+    # con "inverted_cdf" cada cuantil es un día simulado, sin interpolar con infinitos.
+    limite = np.quantile(np.where(agotado, dias_agotamiento - lead_times, np.inf), cuantiles, axis=0,
+                         method="inverted_cdf")
+    agotamiento = np.quantile(np.where(agotado, dias_agotamiento, np.inf), cuantiles, axis=0,
+                              method="inverted_cdf")
+    columnas = {
+        "Solvente": solvente,
+        "Pedido": np.arange(1, n_pedidos + 1),
+        "Probabilidad Pedido": agotado.mean(axis=0),
+    }
+    for q, valores in zip(cuantiles, limite):
+        columnas[f"Fecha Pedido p{round(q * 100)}"] = _fechas(inicio, valores, n_dias)
+    for q, valores in zip(cuantiles, agotamiento):
+        columnas[f"Fecha Agotamiento p{round(q * 100)}"] = _fechas(inicio, valores, n_dias)
+    columnas["Probabilidad Quiebre"] = quiebre.mean(axis=0)
+    df_pedidos = pd.DataFrame(columnas)
+    df_pedidos = df_pedidos[df_pedidos["Probabilidad Pedido"] > 0].reset_index(drop=True)
+
+    df_riesgo = pd.DataFrame({
+        "Solvente": [solvente],
+        "Trayectorias": [trayectorias],
+        "Probabilidad Quiebre": [quiebre.any(axis=1).mean()],
+        "Días sin Stock (media)": [dias_sin_stock.sum(axis=1).mean()],
+        "Pedidos (media)": [pedido.sum(axis=1).mean()],
+    })
+    return df_pedidos, df_riesgo
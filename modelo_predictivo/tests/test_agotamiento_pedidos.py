@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("prophet")
+
+import modelo_predictivo_prophet as modelo
+from modelo_predictivo_prophet import calcular_agotamiento_y_pedidos
+
+OPCIONES = [("Proveedor A", 7), ("Proveedor B", 14)]
+
+
+def referencia(consumo, fechas):
+    """El recorrido día por día original (con iterrows), sin el sorteo de proveedores."""
+    df = pd.DataFrame({"Fecha de uso": fechas, "y": consumo})
+    inventario_actual = modelo.almacen_inicial
+    consumo_acumulado = 0
+    agotamientos, pedidos = [], []
+    for _, row in df.iterrows():
+        consumo_acumulado += row["y"]
+        inventario_actual -= row["y"]
+        if consumo_acumulado >= modelo.capacidad_contenedor:
+            agotamientos.append(row["Fecha de uso"])
+            consumo_acumulado = 0
+        if inventario_actual <= modelo.nivel_reorden:
+            dias_restantes = max(0, int(inventario_actual // row["y"]))
+            pedidos.append(pd.to_datetime(row["Fecha de uso"]) + pd.Timedelta(days=dias_restantes))
+            inventario_actual += modelo.cantidad_pedido
+    return agotamientos, pedidos
+
+
+def serie_fija():
+    # Consumos múltiplos de 1/64: las sumas son exactas y no hay empates dudosos por redondeo
+    patron = np.array([3, 5, 0, 8, 2, 13, 1, 4, 6, 9, 0, 7], dtype=float) / 64
+    return np.tile(patron, 30)
+
+
+def comparar(consumo, rng=None):
+    fechas = pd.date_range("2024-11-01", periods=len(consumo), freq="D")
+    agotamientos, pedidos = referencia(consumo, fechas)
+    df_agotamiento, df_pedidos = calcular_agotamiento_y_pedidos(
+        pd.DataFrame({"Fecha de uso": fechas, "yhat": consumo}), "Metanol", rng or np.random.default_rng(0),
+        OPCIONES)
+    assert list(df_agotamiento["Fecha de Agotamiento"]) == agotamientos
+    assert list(df_pedidos["Fecha de Agotamiento"]) == pedidos
+    lead_times = df_pedidos["Lead Time (días)"].to_numpy()
+    assert set(lead_times) <= {7, 14}
+    assert (df_pedidos["Fecha Pedido"] == df_pedidos["Fecha de Agotamiento"]
+            - pd.to_timedelta(lead_times, unit="D")).all()
+    return df_agotamiento, df_pedidos
+
+
+def test_serie_fija():
+    df_agotamiento, df_pedidos = comparar(serie_fija())
+    # 58/64 L cada 12 días: el primer litro se completa el día 13 (el 2.º del segundo ciclo)
+    assert len(df_agotamiento) == 25 and len(df_pedidos) == 12
+    assert df_agotamiento["Fecha de Agotamiento"].iloc[0] == pd.Timestamp("2024-11-14")
+    assert df_pedidos["Fecha de Agotamiento"].iloc[[0, -1]].tolist() == [pd.Timestamp("2025-01-03"),
+                                                                          pd.Timestamp("2025-10-21")]
+
+
+def test_serie_desplazada_con_consumos_negativos():
+    consumo = serie_fija() - 4 / 64
+    assert (consumo < 0).any()
+    df_agotamiento, df_pedidos = comparar(consumo)
+    assert len(df_agotamiento) == 4 and len(df_pedidos) == 1
+    comparar(-np.abs(serie_fija()))  # Solo negativos: no hay eventos
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_series_al_azar(semilla):
+    rng = np.random.default_rng(semilla)
+    comparar(np.round(rng.normal(0.03, 0.05, 1500) * 1024) / 1024)
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_series_al_azar_sin_redondear(semilla):
+    # Floats arbitrarios, como los de la planilla o los de Prophet: el acumulado y la suma del
+    # recorrido redondean distinto, pero los eventos tienen que caer el mismo día
+    rng = np.random.default_rng(semilla)
+    comparar(rng.normal(0.03, 0.05, 1500))
+    comparar(rng.uniform(0.02, 0.05, 1500))
+
+
+def test_datos_diarios_sinteticos():
+    datos = modelo.generar_datos_diarios(fechas=pd.date_range("2020-01-01", "2024-10-31", freq="D"), semilla=2)
+    for _, datos_solvente in datos.groupby("Solvente"):
+        comparar(datos_solvente["Consumo Diario (L)"].to_numpy())
+
+
+def test_umbral_alcanzado_justo_con_decimales():
+    # 10 x 0.1 L da 0.9999999999999999 al sumar floats: igual se completa el litro el día 10
+    df_agotamiento, _ = calcular_agotamiento_y_pedidos(
+        pd.DataFrame({"Fecha de uso": pd.date_range("2024-11-01", periods=25, freq="D"), "yhat": [0.1] * 25}),
+        "Metanol", np.random.default_rng(0), OPCIONES)
+    assert list(df_agotamiento["Fecha de Agotamiento"]) == [pd.Timestamp("2024-11-10"), pd.Timestamp("2024-11-20")]
+
+
+def test_pedido_en_un_dia_de_consumo_negativo():
+    # El 3.er pedido cae en un día de consumo negativo con el inventario bajo cero
+    _, df_pedidos = comparar(np.array([5, 6, -0.25]))
+    assert len(df_pedidos) == 3
+    assert df_pedidos["Fecha de Agotamiento"].iloc[-1] == pd.Timestamp("2024-11-10")
+
+
+def test_sin_datos():
+    df_agotamiento, df_pedidos = comparar(np.array([], dtype=float))
+    assert df_agotamiento.empty and df_pedidos.empty
+
+
+def test_columnas_de_historico_y_proveedores_reproducibles():
+    fechas = pd.date_range("2024-11-01", periods=360, freq="D")
+    df = pd.DataFrame({"Fecha de uso": fechas, "Cantidad de uso (L)": serie_fija()})
+    primero = calcular_agotamiento_y_pedidos(df, "Metanol", np.random.default_rng(3))[1]
+    segundo = calcular_agotamiento_y_pedidos(df, "Metanol", np.random.default_rng(3))[1]
+    pd.testing.assert_frame_equal(primero, segundo)
@@ -0,0 +1,41 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+prophet = pytest.importorskip("prophet")
+
+from cache_modelos import CacheModelos
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+
+def serie(dias):
+    fechas = pd.date_range("2024-01-01", periods=dias, freq="D")
+    return pd.DataFrame({"ds": fechas, "y": 5 + np.sin(np.arange(dias) / 7)})
+
+
+def crear_modelo(**opciones):
+    return lambda: prophet.Prophet(yearly_seasonality=False, daily_seasonality=False, **opciones)
+
+
+def test_origen_segun_datos_y_configuracion(tmp_path):
+    cache = CacheModelos(str(tmp_path))
+    datos = serie(120)
+    assert cache.ajustar("Metanol", datos, crear_modelo())[1] == "completo"
+    assert cache.ajustar("Metanol", datos, crear_modelo())[1] == "cache"
+    assert cache.ajustar("Metanol", serie(130), crear_modelo())[1] == "incremental"
+
+    # Otra configuración no reutiliza el modelo guardado, ni siquiera con los mismos datos
+    modelo, origen = cache.ajustar("Metanol", serie(130), crear_modelo(interval_width=0.95))
+    assert origen == "completo" and modelo.interval_width == 0.95
+    assert cache.ajustar("Metanol", serie(130), crear_modelo(interval_width=0.95))[1] == "cache"
+
+
+def test_datos_modificados_se_ajustan_desde_cero(tmp_path):
+    cache = CacheModelos(str(tmp_path))
+    cache.ajustar("Etanol", serie(120), crear_modelo())
+    modificados = serie(130)
+    modificados.loc[3, "y"] += 1
+    assert cache.ajustar("Etanol", modificados, crear_modelo())[1] == "completo"
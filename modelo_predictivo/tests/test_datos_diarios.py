@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("prophet")
+
+import modelo_predictivo_prophet as modelo
+
+FECHAS = pd.date_range("2023-12-20", "2024-03-10", freq="D")
+
+
+def referencia(fechas):
+    """El generador original, con bucles y el generador global de numpy."""
+    datos_diarios = []
+    for fecha in fechas:
+        ruido_diario = np.random.normal(loc=1, scale=0.1)
+        for solvente in modelo.solventes:
+            consumo = modelo.consumo_estacional(solvente, fecha.month) * ruido_diario * np.random.uniform(0.8, 1.2)
+            proveedor, lead_time = modelo.proveedores[solvente][np.random.randint(0, 2)]
+            datos_diarios.append({"Fecha": fecha, "Solvente": solvente, "Consumo Diario (L)": consumo,
+                                  "Proveedor": proveedor, "Lead Time (días)": lead_time})
+    return pd.DataFrame(datos_diarios).groupby(["Fecha", "Solvente"], as_index=False).agg({
+        "Consumo Diario (L)": "sum", "Proveedor": "first", "Lead Time (días)": "first"})
+
+
+def test_mismas_columnas_tipos_y_orden_que_el_original():
+    np.random.seed(0)
+    original = referencia(FECHAS)
+    nuevo = modelo.generar_datos_diarios(fechas=FECHAS, semilla=0)
+    assert list(nuevo.columns) == list(original.columns)
+    pd.testing.assert_series_equal(nuevo.dtypes, original.dtypes)
+    pd.testing.assert_frame_equal(nuevo[["Fecha", "Solvente"]], original[["Fecha", "Solvente"]])
+    pd.testing.assert_index_equal(nuevo.index, original.index)
+
+
+def test_valores_dentro_del_perfil():
+    datos = modelo.generar_datos_diarios(fechas=FECHAS, semilla=1)
+    base = [modelo.consumo_estacional(s, f.month) for f, s in zip(datos["Fecha"], datos["Solvente"])]
+    proporcion = datos["Consumo Diario (L)"] / base
+    assert proporcion.between(0.8 * 0.5, 1.2 * 1.5).all()
+    # El ruido diario es común a todos los solventes de un mismo día
+    por_dia = proporcion.groupby(datos["Fecha"]).agg(["min", "max"])
+    assert (por_dia["max"] / por_dia["min"] <= 1.2 / 0.8 + 1e-12).all()
+    for solvente, proveedor, lead_time in datos[["Solvente", "Proveedor", "Lead Time (días)"]].itertuples(index=False):
+        assert (proveedor, lead_time) in modelo.proveedores[solvente]
+
+
+def test_reproducible_con_semilla():
+    pd.testing.assert_frame_equal(modelo.generar_datos_diarios(fechas=FECHAS, semilla=5),
+                                  modelo.generar_datos_diarios(fechas=FECHAS, semilla=5))
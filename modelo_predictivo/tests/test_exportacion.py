@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from exportacion import exportar, formatos_disponibles, nombres_hojas
+
+SOLVENTES = ["Metanol", "Éter de petróleo liviano"]
+CATALOGO = {"Metanol": [("Proveedor A", 7), ("Proveedor B", 14)], "Éter de petróleo liviano": [("Proveedor E", 8)]}
+TABLAS = ["consumo_historico", "prediccion_consumo", "pedidos_historicos", "prediccion_pedidos"]
+
+
+def consumo(solvente, inicio):
+    fechas = pd.date_range(inicio, periods=5, freq="D")
+    return pd.DataFrame({"Fecha de uso": fechas, "Cantidad de uso (L)": np.linspace(0.01, 0.05, 5),
+                         "Solvente": solvente})
+
+
+def pedidos(solvente, cantidad):
+    fechas = pd.date_range("2025-01-10", periods=cantidad, freq="7D")
+    return pd.DataFrame({
+        "Fecha de Agotamiento": fechas,
+        "Fecha Pedido": fechas - pd.Timedelta(days=7),
+        "Fecha Recepción": fechas,
+        "Solvente": solvente,
+        "Cantidad Pedido (L)": 2,
+        "Proveedor": "Proveedor A",
+        "Lead Time (días)": np.full(cantidad, 7, dtype="int64")
+    })
+
+
+@pytest.fixture
+def resultados(tmp_path):
+    tablas = {
+        "consumo_historico": [consumo(s, "2024-10-27") for s in SOLVENTES],
+        "prediccion_consumo": [consumo(s, "2024-11-01") for s in SOLVENTES],
+        "pedidos_historicos": [pedidos(s, 2) for s in SOLVENTES],
+        "prediccion_pedidos": [pedidos("Metanol", 3), pedidos(SOLVENTES[1], 0)],  # Un solvente sin pedidos
+    }
+    formatos = formatos_disponibles()
+    exportar(SOLVENTES, *(tablas[t] for t in TABLAS), CATALOGO, formatos, str(tmp_path))
+    return tablas, formatos
+
+
+def esperado(tablas, nombre):
+    return pd.concat(tablas[nombre], ignore_index=True)
+
+
+def test_csv_ida_y_vuelta(resultados, tmp_path):
+    tablas, _ = resultados
+    for nombre in TABLAS:
+        original = esperado(tablas, nombre)
+        fechas = [c for c in original.columns if c.startswith("Fecha")]
+        leido = pd.read_csv(tmp_path / f"{nombre}.csv", parse_dates=fechas)
+        pd.testing.assert_frame_equal(leido, original, check_dtype=False)
+    proveedores = pd.read_csv(tmp_path / "proveedores.csv")
+    assert list(proveedores.columns) == ["Solvente", "Proveedor", "Lead Time (días)"] and len(proveedores) == 3
+
+
+def test_parquet_ida_y_vuelta(resultados, tmp_path):
+    tablas, formatos = resultados
+    if "parquet" not in formatos:
+        pytest.skip("pyarrow no está instalado")
+    for nombre in TABLAS:
+        original = esperado(tablas, nombre)
+        leido = pd.read_parquet(tmp_path / nombre)
+        leido["Solvente"] = leido["Solvente"].astype(str)  # La partición vuelve como categoría, al final
+        leido = leido[original.columns].sort_values(list(original.columns), ignore_index=True)
+        original = original.sort_values(list(original.columns), ignore_index=True)
+        pd.testing.assert_frame_equal(leido, original, check_dtype=False)
+        # Las fechas conservan su tipo nativo, no se guardan como texto
+        assert pd.api.types.is_datetime64_any_dtype(leido[original.columns[0]])
+
+
+def test_excel_ida_y_vuelta(resultados, tmp_path):
+    tablas, _ = resultados
+    for nombre in TABLAS:
+        hojas = pd.read_excel(tmp_path / f"{nombre}.xlsx", sheet_name=None)
+        assert list(hojas) == nombres_hojas(nombre, SOLVENTES) == [f"{nombre}_met", f"{nombre}_eterliv"]
+        for original, leida in zip(tablas[nombre], hojas.values()):
+            if original.empty:
+                assert list(leida.columns) == list(original.columns) and leida.empty
+                continue
+            pd.testing.assert_frame_equal(leida, original, check_dtype=False)
+    # proveedores.xlsx conserva las columnas del archivo original
+    proveedores = pd.read_excel(tmp_path / "proveedores.xlsx", sheet_name=None)
+    assert list(proveedores) == ["proveedores"]
+    assert list(proveedores["proveedores"].columns) == ["Proveedor", "Lead Time (días)"]
+    assert list(proveedores["proveedores"]["Proveedor"]) == ["Proveedor A", "Proveedor B", "Proveedor E"]
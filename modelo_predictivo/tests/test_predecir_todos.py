@@ -0,0 +1,54 @@
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("prophet")
+
+import modelo_predictivo_prophet as modelo
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+SOLVENTES = ["Metanol", "Hexano"]
+
+
+@pytest.fixture(scope="module")
+def df_diario():
+    fechas = pd.date_range("2023-01-01", "2024-10-31", freq="D")
+    return modelo.generar_datos_diarios(fechas=fechas, solventes=SOLVENTES, semilla=3)
+
+
+def test_pool_igual_que_en_serie(df_diario):
+    # Con la misma semilla, repartir los solventes entre procesos no cambia ningún resultado
+    opciones = dict(graficos=None, semilla=7, trayectorias=50)
+    en_serie = modelo.predecir_todos(df_diario, SOLVENTES, trabajadores=1, **opciones)
+    en_pool = modelo.predecir_todos(df_diario, SOLVENTES, trabajadores=2, **opciones)
+    assert [len(lista) for lista in en_pool] == [len(SOLVENTES)] * 6
+    for lista_serie, lista_pool in zip(en_serie, en_pool):
+        for serie, pool in zip(lista_serie, lista_pool):
+            pd.testing.assert_frame_equal(serie, pool)
+    # Los resultados llegan en el orden de `solventes`, no en el que terminan los procesos
+    assert [h["Solvente"].iloc[0] for h in en_pool[0]] == SOLVENTES
+
+
+def test_sin_trayectorias_no_hay_montecarlo(df_diario):
+    resultado = modelo.predecir_todos(df_diario, SOLVENTES[:1], trabajadores=1, graficos=None, semilla=7)
+    assert resultado[4] == [] and resultado[5] == []
+
+
+def test_graficos_en_archivo_sin_pantalla(df_diario, tmp_path):
+    directorio = tmp_path / "graficos"
+    modelo.predecir_todos(df_diario, SOLVENTES, trabajadores=1, graficos="archivo", semilla=7,
+                          dir_graficos=str(directorio))
+    archivos = sorted(p.name for p in directorio.iterdir())
+    assert archivos == sorted(f"prediccion_{modelo.nombre_seguro(s)}.png" for s in SOLVENTES)
+    for archivo in directorio.iterdir():
+        assert archivo.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+
+
+def test_guardar_grafico_cierra_la_figura(df_diario, tmp_path):
+    resultado = modelo.pronosticar_solvente("Metanol", df_diario, semilla=7)
+    ruta = modelo.guardar_grafico("Metanol", resultado, str(tmp_path))
+    assert os.path.dirname(ruta) == str(tmp_path) and os.path.getsize(ruta) > 0
+    assert modelo.plt.get_fignums() == []  # Con muchos solventes no se acumulan figuras abiertas
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulacion_montecarlo import desvios_pronostico, primeros_dias, simular_solvente, trayectorias_consumo
+
+
+def pronostico(yhat, ancho=0.0, dias=100):
+    yhat = np.broadcast_to(np.asarray(yhat, dtype=float), (dias,))
+    ancho = np.broadcast_to(np.asarray(ancho, dtype=float), (dias,))
+    return pd.DataFrame({"ds": pd.date_range("2025-01-01", periods=dias, freq="D"), "yhat": yhat,
+                         "yhat_lower": yhat - ancho / 2, "yhat_upper": yhat + ancho / 2})
+
+
+def referencia_primeros_dias(acumulado, umbrales):
+    resultado = np.full((len(acumulado), len(umbrales)), acumulado.shape[1])
+    for i, fila in enumerate(acumulado):
+        for j, umbral in enumerate(umbrales):
+            for dia, valor in enumerate(fila):
+                if valor >= umbral:
+                    resultado[i, j] = dia
+                    break
+    return resultado
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_primeros_dias_como_recorrido(semilla):
+    rng = np.random.default_rng(semilla)
+    acumulado = np.cumsum(rng.integers(0, 3, size=(20, 15)), axis=1).astype(float)  # Con empates
+    umbrales = np.array([0.0, 1.0, 4.0, 4.5, 10.0, 1e6])
+    np.testing.assert_array_equal(primeros_dias(acumulado, umbrales), referencia_primeros_dias(acumulado, umbrales))
+
+
+def test_desvios_separan_ruido_y_tendencia():
+    independiente, comun = desvios_pronostico(pronostico(1.0, ancho=np.linspace(2, 4, 100)), ancho_intervalo=0.8)
+    z = 1.2815515655446004  # Cuantil 0.9 de la normal estándar
+    assert independiente == pytest.approx(1 / z)
+    assert comun[0] == pytest.approx(0) and comun[-1] == pytest.approx(np.sqrt(3) / z)
+
+
+def test_trayectorias_respetan_el_intervalo():
+    datos = pronostico(0.5, ancho=0.4, dias=50)
+    acumulado = trayectorias_consumo(datos, 4000, np.random.default_rng(1))
+    assert acumulado.shape == (4000, 50) and (np.diff(acumulado, axis=1) >= 0).all()
+    consumo = np.diff(acumulado, axis=1, prepend=0)
+    dentro = (consumo >= 0.3) & (consumo <= 0.7)
+    assert dentro.mean() == pytest.approx(0.8, abs=0.01)
+
+
+@pytest.mark.parametrize("lead_time, quiebre", [(7, 1.0), (3, 0.0)])
+def test_sin_incertidumbre_coincide_con_el_calculo_directo(lead_time, quiebre):
+    # 1/8 L por día: el pedido k se hace el día 35 + 16 (k - 1) y el stock se agota el día 39 + 16 (k - 1)
+    pedidos, riesgo = simular_solvente("Metanol", pronostico(0.125), [("Proveedor A", lead_time)], 5, 2, 0.5,
+                                       trayectorias=50, rng=np.random.default_rng(0))
+    inicio = pd.Timestamp("2025-01-01")
+    assert list(pedidos["Pedido"]) == [1, 2, 3, 4]  # El 5.º agotamiento cae fuera del horizonte
+    assert (pedidos["Probabilidad Pedido"] == 1).all()
+    assert list(pedidos["Fecha Agotamiento p50"]) == [inicio + pd.Timedelta(days=39 + 16 * k) for k in range(4)]
+    assert list(pedidos["Fecha Pedido p10"]) == [inicio + pd.Timedelta(days=39 + 16 * k - lead_time) for k in range(4)]
+    assert (pedidos["Probabilidad Quiebre"] == quiebre).all()
+    assert riesgo.loc[0, "Probabilidad Quiebre"] == quiebre
+    assert riesgo.loc[0, "Días sin Stock (media)"] == 4 * (lead_time - 4) * quiebre
+    assert riesgo.loc[0, "Pedidos (media)"] == 5
+
+
+def test_reproducible_con_semilla():
+    datos = pronostico(np.linspace(0.05, 0.15, 200), ancho=0.1, dias=200)
+    opciones = [("A", 7), ("B", 14)]
+    primero = simular_solvente("Hexano", datos, opciones, 5, 2, 0.5, 300, np.random.default_rng(4))
+    segundo = simular_solvente("Hexano", datos, opciones, 5, 2, 0.5, 300, np.random.default_rng(4))
+    for a, b in zip(primero, segundo):
+        pd.testing.assert_frame_equal(a, b)
+    assert 0 < primero[1].loc[0, "Probabilidad Quiebre"] <= 1
+
+
+def test_sin_consumo_no_hay_pedidos():
+    pedidos, riesgo = simular_solvente("Metanol", pronostico(0.0), [("A", 7)], 5, 2, 0.5, 10,
+                                       np.random.default_rng(0))
+    assert pedidos.empty
+    assert riesgo.loc[0, "Pedidos (media)"] == 0 and riesgo.loc[0, "Probabilidad Quiebre"] == 0
@@ -0,0 +1,273 @@
+# Ingesta directa de Firebase a pandas, sin pasar por el Apps Script ni Google Sheets
+#
+# Lee el árbol /reactivos de la Realtime Database con la API REST (solo biblioteca
+# estándar) y lo normaliza en dos tablas tipadas: reactivos (una fila por UID) y usos (una
+# fila por registro de uso). Las columnas de datos llevan los nombres de la planilla, con
+# tres diferencias: ambas tablas agregan la columna UID (la clave en Firebase, que las
+# relaciona), usos agrega Registro (la clave de cada uso) y la Fecha de Uso y la Hora de
+# Uso de la planilla se unen en una sola columna Fecha de Uso con fecha y hora.
+#
+# - Carga inicial paginada: consultas ordenadas por clave con limitToFirst, de modo que
+#   ninguna respuesta crece con el tamaño de la base.
+# - Actualización continua: escucha el stream de eventos (SSE) de /reactivos y aplica cada
+#   put/patch al árbol en memoria; solo se vuelven a normalizar los UID afectados.
+#
+# Uso en Power BI (carga única):   reactivos, usos = IngestaFirebase(URL).cargar()
+# Proceso continuo que deja instantáneas para Power BI:
+#   python ingesta_firebase.py https://<proyecto>.firebaseio.com --escuchar --directorio instantaneas
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+# Claves de Firebase -> columnas de la planilla
+COLUMNAS_REACTIVO = {
+    "01_producto": "Producto", "02_numero": "Número", "03_alta": "Alta", "04_marca": "Marca",
+    "05_codigo": "Código", "06_presentacion": "Presentación", "07_lote": "Lote",
+    "08_vencimiento": "Vencimiento", "09_baja": "Baja",
+}
+COLUMNAS_USO = {"temperatura": "Temperatura (°C)", "humedad": "Humedad (%)", "peso": "Peso (g)"}
+REGISTROS_USO = "Registros de Uso"
+
+
+def orden_clave(clave):
+    """Orden de Firebase para $key: primero las claves enteras de 32 bits (numéricamente), luego el resto."""
+    try:
+        numero = int(clave)
+        if -2 ** 31 <= numero < 2 ** 31 and str(numero) == clave:
+            return (0, numero, "")
+    except ValueError:
+        pass
+    return (1, 0, clave)
+
+
+def _partes(ruta):
+    """Segmentos de una ruta de Firebase, sin los vacíos de las barras iniciales, finales o dobles."""
+    return [parte for parte in ruta.split("/") if parte]
+
+
+def normalizar_reactivo(uid, nodo):
+    """Fila de la tabla reactivos y filas de la tabla usos de un nodo /reactivos/<uid>."""
+    nodo = nodo if isinstance(nodo, dict) else {}
+    reactivo = {"UID": uid}
+    reactivo.update({columna: nodo.get(clave) for clave, columna in COLUMNAS_REACTIVO.items()})
+
+    usos = []
+    for clave, registro in (nodo.get(REGISTROS_USO) or {}).items():
+        if not isinstance(registro, dict):
+            continue
+        uso = {"UID": uid, "Registro": clave,
+               "Fecha de Uso": f"{registro.get('fecha_uso', '')} {registro.get('hora_uso', '')}".strip()}
+        uso.update({columna: registro.get(campo) for campo, columna in COLUMNAS_USO.items()})
+        usos.append(uso)
+    return reactivo, usos
+
+
+def tipar_reactivos(filas):
+    df = pd.DataFrame(filas, columns=["UID"] + list(COLUMNAS_REACTIVO.values()))
+    df["Número"] = pd.to_numeric(df["Número"], errors="coerce").astype("Int64")
+    for columna in ["Alta", "Baja"]:
+        df[columna] = pd.to_datetime(df[columna], format="%d/%m/%Y", errors="coerce")
+    for columna in ["UID", "Producto", "Marca", "Código", "Presentación", "Lote", "Vencimiento"]:
+        df[columna] = df[columna].astype("string")
+    return df.sort_values("Número", kind="stable", ignore_index=True)  # Mismo orden que la planilla
+
+
+def tipar_usos(filas):
+    df = pd.DataFrame(filas, columns=["UID", "Registro", "Fecha de Uso"] + list(COLUMNAS_USO.values()))
+    # El ESP32 escribe la fecha y la hora sin ceros a la izquierda (p. ej. 5/3/2025 9:07:02)
+    df["Fecha de Uso"] = pd.to_datetime(df["Fecha de Uso"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    for columna in COLUMNAS_USO.values():
+        df[columna] = pd.to_numeric(df[columna], errors="coerce").astype("float64")
+    df["UID"] = df["UID"].astype("string")
+    df["Registro"] = df["Registro"].astype("string")
+    return df.sort_values(["UID", "Fecha de Uso"], kind="stable", ignore_index=True)
+
+
+class IngestaFirebase:
+    """Copia local de /reactivos, normalizada por UID y actualizable con el stream de eventos."""
+
+    def __init__(self, url_base, auth=None, ruta="reactivos", tamano_pagina=500):
+        self.url = f"{url_base.rstrip('/')}/{ruta}.json"
+        self.auth = auth
+        self.tamano_pagina = tamano_pagina
+        self.arbol = {}
+        self._reactivos = {}  # UID -> fila de reactivos
+        self._usos = {}       # UID -> filas de usos
+        self._bloqueo = threading.Lock()
+        self._detener = threading.Event()
+        self.version = 0      # Aumenta con cada cambio aplicado
+        self.ultimo_error = None
+
+    def _url(self, **parametros):
+        if self.auth:
+            parametros["auth"] = self.auth
+        return self.url + ("?" + urllib.parse.urlencode(parametros) if parametros else "")
+
+    def _obtener(self, **parametros):
+        with urllib.request.urlopen(self._url(**parametros), timeout=30) as respuesta:
+            return json.load(respuesta)
+
+    def _renormalizar(self, uids):
+        for uid in uids:
+            if uid in self.arbol:
+                self._reactivos[uid], self._usos[uid] = normalizar_reactivo(uid, self.arbol[uid])
+            else:
+                self._reactivos.pop(uid, None)
+                self._usos.pop(uid, None)
+        self.version += 1
+
+    def cargar(self):
+        """Carga completa paginada por clave; devuelve (reactivos, usos)."""
+        arbol, desde = {}, None
+        while True:
+            parametros = {"orderBy": '"$key"', "limitToFirst": self.tamano_pagina + (desde is not None)}
+            if desde is not None:
+                parametros["startAt"] = json.dumps(desde)
+            pagina = self._obtener(**parametros) or {}
+            pagina.pop(desde, None)  # startAt es inclusivo: la primera clave ya se leyó
+            arbol.update(pagina)
+            if len(pagina) < self.tamano_pagina:
+                break
+            desde = max(pagina, key=orden_clave)
+        with self._bloqueo:
+            self.arbol = arbol
+            self._reactivos.clear()
+            self._usos.clear()
+            self._renormalizar(list(arbol))
+        return self.tablas()
+
+    def claves(self):
+        """Solo los UID presentes (consulta superficial, sin descargar los nodos)."""
+        return sorted(self._obtener(shallow="true") or {})
+
+    def aplicar_evento(self, tipo, ruta, datos):
+        """Aplica un evento put/patch del stream a la copia local."""
+        partes = _partes(ruta)
+        with self._bloqueo:
+            if not partes:
+                if tipo == "put":
+                    afectados = set(self.arbol) | set(datos or {})
+                    self.arbol = datos or {}
+                else:
+                    # Las claves de un patch pueden ser rutas ("<uid>/09_baja")
+                    hijos = [(_partes(hijo), valor) for hijo, valor in datos.items()]
+                    hijos = [(partes_hijo, valor) for partes_hijo, valor in hijos if partes_hijo]
+                    afectados = {partes_hijo[0] for partes_hijo, _ in hijos}
+                    for partes_hijo, valor in hijos:
+                        self._asignar(partes_hijo, valor)
+            else:
+                afectados = {partes[0]}
+                if tipo == "put":
+                    self._asignar(partes, datos)
+                else:
+                    for hijo, valor in datos.items():
+                        self._asignar(partes + _partes(hijo), valor)
+            self._renormalizar(afectados)
+
+    def _asignar(self, partes, valor):
+        nodo = self.arbol
+        for parte in partes[:-1]:
+            if not isinstance(nodo.get(parte), dict):
+                nodo[parte] = {}
+            nodo = nodo[parte]
+        if valor is None:  # En Firebase, escribir null borra el nodo
+            nodo.pop(partes[-1], None)
+        else:
+            nodo[partes[-1]] = valor
+        # Borrar el último hijo de un nodo borra también el nodo
+        if not nodo and len(partes) > 1:
+            self._asignar(partes[:-1], None)
+
+    def tablas(self):
+        """Devuelve (reactivos, usos) como DataFrames tipados."""
+        with self._bloqueo:
+            reactivos = list(self._reactivos.values())
+            usos = [uso for filas in self._usos.values() for uso in filas]
+        return tipar_reactivos(reactivos), tipar_usos(usos)
+
+    def escuchar(self, reintento=5):
+        """Sigue el stream de eventos hasta detener(); reconecta si se corta.
+
+        Al conectarse, Firebase envía primero un put en "/" con el árbol completo, así que
+        cada reconexión deja la copia local al día sin una carga aparte.
+        """
+        while not self._detener.is_set():
+            solicitud = urllib.request.Request(self._url(), headers={"Accept": "text/event-stream"})
+            try:
+                with urllib.request.urlopen(solicitud, timeout=60) as respuesta:
+                    self.ultimo_error = None
+                    self._leer_stream(respuesta)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                self.ultimo_error = str(e)
+            self._detener.wait(reintento)
+
+    def _leer_stream(self, respuesta):
+        evento, datos = None, []
+        for linea in respuesta:
+            if self._detener.is_set():
+                return
+            linea = linea.decode("utf-8").rstrip("\r\n")
+            if linea.startswith("event:"):
+                evento = linea[6:].strip()
+            elif linea.startswith("data:"):
+                datos.append(linea[5:].strip())
+            elif not linea and evento:
+                if evento in ("put", "patch"):
+                    contenido = json.loads("\n".join(datos))
+                    self.aplicar_evento(evento, contenido["path"], contenido["data"])
+                elif evento in ("cancel", "auth_revoked"):
+                    raise ValueError(f"Stream cerrado por Firebase: {evento}")
+                evento, datos = None, []
+
+    def iniciar(self):
+        threading.Thread(target=self.escuchar, daemon=True, name="ingesta-firebase").start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+
+
+def guardar_instantanea(reactivos, usos, directorio):
+    """Guarda las tablas en pickle con reemplazo atómico, para que Power BI las lea."""
+    os.makedirs(directorio, exist_ok=True)
+    for nombre, df in [("reactivos", reactivos), ("usos", usos)]:
+        ruta = os.path.join(directorio, f"{nombre}.pkl")
+        df.to_pickle(ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta de /reactivos de Firebase en tablas de pandas")
+    parser.add_argument("url", help="URL de la base, p. ej. https://<proyecto>.firebaseio.com")
+    parser.add_argument("--auth", default=None, help="Token o secreto de la base (si las reglas lo exigen)")
+    parser.add_argument("--escuchar", action="store_true",
+                        help="Seguir el stream de eventos y actualizar las instantáneas con cada cambio")
+    parser.add_argument("--directorio", default="instantaneas", help="Directorio de las instantáneas")
+    parser.add_argument("--intervalo", type=float, default=2, help="Segundos entre instantáneas al escuchar")
+    args = parser.parse_args()
+
+    ingesta = IngestaFirebase(args.url, args.auth)
+    reactivos, usos = ingesta.cargar()
+    guardar_instantanea(reactivos, usos, args.directorio)
+    print(f"{len(reactivos)} reactivos, {len(usos)} registros de uso")
+
+    if args.escuchar:
+        ingesta.iniciar()
+        guardada = ingesta.version
+        try:
+            while True:
+                time.sleep(args.intervalo)
+                if ingesta.version != guardada:
+                    guardada = ingesta.version
+                    reactivos, usos = ingesta.tablas()
+                    guardar_instantanea(reactivos, usos, args.directorio)
+        except KeyboardInterrupt:
+            ingesta.detener()
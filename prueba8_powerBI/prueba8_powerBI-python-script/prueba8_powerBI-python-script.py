@@ -1,33 +1,121 @@
 # Etapa 8: Python Script para Power BI
+#
+# Extracción incremental: los datos ya leídos se guardan en una caché local (DataFrame en
+# pickle + archivo de estado) y en cada actualización solo se leen de la hoja las filas
+# nuevas, en páginas de tamaño acotado. Como el Apps Script vuelve a escribir toda la hoja
+# en cada ejecución (ordenada por "Número"), antes de leer lo nuevo se comparan el
+# encabezado y las últimas filas en caché con las de la hoja: si no coinciden, las filas
+# se desplazaron y se recarga todo. Cada REFRESCO_COMPLETO se recarga igual, para tomar
+# cambios en filas intermedias que no desplazan el final.
+
+import json
+import os
+import time
 
 import gspread
 import pandas as pd
 from google.oauth2 import service_account
 
-# Define el alcance para acceder a Google Sheets y Google Drive
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+FILA_ENCABEZADOS = 7             # Los encabezados están en la fila 7 de Google Sheets
+COLUMNA_FINAL = "M"              # Cambia según el rango máximo de columnas necesarias
+TAMANO_PAGINA = 2000             # Filas por solicitud a la API de Google Sheets
+FILAS_VERIFICACION = 50          # Filas finales que se comparan para detectar reescrituras
+REFRESCO_COMPLETO = 24 * 3600    # Segundos entre recargas completas
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser("~"), "cache_powerbi_reactivos")
+
+
+def _normalizar(filas, ancho):
+    """La API omite las celdas vacías del final: completa cada fila hasta `ancho` columnas."""
+    return [fila + [""] * (ancho - len(fila)) for fila in filas]
+
+
+def _leer_paginas(sheet, primera_fila, ancho, tamano_pagina):
+    """Lee desde `primera_fila` hasta el final de la hoja, de a `tamano_pagina` filas."""
+    filas = []
+    while True:
+        ultima_fila = primera_fila + tamano_pagina - 1
+        pagina = sheet.get_values(f"A{primera_fila}:{COLUMNA_FINAL}{ultima_fila}")
+        filas.extend(_normalizar(pagina, ancho))
+        if len(pagina) < tamano_pagina:
+            return filas
+        primera_fila = ultima_fila + 1
+
+
+def _leer_estado(ruta_estado, ruta_datos):
+    try:
+        with open(ruta_estado, encoding="utf-8") as archivo:
+            estado = json.load(archivo)
+        return estado, pd.read_pickle(ruta_datos)
+    except (OSError, ValueError, EOFError):
+        return None, None
+
+
+def _guardar(df, estado, ruta_estado, ruta_datos):
+    # Escritura atómica: una actualización interrumpida no deja la caché a medias
+    df.to_pickle(ruta_datos + ".tmp")
+    os.replace(ruta_datos + ".tmp", ruta_datos)
+    with open(ruta_estado + ".tmp", "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo)
+    os.replace(ruta_estado + ".tmp", ruta_estado)
+
+
+def extraer_incremental(sheet, directorio=DIRECTORIO_CACHE, tamano_pagina=TAMANO_PAGINA,
+                        filas_verificacion=FILAS_VERIFICACION, refresco_completo=REFRESCO_COMPLETO):
+    """Devuelve el DataFrame completo de la hoja leyendo solo lo que cambió desde la última vez.
+
+    `sheet` es un gspread.Worksheet (o cualquier objeto con get_values y batch_get).
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta_estado = os.path.join(directorio, "estado.json")
+    ruta_datos = os.path.join(directorio, "datos.pkl")
+    estado, df = _leer_estado(ruta_estado, ruta_datos)
+    primera_fila_datos = FILA_ENCABEZADOS + 1
+
+    if estado is not None and time.time() - estado["recarga_completa"] < refresco_completo:
+        # Encabezado y últimas filas en caché, en una sola solicitud
+        filas = len(df)
+        desde = primera_fila_datos + max(0, filas - filas_verificacion)
+        rangos = [f"A{FILA_ENCABEZADOS}:{COLUMNA_FINAL}{FILA_ENCABEZADOS}"]
+        if filas:
+            rangos.append(f"A{desde}:{COLUMNA_FINAL}{primera_fila_datos + filas - 1}")
+        respuesta = sheet.batch_get(rangos)
+        encabezados = (respuesta[0] or [[]])[0]
+        cola_cache = df.iloc[desde - primera_fila_datos:].values.tolist()
+        cola_hoja = _normalizar(respuesta[1], len(df.columns)) if filas else []
+        if encabezados == list(df.columns) and cola_hoja == cola_cache:
+            nuevas = _leer_paginas(sheet, primera_fila_datos + filas, len(df.columns), tamano_pagina)
+            if nuevas:
+                df = pd.concat([df, pd.DataFrame(nuevas, columns=df.columns)], ignore_index=True)
+                _guardar(df, estado, ruta_estado, ruta_datos)
+            return df
+
+    # Sin caché, caché vencida o la hoja se reescribió con las filas desplazadas: recarga completa
+    encabezados = sheet.get_values(f"A{FILA_ENCABEZADOS}:{COLUMNA_FINAL}{FILA_ENCABEZADOS}")[0]
+    valores = _leer_paginas(sheet, primera_fila_datos, len(encabezados), tamano_pagina)
+    df = pd.DataFrame(valores, columns=encabezados)
+    _guardar(df, {"recarga_completa": time.time()}, ruta_estado, ruta_datos)
+    return df
 
-# Carga las credenciales de la cuenta de servicio
-credentials = service_account.Credentials.from_service_account_file("C:/Users/Araceli/Documents/Credenciales/archivo-de-credenciales.json", scopes=scope)
 
-# Autenticación con Google Sheets usando las credenciales
-client = gspread.authorize(credentials)
+if __name__ == "__main__":
+    # Define el alcance para acceder a Google Sheets y Google Drive
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
-# Abre la hoja de Google Sheets usando su URL o ID
-spreadsheet = client.open_by_url('URL o ID')
+    # Carga las credenciales de la cuenta de servicio
+    credentials = service_account.Credentials.from_service_account_file(
+        "C:/Users/Araceli/Documents/Credenciales/archivo-de-credenciales.json", scopes=scope)
 
-# Selecciona la hoja que quieres trabajar (ejemplo: 'Sheet1')
-sheet = spreadsheet.worksheet('Sheet1')
+    # Autenticación con Google Sheets usando las credenciales
+    client = gspread.authorize(credentials)
 
-# Extrae los datos a partir de la celda que contiene la información (todos los datos de la hoja desde esa celda)
-data = sheet.get_values('A7:M')  # Cambia según el rango máximo de columnas necesarias
+    # Abre la hoja de Google Sheets usando su URL o ID
+    spreadsheet = client.open_by_url('URL o ID')
 
-# Convierte los datos en un DataFrame de pandas
-headers = data[0]  # Los encabezados están en la primera fila del rango seleccionado (fila 7 en Google Sheets)
-values = data[1:]  # Los datos están a partir de la segunda fila
+    # Selecciona la hoja que quieres trabajar (ejemplo: 'Sheet1')
+    sheet = spreadsheet.worksheet('Sheet1')
 
-# Crear el DataFrame utilizando los encabezados y valores extraídos
-df = pd.DataFrame(values, columns=headers)
+    # Extrae los datos (solo las filas nuevas si la caché local sigue siendo válida)
+    df = extraer_incremental(sheet)
 
-# Mostrar el DataFrame para verificar la extracción
-print(df)
\ No newline at end of file
+    # Mostrar el DataFrame para verificar la extracción
+    print(df)
@@ -0,0 +1,7 @@
+# Los módulos se importan entre sí como archivos sueltos (sin paquete): se agrega su
+# directorio al path para que las pruebas los importen igual que los scripts.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import re
+
+import pytest
+
+pytest.importorskip("gspread")
+
+# El script tiene guiones en el nombre: se carga desde su ruta
+_ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prueba8_powerBI-python-script.py")
+_especificacion = importlib.util.spec_from_file_location("prueba8_powerbi", _ruta)
+script = importlib.util.module_from_spec(_especificacion)
+_especificacion.loader.exec_module(script)
+
+ENCABEZADOS = ["UID", "Producto", "Número"]
+
+
+class HojaFalsa:
+    """Hoja con los encabezados en FILA_ENCABEZADOS; cuenta las filas devueltas por la API."""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.leidas = 0
+
+    def _rango(self, rango):
+        desde, hasta = (int(n) for n in re.fullmatch(r"A(\d+):[A-Z]+(\d+)", rango).groups())
+        contenido = [[]] * (script.FILA_ENCABEZADOS - 1) + [ENCABEZADOS] + self.filas
+        # Como la API: sin filas vacías al final ni celdas vacías al final de cada fila
+        valores = [list(fila) for fila in contenido[desde - 1:hasta]]
+        while valores and not valores[-1]:
+            valores.pop()
+        valores = [fila[:max((i + 1 for i, celda in enumerate(fila) if celda), default=0)] for fila in valores]
+        self.leidas += len(valores)
+        return valores
+
+    def get_values(self, rango):
+        return self._rango(rango)
+
+    def batch_get(self, rangos):
+        return [self._rango(rango) for rango in rangos]
+
+
+def filas(cantidad, desde=0):
+    return [[f"u{i}", f"Reactivo {i}", str(i) if i % 3 else ""] for i in range(desde, desde + cantidad)]
+
+
+def extraer(hoja, directorio, **opciones):
+    opciones.setdefault("tamano_pagina", 4)
+    opciones.setdefault("filas_verificacion", 2)
+    return script.extraer_incremental(hoja, str(directorio), **opciones)
+
+
+def test_primera_carga_paginada(tmp_path):
+    hoja = HojaFalsa(filas(9))
+    df = extraer(hoja, tmp_path)
+    assert list(df.columns) == ENCABEZADOS and df.values.tolist() == filas(9)
+
+
+def test_solo_lee_las_filas_nuevas(tmp_path):
+    hoja = HojaFalsa(filas(9))
+    extraer(hoja, tmp_path)
+    hoja.filas += filas(3, desde=9)
+    hoja.leidas = 0
+    df = extraer(hoja, tmp_path)
+    assert df.values.tolist() == filas(12)
+    assert hoja.leidas == 1 + 2 + 3  # Encabezado, filas de verificación y las nuevas
+
+
+def test_filas_desplazadas_recargan_todo(tmp_path):
+    hoja = HojaFalsa(filas(9))
+    extraer(hoja, tmp_path)
+    hoja.filas = filas(1, desde=100) + filas(9)  # El Apps Script reescribió la hoja con una fila al comienzo
+    assert extraer(hoja, tmp_path).values.tolist() == hoja.filas
+
+
+def test_filas_borradas_recargan_todo(tmp_path):
+    hoja = HojaFalsa(filas(9))
+    extraer(hoja, tmp_path)
+    hoja.filas = filas(7)
+    assert extraer(hoja, tmp_path).values.tolist() == filas(7)
+
+
+def test_refresco_completo_vencido(tmp_path):
+    hoja = HojaFalsa(filas(5))
+    extraer(hoja, tmp_path)
+    hoja.filas[1] = ["u1", "Cambiado", "1"]  # Un cambio intermedio no desplaza el final
+    assert extraer(hoja, tmp_path).values.tolist() == filas(5)
+    assert extraer(hoja, tmp_path, refresco_completo=0).values.tolist() == hoja.filas
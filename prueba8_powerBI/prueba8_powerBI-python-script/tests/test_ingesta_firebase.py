@@ -0,0 +1,117 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from ingesta_firebase import IngestaFirebase, normalizar_reactivo, orden_clave
+
+
+def nodo(numero, alta="1/2/2024", usos=None):
+    return {"01_producto": f"Reactivo {numero}", "02_numero": str(numero), "03_alta": alta, "04_marca": "Merck",
+            "09_baja": "", "Registros de Uso": usos or {}}
+
+
+def uso(fecha, hora, peso):
+    return {"fecha_uso": fecha, "hora_uso": hora, "temperatura": "21.5", "humedad": "40", "peso": peso}
+
+
+class FirebaseFalso:
+    """Responde las consultas por clave como la API REST (orderBy="$key", startAt, limitToFirst)."""
+
+    def __init__(self, arbol):
+        self.arbol = arbol
+        self.consultas = []
+
+    def __call__(self, **parametros):
+        self.consultas.append(parametros)
+        claves = sorted(self.arbol, key=orden_clave)
+        if "startAt" in parametros:
+            desde = orden_clave(json.loads(parametros["startAt"]))
+            claves = [clave for clave in claves if orden_clave(clave) >= desde]
+        claves = claves[:parametros["limitToFirst"]]
+        return {clave: self.arbol[clave] for clave in claves}
+
+
+@pytest.fixture
+def ingesta():
+    return IngestaFirebase("https://ejemplo.firebaseio.com/", tamano_pagina=2)
+
+
+def test_orden_clave_como_firebase():
+    claves = ["b", "10", "2", "-3", "a", "007", "4294967296"]
+    assert sorted(claves, key=orden_clave) == ["-3", "2", "10", "007", "4294967296", "a", "b"]
+
+
+def test_carga_paginada(ingesta, monkeypatch):
+    arbol = {uid: nodo(i) for i, uid in enumerate(["04a1", "10", "2", "ff00", "b7"])}
+    firebase = FirebaseFalso(arbol)
+    monkeypatch.setattr(ingesta, "_obtener", firebase)
+    reactivos, usos = ingesta.cargar()
+    assert sorted(reactivos["UID"]) == sorted(arbol)
+    assert max(c["limitToFirst"] for c in firebase.consultas) == 3  # Página más la clave de inicio
+    assert len(firebase.consultas) == 3
+    assert usos.empty
+
+
+def test_tablas_tipadas(ingesta, monkeypatch):
+    arbol = {"04a1": nodo(2, usos={"-N1": uso("5/3/2025", "9:07:02", "123.4")}),
+             "04b2": nodo(1, alta="no es fecha")}
+    monkeypatch.setattr(ingesta, "_obtener", FirebaseFalso(arbol))
+    reactivos, usos = ingesta.cargar()
+    assert list(reactivos["Número"]) == [1, 2]  # Ordenados por número, como la planilla
+    assert str(reactivos["Número"].dtype) == "Int64"
+    assert pd.isna(reactivos["Alta"].iloc[0]) and reactivos["Alta"].iloc[1] == pd.Timestamp("2024-02-01")
+    assert usos["Fecha de Uso"].iloc[0] == pd.Timestamp("2025-03-05 09:07:02")
+    assert usos["Peso (g)"].iloc[0] == 123.4
+
+
+def test_normalizar_nodo_invalido():
+    reactivo, usos = normalizar_reactivo("04a1", "texto")
+    assert reactivo["UID"] == "04a1" and reactivo["Producto"] is None and usos == []
+
+
+def test_eventos_put_y_patch(ingesta):
+    ingesta.aplicar_evento("put", "/", {"04a1": nodo(1), "04b2": nodo(2)})
+    ingesta.aplicar_evento("put", "/04a1/Registros de Uso/-N1", uso("5/3/2025", "9:07:02", "10"))
+    ingesta.aplicar_evento("patch", "/04b2", {"09_baja": "6/3/2025",
+                                              "Registros de Uso/-N2": uso("6/3/2025", "10:00:00", "5")})
+    ingesta.aplicar_evento("patch", "/", {"04c3/01_producto": "Nuevo", "04c3/02_numero": "3"})
+    reactivos, usos = ingesta.tablas()
+    assert list(reactivos["UID"]) == ["04a1", "04b2", "04c3"]
+    assert reactivos["Baja"].iloc[1] == pd.Timestamp("2025-03-06")
+    assert reactivos["Producto"].iloc[2] == "Nuevo"
+    assert sorted(usos["Registro"]) == ["-N1", "-N2"]
+
+    # Escribir null borra el nodo, y borrar su último hijo borra también al padre
+    ingesta.aplicar_evento("put", "/04a1/Registros de Uso/-N1", None)
+    ingesta.aplicar_evento("put", "/04b2", None)
+    reactivos, usos = ingesta.tablas()
+    assert list(reactivos["UID"]) == ["04a1", "04c3"]
+    assert "Registros de Uso" not in ingesta.arbol["04a1"] and usos.empty
+
+
+def test_patch_con_barras_de_mas(ingesta):
+    # Barras iniciales, finales o dobles en las claves no crean nodos con nombre vacío
+    ingesta.aplicar_evento("put", "/", {"04a1": nodo(1)})
+    ingesta.aplicar_evento("patch", "/04a1/", {"/09_baja": "6/3/2025",
+                                               "Registros de Uso//-N1/": uso("5/3/2025", "9:07:02", "10")})
+    ingesta.aplicar_evento("patch", "/", {"/04b2/01_producto": "Nuevo"})
+    assert "" not in ingesta.arbol["04a1"] and "" not in ingesta.arbol["04a1"]["Registros de Uso"]
+    reactivos, usos = ingesta.tablas()
+    assert list(reactivos["UID"]) == ["04a1", "04b2"]
+    assert reactivos["Baja"].iloc[0] == pd.Timestamp("2025-03-06")
+    assert list(usos["Registro"]) == ["-N1"]
+
+
+def test_leer_stream(ingesta):
+    stream = io.BytesIO(
+        b"event: put\r\ndata: {\"path\": \"/\", \"data\": {\"04a1\": {\"02_numero\": \"1\"}}}\r\n\r\n"
+        b"event: keep-alive\ndata: null\n\n"
+        b"event: patch\ndata: {\"path\": \"/04a1\", \"data\": {\"01_producto\": \"Metanol\"}}\n\n")
+    ingesta._leer_stream(stream)
+    assert ingesta.arbol == {"04a1": {"02_numero": "1", "01_producto": "Metanol"}}
+    assert ingesta.version == 2
+
+    with pytest.raises(ValueError):
+        ingesta._leer_stream(io.BytesIO(b"event: auth_revoked\ndata: null\n\n"))
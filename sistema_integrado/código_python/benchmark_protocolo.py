@@ -0,0 +1,148 @@
+# Medición de latencia del protocolo serial contra ESP32 simulados
+#
+# Levanta N estaciones simuladas (simulador_esp32), las conecta con GestorEstaciones
+# exactamente como lo hace la interfaz gráfica y envía una serie de comandos a cada una.
+# Informa la latencia p50/p99 por comando, las etiquetas procesadas por minuto y el tiempo
+# medio hasta cada fase de los comandos (ver metricas).
+#
+# Ejemplos:
+#   python benchmark_protocolo.py --comandos TRACK --repeticiones 50
+#   python benchmark_protocolo.py --estaciones 8 --escala 0.1 --prob-sin-etiqueta 0.05
+#   python benchmark_protocolo.py --comandos TRACK --cache   (omite los bloques fijos ya conocidos)
+#   python benchmark_protocolo.py --binario   (protocolo con tramas en lugar de líneas de texto)
+
+import argparse
+import queue
+import statistics
+import time
+
+from cache_etiquetas import CacheEtiquetas
+from comunicacion_serial import Comando
+from gestor_estaciones import GestorEstaciones
+from metricas import Metricas
+from simulador_esp32 import Retardos, SimuladorESP32
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def ejecutar(estaciones=1, comandos=("READ", "TRACK", "OUT"), repeticiones=20, retardos=None,
+             delegar=False, timeout_total=600, cache=False, metricas=None,
+             binario=False, **errores):
+    """Ejecuta el benchmark y devuelve {comando: [duraciones]}, fallos y el tiempo total.
+
+    Los comandos que no terminan dentro de `timeout_total` segundos cuentan como fallos.
+    """
+    simuladores = [SimuladorESP32(retardos, semilla=i, **errores).iniciar() for i in range(estaciones)]
+    gestor = GestorEstaciones(archivo_registro=None, delegar=delegar,
+                              cache=CacheEtiquetas(ruta=None) if cache else None, metricas=metricas,
+                              binario=binario)
+    try:
+        gestor.conectar([simulador.puerto for simulador in simuladores])
+        if delegar:
+            for estacion in gestor.nombres:
+                gestor.enviar(estacion, Comando("DELEGATE ON"))
+
+        # Además de los comandos medidos: DELEGATE OFF y CACHE ON/OFF al conectar y los modos pedidos
+        esperados = len(gestor.nombres) * (len(comandos) * repeticiones + 2 + int(delegar) + int(binario))
+        inicio = time.monotonic()
+        for estacion in gestor.nombres:
+            for _ in range(repeticiones):
+                for nombre in comandos:
+                    gestor.enviar(estacion, Comando(nombre))
+
+        duraciones = {nombre: [] for nombre in comandos}
+        fallos = {nombre: 0 for nombre in comandos}
+        pendientes = {nombre: len(gestor.nombres) * repeticiones for nombre in comandos}
+        recibidos = 0
+        limite = inicio + timeout_total
+        while recibidos < esperados and time.monotonic() < limite:
+            try:
+                mensaje = gestor.salida.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                continue  # Venció timeout_total: lo pendiente se cuenta abajo
+            if mensaje[0] != "fin":
+                continue
+            recibidos += 1
+            resultado = mensaje[3]
+            if resultado.nombre not in duraciones:
+                continue
+            pendientes[resultado.nombre] -= 1
+            if resultado.exito:
+                duraciones[resultado.nombre].append(resultado.duracion)
+            else:
+                fallos[resultado.nombre] += 1
+        for nombre, cantidad in pendientes.items():
+            fallos[nombre] += cantidad  # Timeout del benchmark
+        total = time.monotonic() - inicio
+    finally:
+        gestor.desconectar()
+        for simulador in simuladores:
+            simulador.detener()
+    return duraciones, fallos, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del protocolo serial con ESP32 simulados")
+    parser.add_argument("--estaciones", type=int, default=1, help="Cantidad de lectores simulados")
+    parser.add_argument("--comandos", nargs="+", default=["READ", "TRACK", "OUT"],
+                        choices=["READ", "TRACK", "OUT"])
+    parser.add_argument("--repeticiones", type=int, default=20, help="Veces que se envía cada comando por estación")
+    parser.add_argument("--escala", type=float, default=1.0,
+                        help="Factor aplicado a los retardos del dispositivo (0 = sin retardos)")
+    parser.add_argument("--delegar", action="store_true", help="Activar DELEGATE ON (sin envíos a Firebase desde el ESP32)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Activar CACHE ON (TRACK no vuelve a leer los bloques fijos de etiquetas conocidas)")
+    parser.add_argument("--binario", action="store_true",
+                        help="Negociar el protocolo binario con tramas (ver protocolo_binario)")
+    parser.add_argument("--prob-sin-etiqueta", type=float, default=0.0)
+    parser.add_argument("--prob-error-bloque", type=float, default=0.0)
+    parser.add_argument("--prob-error-firebase", type=float, default=0.0)
+    args = parser.parse_args()
+
+    metricas = Metricas()
+    duraciones, fallos, total = ejecutar(
+        args.estaciones, args.comandos, args.repeticiones, Retardos().escalar(args.escala), args.delegar,
+        cache=args.cache, metricas=metricas, binario=args.binario, prob_sin_etiqueta=args.prob_sin_etiqueta,
+        prob_error_bloque=args.prob_error_bloque, prob_error_firebase=args.prob_error_firebase)
+
+    print(f"Estaciones: {args.estaciones} | Escala de retardos: {args.escala} | Delegado: {args.delegar} | "
+          f"Caché: {args.cache} | Binario: {args.binario}")
+    print(f"{'Comando':<8}{'OK':>6}{'Fallos':>8}{'p50 (ms)':>11}{'p99 (ms)':>11}{'media (ms)':>12}")
+    for nombre, valores in duraciones.items():
+        if valores:
+            print(f"{nombre:<8}{len(valores):>6}{fallos[nombre]:>8}{percentil(valores, 50) * 1000:>11.1f}"
+                  f"{percentil(valores, 99) * 1000:>11.1f}{statistics.mean(valores) * 1000:>12.1f}")
+        else:
+            print(f"{nombre:<8}{0:>6}{fallos[nombre]:>8}{'-':>11}{'-':>11}{'-':>12}")
+    etiquetas = sum(len(valores) for valores in duraciones.values())
+    print(f"Etiquetas procesadas: {etiquetas} en {total:.2f} s ({etiquetas / total * 60:.1f} etiquetas/min)")
+
+    # Tiempo medio desde el envío hasta cada fase, sumando todas las estaciones
+    fases = ("escritura", "primera_respuesta", "etiqueta", "firebase", "total")
+    acumulado = {}  # (comando, fase) -> [suma, cantidad]
+    instantanea = metricas.instantanea()
+    for h in instantanea["histogramas"]:
+        if h["nombre"] == "comando_fase_segundos":
+            total_fase = acumulado.setdefault((h["etiquetas"]["comando"], h["etiquetas"]["fase"]), [0.0, 0])
+            total_fase[0] += h["suma"]
+            total_fase[1] += h["cantidad"]
+    print("\nTiempo medio desde el envío hasta cada fase (ms)")
+    print(f"{'Comando':<8}" + "".join(f"{fase:>19}" for fase in fases))
+    for nombre in args.comandos:
+        celdas = []
+        for fase in fases:
+            suma, cantidad = acumulado.get((nombre, fase), (0.0, 0))
+            celdas.append(f"{suma / cantidad * 1000:>19.1f}" if cantidad else f"{'-':>19}")
+        print(f"{nombre:<8}" + "".join(celdas))
+    recibidos = sum(c["valor"] for c in instantanea["contadores"]
+                    if c["nombre"] == "serial_bytes_total" and c["etiquetas"]["sentido"] == "entrada")
+    print(f"Bytes recibidos por etiqueta: {recibidos / max(etiquetas, 1):.0f}")
+
+
+if __name__ == "__main__":
+    main()
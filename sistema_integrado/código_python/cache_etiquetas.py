@@ -0,0 +1,102 @@
+# Caché persistente de los campos fijos de cada etiqueta, por UID
+
+import json
+import os
+import threading
+import zlib
+
+# Campos que solo cambian al reprogramar la etiqueta (WRITE)
+CAMPOS_FIJOS = ("Producto", "Número", "Marca", "Código", "Presentación", "Lote", "Vencimiento")
+
+
+def suma_control(campos):
+    """CRC32 de los campos fijos, para detectar si una etiqueta cambió desde que se guardó."""
+    contenido = "\x1f".join(campos.get(campo, "") for campo in CAMPOS_FIJOS)
+    return zlib.crc32(contenido.encode("utf-8"))
+
+
+class CacheEtiquetas:
+    """Campos fijos de las etiquetas ya leídas, para que TRACK no vuelva a leerlos.
+
+    Con la caché activa (comando CACHE ON), el ESP32 anuncia el UID antes de leer los
+    bloques y el equipo responde KNOWN <uid> si tiene la etiqueta guardada: en ese caso
+    solo se leen los bloques de alta y baja, y los campos fijos se completan aquí.
+
+    Cada lectura completa (READ, OUT o un TRACK de una etiqueta desconocida) actualiza la
+    entrada y compara su suma de control. Una de cada `verificar_cada` lecturas de una
+    etiqueta conocida se hace completa, para notar cambios hechos fuera de este equipo
+    (p. ej. desde el menú manual). Un WRITE descarta la entrada de la etiqueta.
+    """
+
+    def __init__(self, ruta="cache_etiquetas.json", verificar_cada=20):
+        self.ruta = ruta
+        self.verificar_cada = verificar_cada
+        self.cambios = 0  # Lecturas completas que no coincidieron con lo guardado
+        self._sin_verificar = {}  # UID -> lecturas parciales desde la última completa
+        self._bloqueo = threading.Lock()  # La comparten los hilos de todas las estaciones
+        self._etiquetas = {}
+        if ruta:
+            try:
+                with open(ruta, encoding="utf-8") as archivo:
+                    self._etiquetas = json.load(archivo)
+            except (OSError, ValueError):
+                pass
+
+    def __len__(self):
+        return len(self._etiquetas)
+
+    def _escribir(self):
+        if not self.ruta:
+            return
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(self._etiquetas, archivo, ensure_ascii=False)
+        os.replace(temporal, self.ruta)  # Reemplazo atómico: nunca queda un archivo a medias
+
+    def conocida(self, uid):
+        """Indica si se puede omitir la lectura de los campos fijos de la etiqueta."""
+        with self._bloqueo:
+            if uid not in self._etiquetas:
+                return False
+            lecturas = self._sin_verificar.get(uid, 0)
+            if lecturas + 1 >= self.verificar_cada:
+                return False  # Toca una lectura completa de verificación
+            self._sin_verificar[uid] = lecturas + 1
+            return True
+
+    def invalidar(self, uid):
+        with self._bloqueo:
+            self._sin_verificar.pop(uid, None)
+            if self._etiquetas.pop(uid, None) is not None:
+                self._escribir()
+
+    def procesar(self, campos):
+        """Guarda los campos de una lectura completa o completa los de una parcial.
+
+        Modifica `campos` en el lugar; devuelve "nueva", "igual", "cambio", "completada"
+        o None si la etiqueta no se conocía y la lectura no traía los campos fijos.
+        """
+        uid = campos.get("UID")
+        if not uid:
+            return None
+        with self._bloqueo:
+            if all(campo in campos for campo in CAMPOS_FIJOS):
+                suma = suma_control(campos)
+                anterior = self._etiquetas.get(uid)
+                self._sin_verificar.pop(uid, None)
+                if anterior is not None and anterior["suma"] == suma:
+                    return "igual"
+                self._etiquetas[uid] = {"campos": {campo: campos[campo] for campo in CAMPOS_FIJOS},
+                                        "suma": suma}
+                self._escribir()
+                if anterior is None:
+                    return "nueva"
+                self.cambios += 1
+                return "cambio"
+
+            entrada = self._etiquetas.get(uid)
+            if entrada is None:
+                return None
+            for campo, valor in entrada["campos"].items():
+                campos.setdefault(campo, valor)
+            return "completada"
@@ -0,0 +1,286 @@
+# Comunicación serial en segundo plano con el ESP32
+
+import queue
+import threading
+import time
+from collections import deque
+
+import serial
+
+from protocolo_binario import DecodificadorTramas, codificar_orden
+from protocolo_esp32 import (DEFINICIONES, ESPERANDO_DATOS, ETIQUETA_DETECTADA, FIREBASE_DELEGADO,
+                             FIREBASE_OK, TEXTO, UID_DETECTADO, USO_DELEGADO, USO_GUARDADO, Evento,
+                             Resultado, interpretar_linea)
+
+# Eventos que marcan las fases medidas de cada comando (ver metricas)
+_FASE_ETIQUETA = (ETIQUETA_DETECTADA, ESPERANDO_DATOS, UID_DETECTADO)
+_FASE_FIREBASE = (FIREBASE_OK, USO_GUARDADO, FIREBASE_DELEGADO, USO_DELEGADO)
+
+
+class Comando:
+    """Transacción a ejecutar en el ESP32: comando, datos opcionales y función de respuesta."""
+
+    def __init__(self, nombre, datos=None, al_terminar=None, timeout=None, continuo=False):
+        self.nombre = nombre            # Comando enviado al ESP32 (READ, WRITE, TRACK, OUT)
+        self.datos = datos              # Línea a enviar cuando el ESP32 la solicite (WRITE)
+        self.al_terminar = al_terminar  # Función a ejecutar en la interfaz con el Resultado
+        self.timeout = timeout if timeout is not None else DEFINICIONES[nombre].timeout
+        self.continuo = continuo        # Volver a armar el comando apenas termina (escaneo continuo)
+        self.activo = True
+
+    def cancelar(self):
+        """Evita que un comando continuo se vuelva a armar y corta la espera de su respuesta.
+
+        El hilo serial lo termina con el motivo "cancelado" (sin enviarlo, si todavía no salió).
+        """
+        self.activo = False
+
+
+class TrabajadorSerial(threading.Thread):
+    """Hilo dedicado al puerto serial.
+
+    Recibe comandos por una cola, los envía al ESP32 y publica cada línea recibida,
+    ya interpretada, en la cola de salida, de modo que la interfaz gráfica nunca se
+    bloquea esperando al dispositivo. Cada comando termina en cuanto llega su evento
+    final (ver protocolo_esp32). La salida contiene tuplas ("evento", estacion, Evento),
+    ("error", estacion, texto) y ("fin", estacion, comando, resultado), donde estacion
+    identifica al lector cuando hay varios conectados (ver gestor_estaciones).
+
+    Si se indica un diario (ver diario_eventos), cada resultado con UID se guarda en él
+    antes de publicarse, pendiente de subida si el ESP32 delegó el envío a Firebase.
+
+    Con una caché de etiquetas (ver cache_etiquetas), el hilo responde al UID que anuncia
+    el ESP32 en TRACK y completa los campos fijos que este no volvió a leer.
+
+    Con un registro de métricas (ver metricas), cada comando deja el tiempo hasta cada
+    fase: escritura del comando, primera respuesta, etiqueta detectada, confirmación de
+    Firebase (o delegación) y fin; además se cuentan los bytes, timeouts y reintentos.
+
+    Cuando un comando BINARY ON termina con éxito, el hilo pasa a enviar y recibir tramas
+    (ver protocolo_binario) y, si se indicó `baudios_binario`, cambia la velocidad del puerto.
+    La respuesta a BINARY ON/OFF se lee con un DecodificadorTramas, que entiende texto y
+    tramas, porque el ESP32 puede haber quedado en modo binario de una sesión anterior; si
+    además quedó a `baudios_binario`, BINARY ON no tiene respuesta y se reintenta una vez a
+    esa velocidad. Al detenerse en modo binario, el hilo envía BINARY OFF para dejar al
+    ESP32 en modo texto y a su velocidad inicial.
+    """
+
+    def __init__(self, ser, salida=None, estacion=None, diario=None, cache=None, metricas=None,
+                 baudios_binario=None):
+        super().__init__(daemon=True, name=f"serial-{estacion or ser.port}")
+        self.ser = ser
+        self.estacion = estacion or ser.port
+        self.diario = diario
+        self.cache = cache
+        self.metricas = metricas
+        self.baudios_binario = baudios_binario
+        self.baudios_texto = ser.baudrate
+        self.decodificador = None  # DecodificadorTramas mientras el protocolo binario está activo
+        self._eventos = deque()    # Eventos ya decodificados que todavía no se publicaron
+        self.comandos = queue.Queue()
+        self.salida = salida if salida is not None else queue.Queue()
+        self._detener = threading.Event()
+
+    def enviar(self, comando):
+        """Agrega un comando a la cola; se ejecuta en orden de llegada."""
+        self.comandos.put(comando)
+
+    def detener(self):
+        """Solicita la finalización del hilo y espera a que termine.
+
+        Si el protocolo binario quedó activo, envía BINARY OFF sin esperar la respuesta.
+        """
+        self._detener.set()
+        if self.is_alive():
+            self.join(timeout=2)
+        if self.decodificador is not None and not self.is_alive():
+            try:
+                self._escribir("BINARY OFF")
+                self.ser.flush()
+            except (serial.SerialException, OSError):
+                pass  # El puerto ya no responde; el ESP32 se restablece con el próximo BINARY ON
+
+    def run(self):
+        while not self._detener.is_set():
+            try:
+                comando = self.comandos.get(timeout=0.05)
+            except queue.Empty:
+                # Sin comandos pendientes: reenviar cualquier mensaje espontáneo del ESP32
+                self._leer_evento()
+                continue
+            resultado = self._ejecutar(comando)
+            if comando.continuo and comando.activo:
+                # Escaneo continuo: el comando queda armado para la siguiente etiqueta
+                self.comandos.put(comando)
+                if self.metricas is not None and not resultado.exito:
+                    self.metricas.incrementar("reintentos_total", estacion=self.estacion, comando=comando.nombre)
+
+    def _leer_evento(self):
+        """Lee una línea del puerto y publica su evento; devuelve None si no llegó nada."""
+        if self.decodificador is not None:
+            return self._leer_evento_binario()
+        try:
+            crudo = self.ser.readline()
+        except (serial.SerialException, OSError) as e:
+            self._error_serial(e)
+            self._detener.set()
+            return None
+        if self.metricas is not None and crudo:
+            self.metricas.incrementar("serial_bytes_total", len(crudo), estacion=self.estacion, sentido="entrada")
+        linea = crudo.decode('utf-8', errors='replace').strip()
+        if not linea:
+            return None
+        evento = interpretar_linea(linea)
+        self.salida.put(("evento", self.estacion, evento))
+        return evento
+
+    def _leer_evento_binario(self):
+        """Como _leer_evento, pero con tramas: lee lo disponible y publica un evento por vez."""
+        if not self._eventos:
+            try:
+                crudo = self.ser.read(self.ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                self._error_serial(e)
+                self._detener.set()
+                return None
+            invalidas = self.decodificador.invalidas
+            if crudo:
+                self._eventos.extend(self.decodificador.alimentar(crudo))
+            else:
+                # Sin bytes nuevos: una trama que quedó a medias no se va a completar
+                self._eventos.extend(self.decodificador.expirar())
+            if self.metricas is not None:
+                if crudo:
+                    self.metricas.incrementar("serial_bytes_total", len(crudo), estacion=self.estacion,
+                                              sentido="entrada")
+                if self.decodificador.invalidas > invalidas:
+                    self.metricas.incrementar("tramas_invalidas_total", self.decodificador.invalidas - invalidas,
+                                              estacion=self.estacion)
+            if not self._eventos:
+                return None
+        evento = self._eventos.popleft()
+        self.salida.put(("evento", self.estacion, evento))
+        return evento
+
+    def _error_serial(self, error):
+        self.salida.put(("error", self.estacion, str(error)))
+        if self.metricas is not None:
+            self.metricas.incrementar("errores_serial_total", estacion=self.estacion)
+
+    def _publicar_texto(self, texto):
+        self.salida.put(("evento", self.estacion, Evento(TEXTO, texto, None, None)))
+
+    def _escribir(self, linea):
+        if self.decodificador is not None:
+            datos = codificar_orden(linea)
+        else:
+            datos = (linea + "\n").encode('utf-8')
+        self.ser.write(datos)
+        if self.metricas is not None:
+            self.metricas.incrementar("serial_bytes_total", len(datos), estacion=self.estacion, sentido="salida")
+
+    def _ejecutar(self, comando):
+        inicio = time.monotonic()
+        fases = {}  # Fase -> segundos desde el envío, la primera vez que ocurre
+        resultado = self._transaccion(comando, inicio, fases)
+        if (comando.nombre == "BINARY ON" and resultado.motivo == "timeout" and self.baudios_binario
+                and self.ser.baudrate != self.baudios_binario and not self._detener.is_set()):
+            # El ESP32 puede haber quedado en modo binario a la velocidad de una sesión anterior
+            if self.metricas is not None:
+                self.metricas.incrementar("reintentos_total", estacion=self.estacion, comando=comando.nombre)
+            self.ser.baudrate = self.baudios_binario
+            resultado = self._transaccion(comando, inicio, fases)
+            if not resultado.exito:
+                self.ser.baudrate = self.baudios_texto
+        resultado.duracion = time.monotonic() - inicio
+        if resultado.exito and comando.nombre in ("BINARY ON", "BINARY OFF"):
+            self._cambiar_protocolo(comando.nombre == "BINARY ON")
+        if self.metricas is not None:
+            self._registrar_metricas(comando, resultado, fases)
+        if self.cache is not None and resultado.exito:
+            self.cache.procesar(resultado.campos)
+        if self.diario is not None and resultado.exito and resultado.campos.get("UID"):
+            self.diario.registrar(self.estacion, resultado, pendiente=resultado.delegado)
+        self.salida.put(("fin", self.estacion, comando, resultado))
+        return resultado
+
+    def _transaccion(self, comando, inicio, fases):
+        """Envía el comando y lee los eventos hasta el final; devuelve el Resultado."""
+        resultado = Resultado(comando.nombre)
+        negociacion = comando.nombre in ("BINARY ON", "BINARY OFF")
+        decodificador = self.decodificador
+        if not comando.activo:
+            resultado.cancelar()  # Cancelado mientras esperaba en la cola
+            return resultado
+        try:
+            self.ser.reset_input_buffer()  # Limpiar el buffer antes de enviar comandos
+            self._eventos.clear()
+            if self.decodificador is not None:
+                self.decodificador.reiniciar()
+            if comando.nombre == "BINARY ON" and self.baudios_binario:
+                self._escribir(f"BINARY ON {self.baudios_binario}")
+            else:
+                self._escribir(comando.nombre)
+            if negociacion and self.decodificador is None:
+                # La orden sale en texto, pero la respuesta puede llegar en tramas
+                self.decodificador = DecodificadorTramas()
+            fases["escritura"] = time.monotonic() - inicio
+            self._publicar_texto(f"Enviando comando '{comando.nombre}'...")
+
+            limite = time.monotonic() + comando.timeout
+            while not resultado.terminado:
+                if self._detener.is_set() or time.monotonic() >= limite:
+                    resultado.vencer()
+                    break
+                if not comando.activo:
+                    # Escaneo continuo detenido: no se espera a que venza el timeout
+                    resultado.cancelar()
+                    break
+                evento = self._leer_evento()
+                if evento is None:
+                    continue
+                transcurrido = time.monotonic() - inicio
+                fases.setdefault("primera_respuesta", transcurrido)
+                if evento.tipo in _FASE_ETIQUETA:
+                    fases.setdefault("etiqueta", transcurrido)
+                elif evento.tipo in _FASE_FIREBASE:
+                    fases.setdefault("firebase", transcurrido)
+                if evento.tipo == ESPERANDO_DATOS and comando.datos is not None:
+                    # El ESP32 detectó la etiqueta y quedó esperando los valores a grabar
+                    self._escribir(comando.datos)
+                    self._publicar_texto(f"Datos enviados: {comando.datos}")
+                elif evento.tipo == UID_DETECTADO and self.cache is not None:
+                    if comando.nombre == "TRACK":
+                        self._escribir(f"KNOWN {evento.valor}" if self.cache.conocida(evento.valor) else "UNKNOWN")
+                    else:
+                        self.cache.invalidar(evento.valor)  # WRITE va a reprogramar la etiqueta
+                resultado.agregar(evento)
+        except (serial.SerialException, OSError) as e:
+            self._error_serial(e)
+            resultado.vencer()
+        except Exception as e:
+            # Un error de programación no debe terminar el hilo: la estación sigue atendiendo comandos
+            self.salida.put(("error", self.estacion, f"Error inesperado en '{comando.nombre}': {e!r}"))
+            resultado.terminado, resultado.motivo = True, "error_interno"
+            comando.cancelar()  # Un comando continuo fallaría igual en cada vuelta
+        if negociacion:
+            self.decodificador = decodificador  # El protocolo cambia solo si la negociación termina bien
+            self._eventos.clear()
+        return resultado
+
+    def _cambiar_protocolo(self, binario):
+        self.decodificador = DecodificadorTramas() if binario else None
+        # El ESP32 cambió de velocidad después de enviar la confirmación
+        baudios = (self.baudios_binario or self.baudios_texto) if binario else self.baudios_texto
+        if self.ser.baudrate != baudios:
+            self.ser.baudrate = baudios
+
+    def _registrar_metricas(self, comando, resultado, fases):
+        fases["total"] = resultado.duracion
+        for fase, segundos in fases.items():
+            self.metricas.observar("comando_fase_segundos", segundos, estacion=self.estacion,
+                                   comando=comando.nombre, fase=fase)
+        self.metricas.incrementar("comandos_total", estacion=self.estacion, comando=comando.nombre,
+                                  motivo=resultado.motivo or "desconocido")
+        if resultado.motivo == "timeout":
+            self.metricas.incrementar("timeouts_total", estacion=self.estacion, comando=comando.nombre)
@@ -0,0 +1,164 @@
+# Diario local de eventos de escaneo y subida por lotes a Firebase
+
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Correspondencia entre los campos que imprime el ESP32 y las claves usadas en Firebase
+CLAVES_FIREBASE = {
+    "Producto": "01_producto", "Número": "02_numero", "Alta": "03_alta", "Marca": "04_marca",
+    "Código": "05_codigo", "Presentación": "06_presentacion", "Lote": "07_lote",
+    "Vencimiento": "08_vencimiento", "Baja": "09_baja",
+}
+CLAVES_USO = {"Temperatura": "temperatura", "Humedad": "humedad", "Peso": "peso"}
+
+
+class DiarioEventos:
+    """Diario de solo agregado (SQLite en modo WAL) con el resultado de cada escaneo.
+
+    Cada evento se guarda antes de intentar subirlo, de modo que una caída de la red
+    o del programa no pierde registros: los que quedan pendientes se vuelven a enviar
+    en el siguiente lote, también después de reiniciar.
+    """
+
+    def __init__(self, ruta="diario_eventos.db"):
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._bloqueo = threading.Lock()  # Los hilos seriales y el sincronizador comparten la conexión
+        with self._bloqueo:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS eventos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    marca_tiempo REAL NOT NULL,
+                    estacion TEXT,
+                    comando TEXT NOT NULL,
+                    uid TEXT NOT NULL,
+                    campos TEXT NOT NULL,
+                    pendiente INTEGER NOT NULL
+                )""")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS eventos_pendientes ON eventos (id) WHERE pendiente = 1")
+
+    def registrar(self, estacion, resultado, pendiente=True, marca_tiempo=None):
+        """Agrega el resultado de un comando; `pendiente` indica si falta subirlo a Firebase."""
+        with self._bloqueo:
+            self._conexion.execute(
+                "INSERT INTO eventos (marca_tiempo, estacion, comando, uid, campos, pendiente) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (marca_tiempo or time.time(), estacion, resultado.nombre, resultado.campos["UID"],
+                 json.dumps(resultado.campos, ensure_ascii=False), int(pendiente)))
+
+    def pendientes(self, limite=500):
+        """Devuelve hasta `limite` eventos sin subir, en orden de llegada."""
+        with self._bloqueo:
+            return self._conexion.execute(
+                "SELECT id, marca_tiempo, comando, uid, campos FROM eventos "
+                "WHERE pendiente = 1 ORDER BY id LIMIT ?", (limite,)).fetchall()
+
+    def recorrer(self):
+        """Devuelve (marca_tiempo, comando, campos) de todos los eventos, en orden de llegada."""
+        with self._bloqueo:
+            return self._conexion.execute(
+                "SELECT marca_tiempo, comando, campos FROM eventos ORDER BY id").fetchall()
+
+    def marcar_enviados(self, ids):
+        with self._bloqueo:
+            self._conexion.executemany("UPDATE eventos SET pendiente = 0 WHERE id = ?",
+                                       ((i,) for i in ids))
+
+    def cerrar(self):
+        with self._bloqueo:
+            self._conexion.close()
+
+
+def construir_actualizacion(eventos):
+    """Convierte eventos del diario en una única actualización multi-ruta de Firebase.
+
+    Los eventos se aplican en orden, así que ante rutas repetidas prevalece el último.
+    """
+    actualizacion = {}
+    for _, marca_tiempo, comando, uid, campos in eventos:
+        campos = json.loads(campos)
+        base = f"reactivos/{uid}"
+        for campo, clave in CLAVES_FIREBASE.items():
+            if campos.get(campo):
+                actualizacion[f"{base}/{clave}"] = campos[campo]
+
+        if comando == "TRACK":
+            # Fecha y hora con el mismo formato que el ESP32; la clave usa la hora local en
+            # milisegundos para que dos usos de la misma etiqueta en un segundo no se pisen
+            fecha = time.localtime(marca_tiempo)
+            uso = f"{base}/Registros de Uso/{int((marca_tiempo + fecha.tm_gmtoff) * 1000)}"
+            actualizacion[f"{uso}/fecha_uso"] = f"{fecha.tm_mday}/{fecha.tm_mon}/{fecha.tm_year}"
+            actualizacion[f"{uso}/hora_uso"] = f"{fecha.tm_hour}:{fecha.tm_min}:{fecha.tm_sec}"
+            for campo, clave in CLAVES_USO.items():
+                try:
+                    actualizacion[f"{uso}/{clave}"] = float(campos[campo])
+                except (KeyError, ValueError):
+                    pass  # Sensor sin lectura: el campo no se envía
+    return actualizacion
+
+
+class SincronizadorFirebase(threading.Thread):
+    """Hilo que sube periódicamente los eventos pendientes del diario en lotes.
+
+    Cada lote se envía con un solo PATCH multi-ruta a la API REST de Firebase en lugar
+    de una escritura por campo. Si el envío falla, los eventos siguen pendientes y se
+    reintentan en el próximo intervalo. Con un registro de métricas (ver metricas) se
+    mide la duración de cada lote y se cuentan los envíos fallidos.
+    """
+
+    def __init__(self, diario, url_base, auth=None, intervalo=5, tamano_lote=500, metricas=None):
+        super().__init__(daemon=True, name="sincronizador-firebase")
+        self.diario = diario
+        self.url = url_base.rstrip("/") + "/.json" + (f"?auth={auth}" if auth else "")
+        self.intervalo = intervalo
+        self.tamano_lote = tamano_lote
+        self.metricas = metricas
+        self.ultimo_error = None
+        self._detener = threading.Event()
+
+    def sincronizar(self):
+        """Sube todos los eventos pendientes; devuelve cuántos se enviaron."""
+        enviados = 0
+        while True:
+            eventos = self.diario.pendientes(self.tamano_lote)
+            if not eventos:
+                return enviados
+            cuerpo = json.dumps(construir_actualizacion(eventos), ensure_ascii=False).encode("utf-8")
+            solicitud = urllib.request.Request(self.url, data=cuerpo, method="PATCH",
+                                               headers={"Content-Type": "application/json"})
+            inicio = time.monotonic()
+            try:
+                with urllib.request.urlopen(solicitud, timeout=15) as respuesta:
+                    respuesta.read()
+            except (urllib.error.URLError, OSError):
+                if self.metricas is not None:
+                    self.metricas.incrementar("subidas_firebase_total", resultado="error")
+                raise
+            self.diario.marcar_enviados(evento[0] for evento in eventos)
+            enviados += len(eventos)
+            if self.metricas is not None:
+                self.metricas.observar("subida_firebase_segundos", time.monotonic() - inicio)
+                self.metricas.incrementar("subidas_firebase_total", resultado="ok")
+                self.metricas.incrementar("eventos_subidos_total", len(eventos))
+
+    def detener(self):
+        self._detener.set()
+        if self.is_alive():
+            self.join(timeout=5)
+
+    def run(self):
+        # El primer intento es inmediato para reenviar lo que quedó pendiente antes de un reinicio
+        while True:
+            try:
+                self.sincronizar()
+                self.ultimo_error = None
+            except (urllib.error.URLError, OSError) as e:
+                self.ultimo_error = str(e)
+            if self._detener.wait(self.intervalo):
+                break
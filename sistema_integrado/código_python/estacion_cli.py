@@ -0,0 +1,356 @@
+# Estación lectora sin interfaz gráfica: órdenes por stdin, socket local o cola de archivos
+#
+# Usa las mismas piezas que la interfaz gráfica (gestor_estaciones, diario_eventos,
+# cache_etiquetas, metricas) sin importar Tkinter, para correr en un equipo sin pantalla
+# o para manejar las estaciones desde otro programa. Cada orden es una línea de texto:
+#
+#   TRACK                              comando para la primera estación conectada
+#   WRITE Metanol,1,Merck,...          WRITE con los datos a grabar
+#   {"comando": "TRACK", "estacion": "COM8", "continuo": true, "id": "escaneo1"}
+#   {"cancelar": "escaneo1"}           deja de volver a armar un comando continuo y corta su espera
+#   ESTACIONES                         lista las estaciones conectadas
+#
+# Cada resultado se escribe como una línea JSON por stdout (o en --salida) y además se
+# devuelve por donde llegó la orden: al cliente del socket o, en la cola de archivos, en
+# procesados/<archivo>.jsonl.
+#
+# Ejemplos:
+#   echo TRACK | python estacion_cli.py --puertos COM8
+#   python estacion_cli.py --puertos /dev/ttyUSB0 --socket 8765 --eventos
+#   python estacion_cli.py --cola ordenes   (procesa los archivos *.cmd que aparezcan)
+
+import argparse
+import json
+import math
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+from cache_etiquetas import CacheEtiquetas
+from comunicacion_serial import Comando
+from diario_eventos import DiarioEventos, SincronizadorFirebase
+from gestor_estaciones import GestorEstaciones
+from metricas import Metricas, ServidorMetricas
+from protocolo_esp32 import DEFINICIONES, SIN_ETIQUETA
+
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _validar_json(orden):
+    """Tipos de los campos de una orden JSON: un valor inesperado no debe llegar al hilo serial."""
+    for clave in ("id", "cancelar"):
+        if clave in orden and not (isinstance(orden[clave], str) or _es_numero(orden[clave])):
+            raise ValueError(f"'{clave}' debe ser un texto o un número")
+    if orden.get("estacion") is not None and not isinstance(orden["estacion"], str):
+        raise ValueError("'estacion' debe ser un texto")
+    if orden.get("datos") is not None and not isinstance(orden["datos"], str):
+        raise ValueError("'datos' debe ser un texto")
+    timeout = orden.get("timeout")
+    if timeout is not None and not (_es_numero(timeout) and 0 < timeout < math.inf):
+        raise ValueError("'timeout' debe ser un número de segundos mayor que cero")
+    if orden.get("continuo") and orden.get("id") is None:
+        raise ValueError("Un comando continuo necesita un 'id' para poder cancelarlo")
+
+
+def interpretar_orden(linea):
+    """Convierte una línea de texto o JSON en un diccionario de orden; None si está vacía."""
+    linea = linea.strip()
+    if not linea:
+        return None
+    if linea.startswith("{"):
+        try:
+            orden = json.loads(linea)
+        except ValueError as e:
+            raise ValueError(f"JSON no válido: {e}")
+        if not isinstance(orden, dict) or not ("comando" in orden or "cancelar" in orden):
+            raise ValueError("Se esperaba un objeto con 'comando' o 'cancelar'")
+        _validar_json(orden)
+    elif linea.upper() in DEFINICIONES or linea.upper() == "ESTACIONES":
+        orden = {"comando": linea.upper()}
+    else:
+        nombre, _, datos = linea.partition(" ")
+        orden = {"comando": nombre.upper(), "datos": datos.strip()}
+
+    if "comando" in orden:
+        orden["comando"] = str(orden["comando"]).upper()
+        if orden["comando"] != "ESTACIONES" and orden["comando"] not in DEFINICIONES:
+            raise ValueError(f"Comando desconocido: {orden['comando']}")
+        if orden["comando"] == "WRITE" and not orden.get("datos"):
+            raise ValueError("WRITE necesita los datos a grabar")
+        if orden["comando"] != "WRITE" and orden.get("datos"):
+            raise ValueError(f"{orden['comando']} no lleva datos")
+    return orden
+
+
+def resultado_a_dict(estacion, resultado, id_orden=None):
+    return {
+        "tipo": "resultado", "id": id_orden, "estacion": estacion, "comando": resultado.nombre,
+        "exito": resultado.exito, "motivo": resultado.motivo, "firebase_ok": resultado.firebase_ok,
+        "delegado": resultado.delegado, "duracion": round(resultado.duracion or 0.0, 4),
+        "campos": resultado.campos, "marca_tiempo": time.time(),
+    }
+
+
+class ServicioEstacion:
+    """Ejecuta órdenes de varias fuentes con un GestorEstaciones y publica los resultados.
+
+    Las fuentes (stdin, socket, cola de archivos) llaman a `ordenar` desde sus propios
+    hilos; `atender` vacía la cola de salida del gestor, como procesar_cola_serial en la
+    interfaz gráfica, y debe llamarse en un bucle desde un único hilo.
+    """
+
+    def __init__(self, gestor, salida=None, eventos=False):
+        self.gestor = gestor
+        self.salida = salida or sys.stdout
+        self.eventos = eventos  # Publicar también cada línea interpretada del ESP32
+        self._bloqueo = threading.Lock()
+        self._pendientes = set()  # Comandos enviados que todavía no terminaron
+        self._continuos = {}      # id de la orden -> Comando continuo armado
+
+    @property
+    def ocupado(self):
+        with self._bloqueo:
+            return bool(self._pendientes)
+
+    def emitir(self, mensaje, responder=None):
+        linea = json.dumps(mensaje, ensure_ascii=False)
+        with self._bloqueo:
+            self.salida.write(linea + "\n")
+            self.salida.flush()
+        if responder is not None:
+            try:
+                responder(linea)
+            except OSError:
+                pass  # El cliente ya se desconectó: el resultado quedó igual en la salida
+
+    def ordenar(self, linea, responder=None):
+        """Interpreta y ejecuta una orden; las respuestas se envían también a `responder`."""
+        try:
+            orden = interpretar_orden(linea)
+        except ValueError as e:
+            self.emitir({"tipo": "rechazado", "orden": linea.strip(), "motivo": str(e)}, responder)
+            return
+        if orden is None:
+            return
+
+        if "cancelar" in orden:
+            with self._bloqueo:
+                comando = self._continuos.pop(orden["cancelar"], None)
+            if comando is not None:
+                comando.cancelar()
+            self.emitir({"tipo": "cancelado", "id": orden["cancelar"], "encontrado": comando is not None},
+                        responder)
+            return
+        if orden["comando"] == "ESTACIONES":
+            self.emitir({"tipo": "estaciones", "estaciones": self.gestor.nombres}, responder)
+            return
+
+        estacion = orden.get("estacion") or (self.gestor.nombres[0] if self.gestor.nombres else None)
+        if estacion not in self.gestor.estaciones:
+            self.emitir({"tipo": "rechazado", "orden": linea.strip(),
+                         "motivo": f"Estación no conectada: {estacion}"}, responder)
+            return
+
+        id_orden = orden.get("id")
+        continuo = bool(orden.get("continuo"))
+
+        def al_terminar(resultado):
+            # En un comando continuo, "sin etiqueta" solo significa que se vuelve a armar
+            if not (continuo and resultado.motivo == SIN_ETIQUETA and comando.activo):
+                self.emitir(resultado_a_dict(estacion, resultado, id_orden), responder)
+            if not (continuo and comando.activo):
+                with self._bloqueo:
+                    self._pendientes.discard(comando)
+
+        comando = Comando(orden["comando"], datos=orden.get("datos") or None, al_terminar=al_terminar,
+                          timeout=orden.get("timeout"), continuo=continuo)
+        with self._bloqueo:
+            self._pendientes.add(comando)
+            if continuo and id_orden is not None:
+                self._continuos[id_orden] = comando
+        self.gestor.enviar(estacion, comando)
+
+    def atender(self, timeout=0.1):
+        """Procesa los mensajes de las estaciones que lleguen dentro de `timeout` segundos."""
+        try:
+            mensaje = self.gestor.salida.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            tipo, estacion = mensaje[0], mensaje[1]
+            if tipo == "evento" and self.eventos:
+                evento = mensaje[2]
+                self.emitir({"tipo": "evento", "estacion": estacion, "evento": evento.tipo,
+                             "texto": evento.texto, "campo": evento.campo, "valor": evento.valor})
+            elif tipo == "error":
+                self.emitir({"tipo": "error", "estacion": estacion, "texto": mensaje[2]})
+            elif tipo == "fin":
+                _, _, comando, resultado = mensaje
+                self.gestor.registrar_resultado(estacion, resultado)
+                if comando.al_terminar:
+                    comando.al_terminar(resultado)
+                else:
+                    self.emitir(resultado_a_dict(estacion, resultado))  # DELEGATE ON/OFF, CACHE ON/OFF, BINARY ON
+            try:
+                mensaje = self.gestor.salida.get_nowait()
+            except queue.Empty:
+                return
+
+    def cancelar_todo(self):
+        with self._bloqueo:
+            for comando in self._pendientes:
+                comando.cancelar()
+            self._continuos.clear()
+
+
+def leer_stdin(servicio, terminado):
+    for linea in sys.stdin:
+        servicio.ordenar(linea)
+    terminado.set()
+
+
+def servidor_socket(servicio, puerto, direccion="127.0.0.1"):
+    """Servidor TCP local: cada cliente envía órdenes por línea y recibe sus resultados."""
+
+    class Manejador(socketserver.StreamRequestHandler):
+        def handle(self):
+            bloqueo = threading.Lock()
+
+            def responder(linea):
+                with bloqueo:
+                    self.wfile.write((linea + "\n").encode("utf-8"))
+
+            for linea in self.rfile:
+                servicio.ordenar(linea.decode("utf-8", errors="replace"), responder)
+            # El cliente cerró su lado de escritura: se espera a sus comandos antes de cerrar
+            while servicio.ocupado:
+                time.sleep(0.05)
+
+    servidor = socketserver.ThreadingTCPServer((direccion, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="socket-ordenes").start()
+    return servidor
+
+
+def vigilar_cola(servicio, directorio, detener, intervalo=0.5):
+    """Procesa en orden alfabético los archivos *.cmd que aparecen en `directorio`.
+
+    Para no leer un archivo a medio escribir, quien deja las órdenes debe escribirlas con
+    otro nombre y renombrarlas a .cmd al terminar. Cada archivo leído se mueve a
+    procesados/ y sus resultados se agregan a procesados/<nombre>.jsonl.
+    """
+    procesados = os.path.join(directorio, "procesados")
+    os.makedirs(procesados, exist_ok=True)
+    while not detener.is_set():
+        for nombre in sorted(os.listdir(directorio)):
+            if not nombre.endswith(".cmd"):
+                continue
+            ruta = os.path.join(directorio, nombre)
+            destino = os.path.join(procesados, nombre)
+            try:
+                os.replace(ruta, destino)  # Tomar el archivo antes de leerlo: no se procesa dos veces
+                with open(destino, encoding="utf-8") as archivo:
+                    lineas = archivo.readlines()
+            except OSError:
+                continue
+            ruta_resultados = os.path.join(procesados, nombre[:-4] + ".jsonl")
+
+            def responder(linea, ruta_resultados=ruta_resultados):
+                with open(ruta_resultados, "a", encoding="utf-8") as archivo:
+                    archivo.write(linea + "\n")
+
+            for linea in lineas:
+                servicio.ordenar(linea, responder)
+        detener.wait(intervalo)
+
+
+def main(argumentos=None):
+    inicio = time.monotonic()
+    parser = argparse.ArgumentParser(description="Estación lectora RFID sin interfaz gráfica")
+    parser.add_argument("--puertos", nargs="*", default=[],
+                        help="Puertos de las estaciones (por defecto se detectan automáticamente)")
+    parser.add_argument("--baudios", type=int, default=115200)
+    parser.add_argument("--socket", type=int, default=None, metavar="PUERTO",
+                        help="Aceptar órdenes en un socket TCP local (127.0.0.1)")
+    parser.add_argument("--cola", default=None, metavar="DIRECTORIO",
+                        help="Procesar los archivos *.cmd que aparezcan en el directorio")
+    parser.add_argument("--salida", default=None, help="Agregar los resultados a este archivo en lugar de stdout")
+    parser.add_argument("--eventos", action="store_true", help="Publicar también cada línea del ESP32")
+    parser.add_argument("--diario", default="diario_eventos.db", help="Diario local de escaneos")
+    parser.add_argument("--cache", default="cache_etiquetas.json",
+                        help="Caché de campos fijos de las etiquetas (\"\" para desactivarla)")
+    parser.add_argument("--firebase-url", default="", help="Subir los datos a Firebase desde el equipo")
+    parser.add_argument("--firebase-auth", default="")
+    parser.add_argument("--puerto-metricas", type=int, default=0,
+                        help="Endpoint local de métricas en formato Prometheus (0 = desactivado)")
+    parser.add_argument("--binario", action="store_true",
+                        help="Negociar el protocolo binario con tramas (el firmware anterior sigue en texto)")
+    parser.add_argument("--baudios-binario", type=int, default=None,
+                        help="Velocidad a la que pasa el puerto una vez negociado el protocolo binario")
+    parser.add_argument("--registro", default="eventos_estaciones.log", help="Registro de eventos de las estaciones")
+    args = parser.parse_args(argumentos)
+
+    salida = open(args.salida, "a", encoding="utf-8") if args.salida else sys.stdout
+    metricas = Metricas()
+    if args.puerto_metricas:
+        ServidorMetricas(metricas, args.puerto_metricas).iniciar()
+    diario = DiarioEventos(args.diario)
+    sincronizador = None
+    if args.firebase_url:
+        sincronizador = SincronizadorFirebase(diario, args.firebase_url, args.firebase_auth or None,
+                                              metricas=metricas)
+        sincronizador.start()
+    cache = CacheEtiquetas(args.cache) if args.cache else None
+    gestor = GestorEstaciones(baudios=args.baudios, archivo_registro=args.registro or None, diario=diario,
+                              delegar=bool(args.firebase_url), cache=cache, metricas=metricas,
+                              binario=args.binario, baudios_binario=args.baudios_binario)
+    servicio = ServicioEstacion(gestor, salida, eventos=args.eventos)
+
+    fallidos = gestor.conectar(args.puertos)
+    for puerto in fallidos:
+        servicio.emitir({"tipo": "error", "estacion": puerto, "texto": "No se pudo abrir el puerto"})
+    if not gestor.nombres:
+        servicio.emitir({"tipo": "error", "estacion": None, "texto": "No hay estaciones conectadas"})
+        return 1
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    stdin_cerrado = threading.Event()
+    servidor = servidor_socket(servicio, args.socket) if args.socket is not None else None
+    if args.cola:
+        threading.Thread(target=vigilar_cola, args=(servicio, args.cola, detener), daemon=True,
+                         name="cola-ordenes").start()
+    servicio.emitir({"tipo": "listo", "estaciones": gestor.nombres,
+                     "segundos": round(time.monotonic() - inicio, 3)})
+    threading.Thread(target=leer_stdin, args=(servicio, stdin_cerrado), daemon=True, name="stdin").start()
+
+    # Solo con stdin como fuente, el programa termina al cerrarse la entrada y completarse las órdenes
+    solo_stdin = servidor is None and not args.cola
+    try:
+        while not detener.is_set():
+            servicio.atender()
+            if solo_stdin and stdin_cerrado.is_set() and not servicio.ocupado:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.cancelar_todo()
+        if servidor is not None:
+            servidor.shutdown()
+        gestor.desconectar()
+        if sincronizador is not None:
+            sincronizador.detener()
+        diario.cerrar()
+        if salida is not sys.stdout:
+            salida.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
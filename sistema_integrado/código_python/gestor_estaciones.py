@@ -0,0 +1,118 @@
+# Gestión de varias estaciones lectoras (ESP32) conectadas al mismo equipo
+
+import logging
+import queue
+import time
+
+import serial
+from serial.tools import list_ports
+
+from comunicacion_serial import Comando, TrabajadorSerial
+from metricas import describir_metricas_estaciones
+
+# Fabricantes (VID USB) de los conversores serie habituales en placas ESP32
+VIDS_ESP32 = {
+    0x10C4,  # Silicon Labs CP210x
+    0x1A86,  # WCH CH340/CH9102
+    0x0403,  # FTDI
+    0x303A,  # Espressif (USB nativo)
+}
+
+
+def descubrir_puertos():
+    """Devuelve los puertos serie que parecen corresponder a una placa ESP32."""
+    return sorted(puerto.device for puerto in list_ports.comports() if puerto.vid in VIDS_ESP32)
+
+
+class GestorEstaciones:
+    """Abre N estaciones lectoras, cada una con su propio hilo de E/S.
+
+    Todos los hilos publican en la misma cola de salida; cada mensaje lleva como
+    segundo elemento el nombre de la estación que lo originó. Los resultados de todas
+    las estaciones se registran además en un archivo de eventos común.
+
+    Con un diario de eventos y `delegar=True`, al conectar se pide a cada estación que
+    deje la subida a Firebase a cargo del equipo (ver diario_eventos); si no, se le envía
+    DELEGATE OFF, porque el ESP32 conserva el modo de una sesión anterior hasta reiniciarse.
+    Con un inventario (ver inventario), cada resultado exitoso actualiza además el reactivo
+    leído. Con una
+    caché de etiquetas (ver cache_etiquetas), al conectar se activa en cada estación el
+    modo en que TRACK omite los bloques fijos de las etiquetas ya conocidas; sin ella se
+    envía CACHE OFF, por el mismo motivo que DELEGATE OFF. Con un
+    registro de métricas (ver metricas), cada estación registra en él sus tiempos y contadores.
+
+    Con `binario=True`, al conectar se negocia con cada estación el protocolo binario (ver
+    protocolo_binario), opcionalmente a `baudios_binario`; si el firmware no lo admite, la
+    estación sigue en modo texto.
+    """
+
+    def __init__(self, salida=None, baudios=115200, archivo_registro="eventos_estaciones.log",
+                 diario=None, delegar=False, inventario=None, cache=None, metricas=None,
+                 binario=False, baudios_binario=None):
+        self.salida = salida if salida is not None else queue.Queue()
+        self.baudios = baudios
+        self.diario = diario
+        self.delegar = delegar
+        self.inventario = inventario
+        self.cache = cache
+        self.metricas = metricas
+        self.binario = binario
+        self.baudios_binario = baudios_binario
+        if metricas is not None:
+            describir_metricas_estaciones(metricas)
+        self.estaciones = {}  # Nombre del puerto -> TrabajadorSerial
+        self.registro = logging.getLogger("estaciones")
+        if archivo_registro and not self.registro.handlers:
+            manejador = logging.FileHandler(archivo_registro, encoding="utf-8", delay=True)
+            manejador.setFormatter(logging.Formatter("%(asctime)s [%(estacion)s] %(message)s"))
+            self.registro.addHandler(manejador)
+            self.registro.setLevel(logging.INFO)
+            self.registro.propagate = False
+
+    def conectar(self, puertos=None):
+        """Abre los puertos indicados (o los descubiertos) y devuelve los que fallaron."""
+        fallidos = []
+        for puerto in puertos or descubrir_puertos():
+            if puerto in self.estaciones:
+                continue
+            try:
+                ser = serial.Serial(puerto, self.baudios, timeout=0.1)
+            except (serial.SerialException, OSError):
+                fallidos.append(puerto)
+                continue
+            trabajador = TrabajadorSerial(ser, self.salida, estacion=puerto, diario=self.diario, cache=self.cache,
+                                         metricas=self.metricas, baudios_binario=self.baudios_binario)
+            trabajador.start()
+            if self.binario:
+                trabajador.enviar(Comando("BINARY ON"))  # Primero, para que el resto ya viaje en tramas
+            # Siempre explícito: sin diario no hay quien suba lo delegado
+            trabajador.enviar(Comando("DELEGATE ON" if self.diario is not None and self.delegar else "DELEGATE OFF"))
+            trabajador.enviar(Comando("CACHE ON" if self.cache is not None else "CACHE OFF"))
+            self.estaciones[puerto] = trabajador
+        return fallidos
+
+    def desconectar(self):
+        """Detiene todos los hilos y cierra los puertos."""
+        for trabajador in self.estaciones.values():
+            trabajador.detener()
+            if trabajador.ser.is_open:
+                trabajador.ser.close()
+        self.estaciones.clear()
+
+    def enviar(self, estacion, comando):
+        """Envía un comando a una estación concreta."""
+        self.estaciones[estacion].enviar(comando)
+
+    def registrar_resultado(self, estacion, resultado):
+        """Guarda el resultado de un comando en el registro de eventos común."""
+        if self.inventario is not None and resultado.exito:
+            self.inventario.actualizar(resultado.campos, resultado.nombre, time.time())
+        self.registro.info(
+            "%s %s motivo=%s uid=%s duracion=%.2fs", resultado.nombre,
+            "OK" if resultado.exito else "FALLO", resultado.motivo,
+            resultado.campos.get("UID", "-"), resultado.duracion or 0.0,
+            extra={"estacion": estacion})
+
+    @property
+    def nombres(self):
+        return list(self.estaciones)
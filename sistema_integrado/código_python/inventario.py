@@ -0,0 +1,178 @@
+# Inventario de reactivos en memoria, indexado por UID, lote, vencimiento y producto
+
+import calendar
+import datetime
+import json
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, namedtuple
+
+# Registro de uso (TRACK): momento y lecturas de los sensores (None si no hubo lectura)
+Uso = namedtuple("Uso", ["marca_tiempo", "temperatura", "humedad", "peso"])
+
+
+def interpretar_fecha(texto, fin_de_mes=False):
+    """Convierte "d/m/aaaa", "m/aaaa" o "aaaa-mm-dd" en una fecha; None si no se reconoce.
+
+    Con `fin_de_mes`, una fecha sin día ("12/2027") corresponde al último día del mes,
+    como se interpreta un vencimiento.
+    """
+    texto = (texto or "").strip()
+    try:
+        if "-" in texto:
+            return datetime.date.fromisoformat(texto)
+        partes = [int(parte) for parte in texto.split("/")]
+        if len(partes) == 3:
+            dia, mes, anio = partes
+        elif len(partes) == 2:
+            mes, anio = partes
+            dia = calendar.monthrange(anio, mes)[1] if fin_de_mes else 1
+        else:
+            return None
+        if anio < 100:
+            anio += 2000
+        return datetime.date(anio, mes, dia)
+    except ValueError:
+        return None
+
+
+def _numero(texto):
+    try:
+        return float(texto)
+    except (TypeError, ValueError):
+        return None
+
+
+class Reactivo:
+    """Datos de una etiqueta: campos estáticos, alta/baja e historial de usos."""
+
+    __slots__ = ("uid", "producto", "numero", "marca", "codigo", "presentacion", "lote",
+                 "vencimiento", "fecha_vencimiento", "alta", "baja", "usos")
+
+    def __init__(self, uid):
+        self.uid = uid
+        self.producto = self.numero = self.marca = self.codigo = ""
+        self.presentacion = self.lote = self.vencimiento = ""
+        self.fecha_vencimiento = None  # Vencimiento interpretado como fecha (si se pudo)
+        self.alta = None
+        self.baja = None
+        self.usos = []
+
+    @property
+    def activo(self):
+        """Un reactivo sigue en stock mientras no tenga fecha de baja."""
+        return self.baja is None
+
+    def __repr__(self):
+        return f"Reactivo({self.uid!r}, {self.producto!r}, lote={self.lote!r}, vencimiento={self.vencimiento!r})"
+
+
+# Campos que imprime el ESP32 -> atributos de Reactivo que se copian tal cual
+_ATRIBUTOS = {"Producto": "producto", "Número": "numero", "Marca": "marca", "Código": "codigo",
+              "Presentación": "presentacion", "Lote": "lote", "Vencimiento": "vencimiento"}
+
+
+class Inventario:
+    """Reactivos leídos por las estaciones, con índices para consultas rápidas.
+
+    - por lote: diccionario lote -> UIDs (O(1)).
+    - por vencimiento: lista ordenada de (fecha, UID) mantenida con bisect, de modo que
+      "qué vence en los próximos 30 días" es una búsqueda binaria (O(log n + k)).
+    - stock por producto: contador de reactivos activos, actualizado en cada cambio.
+
+    Se alimenta con los campos de cada Resultado (ver protocolo_esp32) y puede
+    reconstruirse al iniciar a partir del diario de eventos.
+    """
+
+    def __init__(self):
+        self.reactivos = {}                # UID -> Reactivo
+        self._por_lote = defaultdict(set)  # Lote -> UIDs
+        self._vencimientos = []            # (fecha_vencimiento, UID), ordenada
+        self._stock = Counter()            # Producto -> reactivos activos
+
+    def __len__(self):
+        return len(self.reactivos)
+
+    def __contains__(self, uid):
+        return uid in self.reactivos
+
+    def get(self, uid):
+        return self.reactivos.get(uid)
+
+    def _quitar_indices(self, reactivo):
+        if reactivo.lote:
+            self._por_lote[reactivo.lote].discard(reactivo.uid)
+            if not self._por_lote[reactivo.lote]:
+                del self._por_lote[reactivo.lote]
+        if reactivo.fecha_vencimiento is not None:
+            clave = (reactivo.fecha_vencimiento, reactivo.uid)
+            i = bisect_left(self._vencimientos, clave)
+            if i < len(self._vencimientos) and self._vencimientos[i] == clave:
+                del self._vencimientos[i]
+        if reactivo.activo and reactivo.producto:
+            self._stock[reactivo.producto] -= 1
+            if not self._stock[reactivo.producto]:
+                del self._stock[reactivo.producto]
+
+    def _agregar_indices(self, reactivo):
+        if reactivo.lote:
+            self._por_lote[reactivo.lote].add(reactivo.uid)
+        if reactivo.fecha_vencimiento is not None:
+            insort(self._vencimientos, (reactivo.fecha_vencimiento, reactivo.uid))
+        if reactivo.activo and reactivo.producto:
+            self._stock[reactivo.producto] += 1
+
+    def actualizar(self, campos, comando=None, marca_tiempo=None):
+        """Incorpora los campos leídos de una etiqueta y devuelve su Reactivo.
+
+        Solo se modifican los campos presentes; un TRACK agrega además un registro de uso.
+        """
+        uid = campos.get("UID")
+        if not uid:
+            return None
+        reactivo = self.reactivos.get(uid)
+        if reactivo is None:
+            reactivo = self.reactivos[uid] = Reactivo(uid)
+        else:
+            self._quitar_indices(reactivo)
+
+        for campo, atributo in _ATRIBUTOS.items():
+            if campo in campos:
+                setattr(reactivo, atributo, campos[campo])
+        if "Vencimiento" in campos:
+            reactivo.fecha_vencimiento = interpretar_fecha(campos["Vencimiento"], fin_de_mes=True)
+        if campos.get("Alta"):
+            reactivo.alta = interpretar_fecha(campos["Alta"])
+        if "Baja" in campos:
+            reactivo.baja = interpretar_fecha(campos["Baja"]) if campos["Baja"] else None
+        if comando == "TRACK":
+            reactivo.usos.append(Uso(marca_tiempo, _numero(campos.get("Temperatura")),
+                                     _numero(campos.get("Humedad")), _numero(campos.get("Peso"))))
+
+        self._agregar_indices(reactivo)
+        return reactivo
+
+    def cargar_diario(self, diario):
+        """Reconstruye el inventario con todos los eventos guardados en el diario."""
+        for marca_tiempo, comando, campos in diario.recorrer():
+            self.actualizar(json.loads(campos), comando, marca_tiempo)
+
+    def por_lote(self, lote):
+        return [self.reactivos[uid] for uid in sorted(self._por_lote.get(lote, ()))]
+
+    def vencen_antes(self, fecha, solo_activos=True):
+        """Reactivos con vencimiento hasta `fecha` inclusive, del más próximo al más lejano."""
+        # (fecha + 1 día,) es menor que cualquier par de ese día: corta justo después de `fecha`
+        fin = bisect_left(self._vencimientos, (fecha + datetime.timedelta(days=1),))
+        reactivos = (self.reactivos[uid] for _, uid in self._vencimientos[:fin])
+        return [r for r in reactivos if r.activo or not solo_activos]
+
+    def por_vencer(self, dias=30, hoy=None, solo_activos=True):
+        """Reactivos que vencen dentro de `dias` días (incluye los ya vencidos)."""
+        hoy = hoy or datetime.date.today()
+        return self.vencen_antes(hoy + datetime.timedelta(days=dias), solo_activos)
+
+    def stock(self, producto=None):
+        """Cantidad de reactivos activos de un producto, o {producto: cantidad} de todos."""
+        if producto is not None:
+            return self._stock.get(producto, 0)
+        return dict(sorted(self._stock.items()))
@@ -0,0 +1,251 @@
+# Métricas de rendimiento de las estaciones: tiempos por fase, bytes, reintentos y timeouts
+#
+# Los hilos seriales registran aquí cada comando (ver comunicacion_serial) y el
+# sincronizador cada lote subido a Firebase (ver diario_eventos). Las métricas se pueden
+# consultar de dos formas, que pueden usarse a la vez:
+#
+# - ServidorMetricas: endpoint HTTP local en formato de texto de Prometheus
+#   (http://127.0.0.1:9108/metrics) y en JSON (/metrics.json).
+# - RegistroMetricas: una línea JSON por intervalo en un archivo con rotación.
+
+import json
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# Límites superiores (en segundos) de los intervalos de los histogramas de tiempos
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+PREFIJO = "rfid_"
+
+
+class Histograma:
+    """Cantidad de observaciones por intervalo, con su suma, como los histogramas de Prometheus."""
+
+    __slots__ = ("limites", "conteos", "cantidad", "suma")
+
+    def __init__(self, limites=LIMITES):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)  # El último intervalo es +Inf
+        self.cantidad = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.limites, valor)] += 1  # Primer límite >= valor
+        self.cantidad += 1
+        self.suma += valor
+
+    def acumulados(self):
+        """Pares (límite, observaciones <= límite), terminando en +Inf."""
+        total, pares = 0, []
+        for limite, conteo in zip(self.limites + (math.inf,), self.conteos):
+            total += conteo
+            pares.append((limite, total))
+        return pares
+
+    def percentil(self, p):
+        """Estimación del percentil p (0-100), interpolando dentro del intervalo que lo contiene."""
+        if not self.cantidad:
+            return None
+        objetivo = p / 100 * self.cantidad
+        anterior_limite, anterior_total = 0.0, 0
+        for limite, total in self.acumulados():
+            if total >= objetivo:
+                if math.isinf(limite):
+                    return anterior_limite  # Por encima del último límite no hay más resolución
+                fraccion = (objetivo - anterior_total) / (total - anterior_total)
+                return anterior_limite + (limite - anterior_limite) * fraccion
+            anterior_limite, anterior_total = limite, total
+        return anterior_limite
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas_prometheus(etiquetas, extra=None):
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + "}"
+
+
+def _limite_texto(limite):
+    return "+Inf" if math.isinf(limite) else repr(float(limite))
+
+
+class Metricas:
+    """Registro de contadores e histogramas con etiquetas (estación, comando, fase...).
+
+    Es seguro usarlo desde varios hilos: cada operación toma un único bloqueo durante
+    unos pocos microsegundos, así que puede llamarse en cada línea del puerto serial.
+    """
+
+    def __init__(self, limites=LIMITES):
+        self.limites = limites
+        self.inicio = time.time()
+        self._contadores = {}   # (nombre, etiquetas) -> valor
+        self._histogramas = {}  # (nombre, etiquetas) -> Histograma
+        self._ayuda = {}        # nombre -> descripción
+        self._bloqueo = threading.Lock()
+
+    def describir(self, nombre, ayuda):
+        self._ayuda[nombre] = ayuda
+
+    def incrementar(self, nombre, cantidad=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._bloqueo:
+            self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._bloqueo:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(self.limites)
+            histograma.observar(valor)
+
+    def contador(self, nombre, **etiquetas):
+        """Valor actual de un contador (0 si nunca se incrementó)."""
+        with self._bloqueo:
+            return self._contadores.get((nombre, tuple(sorted(etiquetas.items()))), 0)
+
+    def histograma(self, nombre, **etiquetas):
+        """Histograma de una métrica, o None si no tiene observaciones."""
+        with self._bloqueo:
+            return self._histogramas.get((nombre, tuple(sorted(etiquetas.items()))))
+
+    def texto_prometheus(self):
+        """Todas las métricas en el formato de exposición de texto de Prometheus."""
+        with self._bloqueo:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((clave, h.acumulados(), h.cantidad, h.suma)
+                                 for clave, h in self._histogramas.items())
+        lineas, vistos = [], set()
+
+        def encabezado(nombre, tipo):
+            if nombre not in vistos:
+                vistos.add(nombre)
+                if nombre in self._ayuda:
+                    lineas.append(f"# HELP {PREFIJO}{nombre} {self._ayuda[nombre]}")
+                lineas.append(f"# TYPE {PREFIJO}{nombre} {tipo}")
+
+        for (nombre, etiquetas), valor in contadores:
+            encabezado(nombre, "counter")
+            lineas.append(f"{PREFIJO}{nombre}{_etiquetas_prometheus(etiquetas)} {valor}")
+        for (nombre, etiquetas), acumulados, cantidad, suma in histogramas:
+            encabezado(nombre, "histogram")
+            for limite, total in acumulados:
+                extra = ("le", _limite_texto(limite))
+                lineas.append(f"{PREFIJO}{nombre}_bucket{_etiquetas_prometheus(etiquetas, extra)} {total}")
+            lineas.append(f"{PREFIJO}{nombre}_sum{_etiquetas_prometheus(etiquetas)} {suma}")
+            lineas.append(f"{PREFIJO}{nombre}_count{_etiquetas_prometheus(etiquetas)} {cantidad}")
+        return "\n".join(lineas) + "\n"
+
+    def instantanea(self):
+        """Estado actual como diccionario serializable en JSON, con percentiles estimados."""
+        with self._bloqueo:
+            contadores = [{"nombre": nombre, "etiquetas": dict(etiquetas), "valor": valor}
+                          for (nombre, etiquetas), valor in sorted(self._contadores.items())]
+            histogramas = []
+            for (nombre, etiquetas), h in sorted(self._histogramas.items()):
+                histogramas.append({
+                    "nombre": nombre, "etiquetas": dict(etiquetas), "cantidad": h.cantidad,
+                    "suma": round(h.suma, 6), "p50": h.percentil(50), "p90": h.percentil(90),
+                    "p99": h.percentil(99),
+                    "intervalos": {_limite_texto(limite): total for limite, total in h.acumulados()},
+                })
+        return {"marca_tiempo": time.time(), "desde": self.inicio,
+                "contadores": contadores, "histogramas": histogramas}
+
+
+def describir_metricas_estaciones(metricas):
+    """Textos de ayuda de las métricas que registran los hilos seriales y el sincronizador."""
+    metricas.describir("comando_fase_segundos",
+                       "Segundos desde el envío del comando hasta cada fase "
+                       "(escritura, primera_respuesta, etiqueta, firebase, total)")
+    metricas.describir("comandos_total", "Comandos terminados, por motivo de finalización")
+    metricas.describir("timeouts_total", "Comandos terminados por timeout")
+    metricas.describir("reintentos_total", "Comandos continuos que se volvieron a armar sin procesar una etiqueta")
+    metricas.describir("serial_bytes_total", "Bytes transmitidos por el puerto serial, por sentido")
+    metricas.describir("errores_serial_total", "Errores de comunicación con el puerto serial")
+    metricas.describir("tramas_invalidas_total", "Tramas del protocolo binario descartadas por CRC o longitud")
+    metricas.describir("subida_firebase_segundos", "Segundos por lote subido a Firebase desde el equipo")
+    metricas.describir("subidas_firebase_total", "Lotes subidos a Firebase, por resultado")
+    metricas.describir("eventos_subidos_total", "Eventos del diario subidos a Firebase")
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    metricas = None  # Se asigna en la subclase que crea ServidorMetricas
+
+    def do_GET(self):
+        ruta = self.path.split("?")[0]
+        if ruta == "/metrics":
+            cuerpo = self.metricas.texto_prometheus().encode("utf-8")
+            tipo = "text/plain; version=0.0.4; charset=utf-8"
+        elif ruta == "/metrics.json":
+            cuerpo = json.dumps(self.metricas.instantanea(), ensure_ascii=False).encode("utf-8")
+            tipo = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass  # Sin una línea en la consola por cada consulta
+
+
+class ServidorMetricas:
+    """Endpoint HTTP local con las métricas, atendido en un hilo aparte.
+
+    Por defecto escucha solo en 127.0.0.1; con puerto 0 se elige uno libre (ver `puerto`).
+    """
+
+    def __init__(self, metricas, puerto=9108, direccion="127.0.0.1"):
+        manejador = type("Manejador", (_ManejadorMetricas,), {"metricas": metricas})
+        self._servidor = ThreadingHTTPServer((direccion, puerto), manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True, name="servidor-metricas").start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+class RegistroMetricas(threading.Thread):
+    """Hilo que agrega cada `intervalo` segundos una instantánea JSON a un archivo con rotación."""
+
+    def __init__(self, metricas, ruta="metricas.jsonl", intervalo=60, max_bytes=5_000_000, copias=5):
+        super().__init__(daemon=True, name="registro-metricas")
+        self.metricas = metricas
+        self.intervalo = intervalo
+        self._manejador = RotatingFileHandler(ruta, maxBytes=max_bytes, backupCount=copias,
+                                              encoding="utf-8", delay=True)
+        self._detener = threading.Event()
+
+    def escribir(self):
+        linea = json.dumps(self.metricas.instantanea(), ensure_ascii=False)
+        self._manejador.emit(logging.makeLogRecord({"msg": linea}))
+
+    def detener(self):
+        self._detener.set()
+        if self.is_alive():
+            self.join(timeout=5)
+        self._manejador.close()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            self.escribir()
+        self.escribir()  # La última instantánea, al cerrar el programa
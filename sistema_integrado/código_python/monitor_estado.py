@@ -0,0 +1,77 @@
+# Monitor de estado de la interfaz gráfica con tamaño acotado y actualizaciones por lotes
+
+import logging
+import time
+import tkinter as tk
+from logging.handlers import RotatingFileHandler
+
+
+class MonitorEstado:
+    """Muestra las últimas `max_lineas` líneas en un widget de texto de solo lectura.
+
+    El texto agregado se acumula y se vuelca al widget como mucho una vez cada
+    `intervalo_ms` (una sola inserción por lote, en lugar de una por línea); las líneas
+    más antiguas que superan el límite se eliminan del principio. De este modo el costo
+    de cada actualización no crece a lo largo de un turno. El historial completo, con la
+    hora de cada lote, se guarda en un archivo con rotación.
+
+    Solo debe usarse desde el hilo de Tkinter.
+    """
+
+    def __init__(self, widget, max_lineas=2000, intervalo_ms=100, archivo_historial="historial_monitor.log",
+                 max_bytes=5_000_000, copias=5):
+        self.widget = widget
+        self.max_lineas = max_lineas
+        self.intervalo_ms = intervalo_ms
+        self._pendiente = []
+        self._programado = False
+        self._historial = None
+        if archivo_historial:
+            self._historial = RotatingFileHandler(archivo_historial, maxBytes=max_bytes, backupCount=copias,
+                                                  encoding="utf-8", delay=True)
+
+    def agregar(self, texto):
+        """Agrega texto al monitor; se muestra en el próximo volcado."""
+        self._pendiente.append(texto)
+        if not self._programado:
+            self._programado = True
+            self.widget.after(self.intervalo_ms, self.volcar)
+
+    def volcar(self):
+        """Inserta de una vez todo el texto pendiente y recorta las líneas que sobran."""
+        self._programado = False
+        if not self._pendiente:
+            return
+        texto = "".join(self._pendiente)
+        self._pendiente.clear()
+        self._guardar_historial(texto)
+
+        # Solo se sigue el final si el usuario no se desplazó hacia arriba para leer
+        al_final = self.widget.yview()[1] >= 1.0
+        self.widget.config(state=tk.NORMAL)
+        self.widget.insert(tk.END, texto)
+        # "end-1c" es el último carácter antes del salto de línea implícito de Tk: si el texto
+        # termina en "\n" (lo normal) está al principio de una línea vacía, que no se cuenta
+        linea, columna = map(int, self.widget.index("end-1c").split("."))
+        sobrantes = linea - (columna == 0) - self.max_lineas
+        if sobrantes > 0:
+            self.widget.delete("1.0", f"{sobrantes + 1}.0")
+        self.widget.config(state=tk.DISABLED)
+        if al_final:
+            self.widget.see(tk.END)
+
+    def _guardar_historial(self, texto):
+        if self._historial is None:
+            return
+        hora = time.strftime("%Y-%m-%d %H:%M:%S")
+        lineas = "\n".join(f"{hora} {linea}" for linea in texto.splitlines() if linea.strip())
+        if lineas:
+            self._historial.emit(logging.makeLogRecord({"msg": lineas}))
+
+    def cerrar(self):
+        """Guarda en el historial lo que quedó pendiente (el widget puede ya no existir)."""
+        if self._pendiente:
+            self._guardar_historial("".join(self._pendiente))
+            self._pendiente.clear()
+        if self._historial is not None:
+            self._historial.close()
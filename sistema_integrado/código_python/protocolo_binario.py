@@ -0,0 +1,262 @@
+# Protocolo binario con tramas entre el equipo y el ESP32 (opcional, se negocia al conectar)
+#
+# Trama:  SYNC (0xA5) | LONGITUD | CÓDIGO | DATOS | CRC16
+#   LONGITUD cuenta el código y los datos (1 a 255 bytes). El CRC es CRC-16/CCITT-FALSE
+#   (polinomio 0x1021, valor inicial 0xFFFF) de LONGITUD, CÓDIGO y DATOS, en big-endian.
+#
+# Equipo -> ESP32: un código por comando (COMANDOS), los datos de WRITE y la respuesta
+# KNOWN/UNKNOWN de la caché de etiquetas.
+#
+# ESP32 -> equipo: cada línea que el sketch imprimiría en modo texto viaja como
+#   - una línea fija (LINEAS): solo el código;
+#   - un campo "Nombre: valor" (CAMPOS_BINARIOS): código de campo y valor;
+#   - una línea con un prefijo conocido (PREFIJOS): código del prefijo y el resto;
+#   - cualquier otra línea: TEXTO con la línea completa.
+# El equipo obtiene cada Evento directamente del código, sin buscar subcadenas.
+#
+# Negociación: el equipo envía "BINARY ON" (o "BINARY ON <baudios>") en modo texto. Un
+# firmware con soporte responde "Protocolo binario: activado." y desde entonces responde
+# con tramas (y cambia de velocidad si se pidió); uno anterior no lo reconoce y la
+# comunicación sigue en texto. El ESP32 acepta órdenes en tramas o en texto en todo momento,
+# y el decodificador interpreta como texto lo que llegue fuera de una trama (p. ej. los
+# mensajes de arranque tras un reinicio). "BINARY OFF" vuelve al modo texto y a la velocidad
+# inicial; el equipo lo envía al desconectarse.
+#
+# Las tablas deben tener el mismo orden que en sistema_integrado_con_interfaz_grafica.ino.
+
+from binascii import crc_hqx
+
+from protocolo_esp32 import TEXTO, UID_DETECTADO, Evento, interpretar_campo, interpretar_linea
+
+SYNC = 0xA5
+
+# Equipo -> ESP32
+COMANDOS = {
+    "READ": 0x01, "WRITE": 0x02, "TRACK": 0x03, "OUT": 0x04, "DELEGATE ON": 0x05,
+    "DELEGATE OFF": 0x06, "CACHE ON": 0x07, "CACHE OFF": 0x08, "BINARY OFF": 0x09,
+}
+DATOS = 0x10    # Una línea de texto cualquiera (p. ej. los valores de WRITE)
+KNOWN = 0x11    # KNOWN <uid>
+UNKNOWN = 0x12
+
+# ESP32 -> equipo
+CAMPO_BINARIO = 0x20  # Datos: código del campo y valor
+PREFIJO_BASE = 0x30   # 0x30 + índice en PREFIJOS; datos: el resto de la línea
+LINEA_BASE = 0x40     # 0x40 + índice en LINEAS; sin datos
+TEXTO_BINARIO = 0x7F  # Datos: la línea completa
+
+LINEAS = (
+    "Etiqueta detectada. Verificando campos...",
+    "Etiqueta detectada. Leyendo bloques...",
+    "Etiqueta detectada. Esperando valores...",
+    "No se detectó ninguna etiqueta.",
+    "Datos enviados con éxito.",
+    "Hubo errores al enviar los datos.",
+    "Registro de uso guardado en la nube.",
+    "Datos delegados al equipo.",
+    "Registro de uso delegado al equipo.",
+    "Envío delegado: activado.",
+    "Envío delegado: desactivado.",
+    "Caché de etiquetas: activada.",
+    "Caché de etiquetas: desactivada.",
+    "Datos fijos omitidos (etiqueta conocida).",
+    "Lectura completa.",
+    "Datos guardados exitosamente.",
+    "Error al programar la etiqueta.",
+    "Error: UID inválido.",
+    "UID inválido",
+    "Protocolo binario: activado.",
+    "Protocolo binario: desactivado.",
+    "Comando 'READ' recibido. Esperando etiqueta...",
+    "Comando 'TRACK' recibido. Esperando etiqueta...",
+    "Comando 'OUT' recibido. Esperando etiqueta...",
+    "Comando 'WRITE' recibido. Esperando datos...",
+    "Leyendo bloques...",
+    "Datos del Reactivo:",
+    "Datos del reactivo:",
+    "Fecha de alta previamente registrada. Leyendo bloques...",
+    "Fecha de baja previamente registrada. Leyendo bloques...",
+    "Etiqueta conocida: solo se leen alta y baja.",
+    "Campo 'alta' registrado con éxito!",
+    "Campo 'baja' registrado con éxito!",
+    "Campo 'valor' registrado con éxito!",
+    "Error al leer datos del sensor DHT11!",
+    "Error: El HX711 no está listo. Reintentar...",
+    "Autenticación fallida después de varios intentos.",
+)
+
+# En orden de prioridad: el ESP32 usa el primero que coincide
+PREFIJOS = (
+    "UID detectado: ",
+    "Fecha de alta registrada: ",
+    "Fecha de baja registrada: ",
+    "Creando la ruta en Firebase: ",
+    "Error al leer el bloque ",
+    "Error al enviar el peso: ",
+    "Error al enviar ",
+    "Valor vacío para ",
+    "Datos recibidos: ",
+    "Error: El valor ",
+    "Error de autenticación en el bloque ",
+    "Valor ",
+    "Comando '",
+)
+
+CAMPOS_BINARIOS = ("UID", "Producto", "Número", "Alta", "Marca", "Código", "Presentación", "Lote",
+                   "Vencimiento", "Baja", "Temperatura", "Humedad", "Peso")
+
+# Eventos ya interpretados de las líneas fijas y tipo de evento de cada prefijo
+_EVENTOS_LINEAS = tuple(interpretar_linea(linea) for linea in LINEAS)
+_TIPOS_PREFIJOS = tuple(interpretar_linea(prefijo).tipo for prefijo in PREFIJOS)
+_CODIGOS_LINEAS = {linea: LINEA_BASE + i for i, linea in enumerate(LINEAS)}
+
+
+def crc16(datos):
+    return crc_hqx(datos, 0xFFFF)
+
+
+def trama(codigo, datos=b""):
+    """Arma una trama con el código y hasta 254 bytes de datos (ValueError si son más)."""
+    if len(datos) > 254:
+        raise ValueError(f"Una trama lleva como máximo 254 bytes de datos ({len(datos)} recibidos)")
+    cuerpo = bytes((len(datos) + 1, codigo)) + datos
+    return bytes((SYNC,)) + cuerpo + crc16(cuerpo).to_bytes(2, "big")
+
+
+def codificar_orden(linea):
+    """Trama de una línea que el equipo enviaría en modo texto (comando, datos o KNOWN/UNKNOWN)."""
+    if linea in COMANDOS:
+        return trama(COMANDOS[linea])
+    if linea.startswith("KNOWN "):
+        return trama(KNOWN, linea[6:].encode("utf-8"))
+    if linea == "UNKNOWN":
+        return trama(UNKNOWN)
+    return trama(DATOS, linea.encode("utf-8"))
+
+
+def codificar_linea(linea):
+    """Trama de una línea que el ESP32 imprimiría en modo texto (como lo hace el sketch)."""
+    codigo = _CODIGOS_LINEAS.get(linea)
+    if codigo is not None:
+        return trama(codigo)
+    nombre, separador, valor = linea.partition(": ")
+    if separador and nombre in CAMPOS_BINARIOS:
+        return trama(CAMPO_BINARIO, bytes((CAMPOS_BINARIOS.index(nombre),)) + valor.encode("utf-8"))
+    for i, prefijo in enumerate(PREFIJOS):
+        if linea.startswith(prefijo):
+            return trama(PREFIJO_BASE + i, linea[len(prefijo):].encode("utf-8"))
+    return trama(TEXTO_BINARIO, linea.encode("utf-8"))
+
+
+def evento_de_trama(codigo, datos):
+    """Convierte el código y los datos de una trama del ESP32 en un Evento."""
+    if LINEA_BASE <= codigo < LINEA_BASE + len(LINEAS):
+        return _EVENTOS_LINEAS[codigo - LINEA_BASE]
+    texto = datos.decode("utf-8", errors="replace")
+    if codigo == CAMPO_BINARIO and datos and datos[0] < len(CAMPOS_BINARIOS):
+        return interpretar_campo(CAMPOS_BINARIOS[datos[0]], texto[1:])
+    if PREFIJO_BASE <= codigo < PREFIJO_BASE + len(PREFIJOS):
+        indice = codigo - PREFIJO_BASE
+        tipo = _TIPOS_PREFIJOS[indice]
+        if tipo == UID_DETECTADO:
+            return Evento(tipo, PREFIJOS[indice] + texto, "UID", texto)
+        return Evento(tipo, PREFIJOS[indice] + texto, None, None)
+    if codigo == TEXTO_BINARIO:
+        return interpretar_linea(texto)
+    return Evento(TEXTO, f"Trama desconocida (código 0x{codigo:02x})", None, None)
+
+
+def extraer_trama(buffer):
+    """Busca una trama al comienzo de `buffer`.
+
+    Devuelve (código, datos, consumidos): consumidos es 0 si la trama todavía está
+    incompleta, y código es None si la trama está dañada (solo se consume el SYNC).
+    """
+    if len(buffer) < 2:
+        return None, None, 0
+    longitud = buffer[1]
+    fin = longitud + 4
+    if longitud == 0:
+        return None, None, 1
+    if len(buffer) < fin:
+        return None, None, 0
+    if crc16(bytes(buffer[1:fin - 2])) != int.from_bytes(buffer[fin - 2:fin], "big"):
+        return None, None, 1
+    return buffer[2], bytes(buffer[3:fin - 2]), fin
+
+
+class DecodificadorTramas:
+    """Separa las tramas de los bytes recibidos y las convierte en Eventos.
+
+    Los bytes fuera de una trama se acumulan como texto y cada línea completa se interpreta
+    con interpretar_linea, de modo que un ESP32 que volvió al modo texto se sigue
+    entendiendo. Un byte 0xA5 solo se toma como inicio de trama si la trama que empieza en
+    él tiene el CRC correcto; si no, es parte del texto. Dentro de una línea, un 0xA5 que
+    sigue a un byte no ASCII es parte de un carácter UTF-8 (p. ej. "¥" es C2 A5), así que
+    no se espera a completar la trama que empezaría en él. Una trama dañada se cuenta en
+    `invalidas` y el resto de sus bytes se descarta hasta el próximo fin de línea o la
+    próxima trama válida, sin generar eventos.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._descartando = False  # Dentro de los restos de una trama dañada
+        self._incompleta = None    # Posición del SYNC de una trama que espera más bytes
+        self.invalidas = 0
+
+    def reiniciar(self):
+        self._buffer.clear()
+        self._descartando = False
+        self._incompleta = None
+
+    def alimentar(self, datos):
+        """Agrega los bytes recibidos y devuelve los Eventos que se completaron."""
+        buffer = self._buffer
+        buffer += datos
+        self._incompleta = None
+        eventos = []
+        inicio = busqueda = 0  # Comienzo de la línea actual y desde dónde buscar el próximo SYNC
+        while inicio < len(buffer):
+            fin_linea = buffer.find(b"\n", inicio)
+            sync = buffer.find(SYNC, busqueda, fin_linea if fin_linea != -1 else len(buffer))
+            if sync != -1:
+                codigo, contenido, consumidos = extraer_trama(buffer[sync:sync + 259])
+                if not consumidos and sync > inicio and buffer[sync - 1] >= 0x80:
+                    busqueda = sync + 1  # Byte de continuación UTF-8
+                    continue
+                if not consumidos:
+                    self._incompleta = sync - inicio
+                    break  # Trama incompleta: se espera el resto
+                if codigo is not None:
+                    eventos.append(evento_de_trama(codigo, contenido))  # Lo anterior eran bytes sueltos
+                    inicio = busqueda = sync + consumidos
+                    self._descartando = False
+                    continue
+                if sync == inicio and not self._descartando:
+                    self.invalidas += 1
+                    self._descartando = True
+                busqueda = sync + 1  # Este 0xA5 no inicia una trama
+                continue
+            if fin_linea == -1:
+                break  # Línea de texto incompleta
+            linea = buffer[inicio:fin_linea].decode("utf-8", errors="replace").strip()
+            if linea and not self._descartando:
+                eventos.append(interpretar_linea(linea))
+            self._descartando = False
+            inicio = busqueda = fin_linea + 1
+        del buffer[:inicio]
+        return eventos
+
+    def expirar(self):
+        """Indica que no llegaron más bytes: una trama incompleta ya no se va a completar.
+
+        Su 0xA5 deja de tomarse como inicio de trama, para que los bytes que la siguen no
+        queden retenidos esperando. Devuelve los Eventos que se completaron así.
+        """
+        if self._incompleta is None:
+            return []
+        if self._incompleta == 0 and not self._descartando:
+            self.invalidas += 1  # Una trama cortada (p. ej. por un reinicio del ESP32)
+            self._descartando = True
+        self._buffer[self._incompleta] = 0
+        return self.alimentar(b"")
@@ -0,0 +1,202 @@
+# Protocolo de texto del ESP32: interpretación de líneas en eventos tipados
+
+from collections import namedtuple
+
+# Tipos de evento reconocidos en las respuestas del ESP32
+COMANDO_RECIBIDO = "comando_recibido"
+ETIQUETA_DETECTADA = "etiqueta_detectada"
+ESPERANDO_DATOS = "esperando_datos"
+SIN_ETIQUETA = "sin_etiqueta"
+CAMPO = "campo"
+ALTA_REGISTRADA = "alta_registrada"
+BAJA_REGISTRADA = "baja_registrada"
+FIREBASE_OK = "firebase_ok"
+FIREBASE_ERROR = "firebase_error"
+USO_GUARDADO = "uso_guardado"
+FIREBASE_DELEGADO = "firebase_delegado"  # El ESP32 dejó la subida a Firebase al equipo
+USO_DELEGADO = "uso_delegado"
+DELEGACION = "delegacion"  # Respuesta a DELEGATE ON/OFF
+CACHE_ETIQUETAS = "cache_etiquetas"  # Respuesta a CACHE ON/OFF
+UID_DETECTADO = "uid_detectado"  # Con la caché activa: el ESP32 espera KNOWN <uid> o UNKNOWN (TRACK)
+PROTOCOLO_BINARIO = "protocolo_binario"  # Respuesta a BINARY ON/OFF (ver protocolo_binario)
+CAMPO_REGISTRADO = "campo_registrado"  # Alta, baja o valor grabados en la etiqueta
+LECTURA_COMPLETA = "lectura_completa"
+ETIQUETA_PROGRAMADA = "etiqueta_programada"
+ERROR = "error"
+ERROR_FATAL = "error_fatal"  # Error tras el cual el ESP32 abandona el comando
+TEXTO = "texto"
+
+# Evento: tipo, línea original y, para los campos, nombre y valor
+Evento = namedtuple("Evento", ["tipo", "texto", "campo", "valor"])
+
+# Líneas que el ESP32 imprime siempre de forma idéntica
+_LINEAS_EXACTAS = {
+    "Etiqueta detectada. Verificando campos...": ETIQUETA_DETECTADA,
+    "Etiqueta detectada. Leyendo bloques...": ETIQUETA_DETECTADA,
+    "Etiqueta detectada. Esperando valores...": ESPERANDO_DATOS,
+    "No se detectó ninguna etiqueta.": SIN_ETIQUETA,
+    "Datos enviados con éxito.": FIREBASE_OK,
+    "Hubo errores al enviar los datos.": FIREBASE_ERROR,
+    "Registro de uso guardado en la nube.": USO_GUARDADO,
+    "Datos delegados al equipo.": FIREBASE_DELEGADO,
+    "Registro de uso delegado al equipo.": USO_DELEGADO,
+    "Envío delegado: activado.": DELEGACION,
+    "Envío delegado: desactivado.": DELEGACION,
+    "Caché de etiquetas: activada.": CACHE_ETIQUETAS,
+    "Caché de etiquetas: desactivada.": CACHE_ETIQUETAS,
+    "Datos fijos omitidos (etiqueta conocida).": FIREBASE_OK,  # Ya estaban en Firebase
+    "Protocolo binario: activado.": PROTOCOLO_BINARIO,
+    "Protocolo binario: desactivado.": PROTOCOLO_BINARIO,
+    "Campo 'alta' registrado con éxito!": CAMPO_REGISTRADO,
+    "Campo 'baja' registrado con éxito!": CAMPO_REGISTRADO,
+    "Campo 'valor' registrado con éxito!": CAMPO_REGISTRADO,
+    "Lectura completa.": LECTURA_COMPLETA,
+    "Datos guardados exitosamente.": ETIQUETA_PROGRAMADA,
+    "Error al programar la etiqueta.": ERROR_FATAL,
+    "Error: UID inválido.": ERROR_FATAL,
+    "UID inválido": ERROR_FATAL,
+}
+
+# Líneas reconocidas por su comienzo, en orden de prioridad
+_PREFIJOS = (
+    ("Comando '", COMANDO_RECIBIDO),
+    ("Fecha de alta registrada: ", ALTA_REGISTRADA),
+    ("Fecha de baja registrada: ", BAJA_REGISTRADA),
+    ("Error al leer el bloque", ERROR_FATAL),
+    ("Error: El valor", ERROR_FATAL),
+    ("Error al enviar el peso", ERROR_FATAL),  # Último envío de TRACK: el ESP32 termina aquí
+    ("Error", ERROR),
+    ("Autenticación fallida", ERROR),
+)
+
+# Con la caché activa, el ESP32 anuncia así el UID antes de leer los bloques
+_UID_DETECTADO = "UID detectado: "
+
+# Campos que el ESP32 imprime como "Nombre: valor", con la unidad que agrega a cada uno
+CAMPOS = {
+    "UID": "", "Producto": "", "Número": "", "Alta": "", "Marca": "", "Código": "",
+    "Presentación": "", "Lote": "", "Vencimiento": "", "Baja": "",
+    "Temperatura": " °C", "Humedad": " %", "Peso": " g",
+}
+
+
+def interpretar_campo(nombre, valor):
+    """Evento de un campo "Nombre: valor" tal como lo imprime el ESP32 (con unidad o "Sin valor")."""
+    linea = f"{nombre}: {valor}"
+    unidad = CAMPOS[nombre]
+    if unidad and valor.endswith(unidad):
+        valor = valor[:-len(unidad)]
+    if valor == "Sin valor":
+        valor = ""
+    return Evento(CAMPO, linea, nombre, valor)
+
+
+def interpretar_linea(linea):
+    """Convierte una línea de texto del ESP32 en un Evento."""
+    tipo = _LINEAS_EXACTAS.get(linea)
+    if tipo:
+        return Evento(tipo, linea, None, None)
+
+    if linea.startswith(_UID_DETECTADO):
+        return Evento(UID_DETECTADO, linea, "UID", linea[len(_UID_DETECTADO):])
+
+    nombre, separador, valor = linea.partition(": ")
+    if separador and nombre in CAMPOS:
+        return interpretar_campo(nombre, valor)
+
+    for prefijo, tipo in _PREFIJOS:
+        if linea.startswith(prefijo):
+            return Evento(tipo, linea, None, None)
+    return Evento(TEXTO, linea, None, None)
+
+
+class DefinicionComando:
+    """Describe cómo termina un comando: eventos de éxito, eventos de fallo y timeout.
+
+    Si se indica `requiere`, un evento de éxito solo cuenta después de haber recibido
+    alguno de esos eventos (READ y OUT imprimen "Lectura completa." también en una
+    lectura intermedia, antes del envío a Firebase).
+
+    Si se indica `intermedio`, después de alguno de esos eventos los fallos ya no terminan
+    el comando: tras grabar el alta o la baja, READ y OUT vuelven a leer la etiqueta y, si
+    esa lectura falla ("Error al leer el bloque", "No se detectó ninguna etiqueta."...), el
+    ESP32 lo informa pero sigue hasta el envío a Firebase y su "Lectura completa." final.
+    """
+
+    def __init__(self, exitos, fallos, timeout, requiere=None, intermedio=None):
+        self.exitos = frozenset(exitos)
+        self.fallos = frozenset(fallos)
+        self.timeout = timeout
+        self.requiere = requiere
+        self.intermedio = intermedio
+
+
+DEFINICIONES = {
+    "READ": DefinicionComando({LECTURA_COMPLETA}, {SIN_ETIQUETA, ERROR_FATAL}, timeout=10,
+                              requiere=(FIREBASE_OK, FIREBASE_ERROR, FIREBASE_DELEGADO),
+                              intermedio=(CAMPO_REGISTRADO,)),
+    "OUT": DefinicionComando({LECTURA_COMPLETA}, {SIN_ETIQUETA, ERROR_FATAL}, timeout=10,
+                             requiere=(FIREBASE_OK, FIREBASE_ERROR, FIREBASE_DELEGADO),
+                             intermedio=(CAMPO_REGISTRADO,)),
+    "TRACK": DefinicionComando({USO_GUARDADO, USO_DELEGADO}, {SIN_ETIQUETA, ERROR_FATAL}, timeout=30),
+    "WRITE": DefinicionComando({ETIQUETA_PROGRAMADA}, {SIN_ETIQUETA, ERROR_FATAL}, timeout=10),
+    # Un firmware sin soporte responde con el menú manual: se espera poco y se sigue sin delegar
+    "DELEGATE ON": DefinicionComando({DELEGACION}, (), timeout=2),
+    "DELEGATE OFF": DefinicionComando({DELEGACION}, (), timeout=2),
+    "CACHE ON": DefinicionComando({CACHE_ETIQUETAS}, (), timeout=2),
+    "CACHE OFF": DefinicionComando({CACHE_ETIQUETAS}, (), timeout=2),
+    "BINARY ON": DefinicionComando({PROTOCOLO_BINARIO}, (), timeout=2),
+    "BINARY OFF": DefinicionComando({PROTOCOLO_BINARIO}, (), timeout=2),
+}
+
+
+class Resultado:
+    """Acumula los eventos de un comando y determina cuándo terminó."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.definicion = DEFINICIONES[nombre]
+        self.eventos = []
+        self.campos = {}
+        self.terminado = False
+        self.exito = False
+        self.motivo = None  # Tipo del evento final, "timeout" o "cancelado"
+        self.duracion = None  # Segundos desde el envío del comando hasta su fin
+
+    def agregar(self, evento):
+        """Registra un evento y devuelve True si con él termina el comando."""
+        definicion = self.definicion
+        if evento.tipo in definicion.fallos and definicion.intermedio and self.contiene(*definicion.intermedio):
+            evento = Evento(ERROR, evento.texto, None, None)  # Solo una advertencia: el ESP32 sigue
+        self.eventos.append(evento)
+        if evento.tipo == CAMPO:
+            self.campos[evento.campo] = evento.valor
+        elif evento.tipo in self.definicion.exitos and (
+                self.definicion.requiere is None or self.contiene(*self.definicion.requiere)):
+            self.terminado, self.exito, self.motivo = True, True, evento.tipo
+        elif evento.tipo in self.definicion.fallos:
+            self.terminado, self.motivo = True, evento.tipo
+        return self.terminado
+
+    def vencer(self):
+        """Marca el comando como terminado por timeout."""
+        self.terminado, self.motivo = True, "timeout"
+
+    def cancelar(self):
+        """Marca el comando como terminado porque se canceló antes de su evento final."""
+        self.terminado, self.motivo = True, "cancelado"
+
+    def contiene(self, *tipos):
+        """Indica si se recibió algún evento de los tipos indicados."""
+        return any(evento.tipo in tipos for evento in self.eventos)
+
+    @property
+    def delegado(self):
+        """Indica si el ESP32 dejó la subida de este resultado a cargo del equipo."""
+        return self.contiene(FIREBASE_DELEGADO, USO_DELEGADO)
+
+    @property
+    def firebase_ok(self):
+        if self.delegado:
+            return True  # Queda registrado en el diario local y se sube en el próximo lote
+        return self.contiene(FIREBASE_OK) and not self.contiene(FIREBASE_ERROR)
@@ -0,0 +1,350 @@
+# Simulador del ESP32 sobre un pseudo-terminal (pty) para pruebas sin hardware
+#
+# Reproduce las líneas que imprime sistema_integrado_con_interfaz_grafica.ino en modo
+# interfaz (READ, WRITE, TRACK, OUT, DELEGATE ON/OFF, CACHE ON/OFF), con retardos configurables para
+# cada etapa y errores inyectados al azar. Con BINARY ON responde con las tramas de
+# protocolo_binario. Solo funciona en sistemas con pty (Linux/macOS).
+#
+# Uso independiente:  python simulador_esp32.py   (imprime el puerto a abrir, p. ej. /dev/pts/5)
+
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+
+from protocolo_binario import COMANDOS, DATOS, KNOWN, SYNC, UNKNOWN, codificar_linea, extraer_trama
+
+# Código de trama -> orden en texto, como la reconstruye el sketch
+_ORDENES = {codigo: nombre for nombre, codigo in COMANDOS.items()}
+
+# Bloques y nombres de los campos, en el orden en que los imprime el ESP32
+ETIQUETAS = ["Producto", "Número", "Alta", "Marca", "Código", "Presentación", "Lote", "Vencimiento", "Baja"]
+CLAVES_FIREBASE = ["01_producto", "02_numero", "03_alta", "04_marca", "05_codigo", "06_presentacion",
+                   "07_lote", "08_vencimiento", "09_baja"]
+CAMPOS_ESCRITURA = ["Producto", "Número", "Marca", "Código", "Presentación", "Lote", "Vencimiento"]
+
+
+class Retardos:
+    """Tiempos (en segundos) que tarda el ESP32 simulado en cada etapa."""
+
+    def __init__(self, etiqueta=0.05, bloque=0.02, escritura=0.03, firebase=0.15, sensores=0.25):
+        self.etiqueta = etiqueta    # Detección de la etiqueta (readPassiveTargetID)
+        self.bloque = bloque        # Autenticación y lectura de un bloque
+        self.escritura = escritura  # Escritura de un bloque
+        self.firebase = firebase    # Cada Firebase.setString/setFloat
+        self.sensores = sensores    # DHT11 + promedio de 20 lecturas del HX711
+
+    def escalar(self, factor):
+        """Devuelve una copia con todos los tiempos multiplicados por `factor`."""
+        return Retardos(self.etiqueta * factor, self.bloque * factor, self.escritura * factor,
+                        self.firebase * factor, self.sensores * factor)
+
+
+class SimuladorESP32:
+    """ESP32 falso conectado a un pty: el equipo abre `puerto` como si fuera el real.
+
+    Errores inyectados (probabilidades entre 0 y 1): ninguna etiqueta frente al lector,
+    error al leer un bloque y error en un envío a Firebase.
+    """
+
+    def __init__(self, retardos=None, prob_sin_etiqueta=0.0, prob_error_bloque=0.0,
+                 prob_error_firebase=0.0, etiquetas=20, semilla=None):
+        self.retardos = retardos or Retardos()
+        self.prob_sin_etiqueta = prob_sin_etiqueta
+        self.prob_error_bloque = prob_error_bloque
+        self.prob_error_firebase = prob_error_firebase
+        self.azar = random.Random(semilla)
+        self.delegado = False
+        self.cache = False
+        self.binario = False
+        self.tags = {self._uid(): self._reactivo(i) for i in range(etiquetas)}
+
+        self._maestro, esclavo = pty.openpty()
+        tty.setraw(esclavo)  # Sin eco ni traducción de fin de línea, como un puerto serie real
+        self._esclavo = esclavo
+        self.puerto = os.ttyname(esclavo)
+        self._pendiente = b""
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._atender, daemon=True, name=f"simulador-{self.puerto}")
+
+    def _uid(self):
+        return "".join(f"{self.azar.randrange(256):02x}" for _ in range(4))
+
+    def _reactivo(self, i):
+        return {"Producto": f"Reactivo {i}", "Número": str(i), "Alta": "", "Marca": "Merck",
+                "Código": f"C{i:04d}", "Presentación": "1 L", "Lote": f"L{i % 7:03d}",
+                "Vencimiento": "12/2027", "Baja": ""}
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        os.close(self._esclavo)
+        os.close(self._maestro)
+
+    # --- E/S del puerto ---
+
+    def _println(self, texto=""):
+        if not self.binario:
+            self._escribir((texto + "\r\n").encode("utf-8"))
+            return
+        # Como el sketch: cada línea no vacía viaja en su propia trama
+        tramas = b"".join(codificar_linea(linea) for linea in texto.split("\n") if linea.strip())
+        if tramas:
+            self._escribir(tramas)
+
+    def _escribir(self, datos):
+        try:
+            os.write(self._maestro, datos)
+        except OSError:
+            if not self._detener.is_set():
+                raise  # Tras detener(), el pty ya está cerrado y lo que falte de la respuesta se pierde
+
+    def _orden_de_trama(self):
+        """Reconstruye la orden en texto de la trama al comienzo de lo pendiente (None si está incompleta)."""
+        codigo, datos, consumidos = extraer_trama(self._pendiente)
+        if not consumidos:
+            return None
+        self._pendiente = self._pendiente[consumidos:]
+        if codigo is None:
+            return ""  # Trama dañada: se descarta
+        datos = datos.decode("utf-8", errors="replace")
+        if codigo == DATOS:
+            return datos
+        if codigo == KNOWN:
+            return "KNOWN " + datos
+        if codigo == UNKNOWN:
+            return "UNKNOWN"
+        return _ORDENES.get(codigo, "")
+
+    def _leer_linea(self, timeout=None):
+        while True:
+            if self._pendiente[:1] == bytes((SYNC,)):
+                orden = self._orden_de_trama()
+                if orden is not None:
+                    return orden
+            elif b"\n" in self._pendiente:
+                break
+            if timeout is not None and not select.select([self._maestro], [], [], timeout)[0]:
+                return ""  # Sin respuesta dentro del plazo
+            try:
+                datos = os.read(self._maestro, 1024)
+            except OSError:
+                return None
+            if not datos:
+                return None
+            self._pendiente += datos
+        linea, self._pendiente = self._pendiente.split(b"\n", 1)
+        return linea.decode("utf-8", errors="replace").strip()
+
+    def _atender(self):
+        comandos = {"READ": self._leer_etiqueta, "TRACK": self._registrar_uso,
+                    "OUT": self._registrar_baja, "WRITE": self._programar_etiqueta}
+        while not self._detener.is_set():
+            comando = self._leer_linea()
+            if comando is None:
+                break
+            if comando in comandos:
+                comandos[comando]()
+            elif comando in ("DELEGATE ON", "DELEGATE OFF"):
+                self.delegado = comando == "DELEGATE ON"
+                self._println("Envío delegado: activado." if self.delegado else "Envío delegado: desactivado.")
+            elif comando in ("CACHE ON", "CACHE OFF"):
+                self.cache = comando == "CACHE ON"
+                self._println("Caché de etiquetas: activada." if self.cache else "Caché de etiquetas: desactivada.")
+            elif comando.startswith("BINARY ON") or comando == "BINARY OFF":
+                # La confirmación sale en el modo anterior; la velocidad pedida no afecta a un pty
+                activar = comando.startswith("BINARY ON")
+                self._println("Protocolo binario: activado." if activar else "Protocolo binario: desactivado.")
+                self.binario = activar
+            elif comando:
+                self._println("Opción no válida. Intente nuevamente.")
+
+    # --- Etapas del ESP32 ---
+
+    def _detectar(self):
+        time.sleep(self.retardos.etiqueta)
+        if self.azar.random() < self.prob_sin_etiqueta:
+            self._println("No se detectó ninguna etiqueta.")
+            return None
+        return self.azar.choice(list(self.tags))
+
+    def _leer_bloques(self, solo=None):
+        for i in range(len(ETIQUETAS)):
+            if solo is not None and ETIQUETAS[i] not in solo:
+                continue
+            time.sleep(self.retardos.bloque)
+            if self.azar.random() < self.prob_error_bloque:
+                self._println("Error al leer el bloque " + str([4, 5, 6, 8, 9, 10, 12, 13, 14][i]))
+                return False
+        return True
+
+    def _escribir_bloque(self, titulo):
+        time.sleep(self.retardos.escritura)
+        self._println(f"Campo '{titulo}' registrado con éxito!")
+        self._println()
+
+    def _imprimir_datos(self, uid, encabezado="Datos del Reactivo:", con_baja_vacia=False, solo=None):
+        self._println()
+        self._println(encabezado)
+        self._println("UID: " + uid)
+        for etiqueta in ETIQUETAS:
+            valor = self.tags[uid][etiqueta]
+            if etiqueta == "Baja" and not valor and not con_baja_vacia:
+                continue
+            if solo is not None and etiqueta not in solo:
+                continue
+            self._println(f"{etiqueta}: {valor or 'Sin valor'}")
+
+    def _enviar_firebase(self, uid):
+        self._println()
+        self._println(f"Creando la ruta en Firebase: {uid}...")
+        if self.delegado:
+            self._println("Datos delegados al equipo.")
+            return
+        exito = True
+        for etiqueta, clave in zip(ETIQUETAS, CLAVES_FIREBASE):
+            if not self.tags[uid][etiqueta]:
+                if etiqueta != "Baja":
+                    self._println(f"Valor vacío para {clave}, no se enviará a Firebase.")
+                continue
+            time.sleep(self.retardos.firebase)
+            if self.azar.random() < self.prob_error_firebase:
+                exito = False
+                self._println(f"Error al enviar {clave}: connection lost")
+        self._println("Datos enviados con éxito.\n" if exito else "Hubo errores al enviar los datos.")
+
+    def _fecha(self):
+        t = time.localtime()
+        return f"{t.tm_mday}/{t.tm_mon}/{t.tm_year}"
+
+    def _leer_datos_gui(self, uid):
+        time.sleep(self.retardos.etiqueta)  # El ESP32 vuelve a detectar la etiqueta
+        if self.azar.random() < self.prob_sin_etiqueta:
+            self._println("No se detectó ninguna etiqueta.")
+            return
+        self._println("Leyendo bloques...")
+        if not self._leer_bloques():
+            return
+        self._imprimir_datos(uid)
+        self._println("Lectura completa.")
+
+    def _leer_etiqueta(self):
+        self._println("Comando 'READ' recibido. Esperando etiqueta...")
+        uid = self._detectar()
+        if uid is None:
+            return
+        self._println("Etiqueta detectada. Verificando campos...")
+        if not self._leer_bloques():
+            return
+        if not self.tags[uid]["Alta"]:
+            self.tags[uid]["Alta"] = self._fecha()
+            self._escribir_bloque("alta")
+            self._println()
+            self._leer_datos_gui(uid)
+            self._println()
+            self._println("Fecha de alta registrada: " + self.tags[uid]["Alta"])
+        self._println("Fecha de alta previamente registrada. Leyendo bloques...")
+        self._imprimir_datos(uid)
+        self._enviar_firebase(uid)
+        self._println("Lectura completa.")
+
+    def _registrar_uso(self):
+        self._println("Comando 'TRACK' recibido. Esperando etiqueta...")
+        uid = self._detectar()
+        if uid is None:
+            return
+        self._println("Etiqueta detectada. Leyendo bloques...")
+        solo = None  # Con una etiqueta conocida por el equipo, solo se leen alta y baja
+        if self.cache:
+            self._println("UID detectado: " + uid)
+            if self._leer_linea(timeout=0.5) == "KNOWN " + uid:
+                solo = ("Alta", "Baja")
+                self._println("Etiqueta conocida: solo se leen alta y baja.")
+        if not self._leer_bloques(solo):
+            return
+        alta_nueva = not self.tags[uid]["Alta"]
+        if alta_nueva:
+            self.tags[uid]["Alta"] = self._fecha()
+            self._escribir_bloque("alta")
+        self._imprimir_datos(uid, solo=solo)
+        time.sleep(self.retardos.sensores)
+        self._println(f"Temperatura: {self.azar.uniform(18, 28):.2f} °C")
+        self._println(f"Humedad: {self.azar.uniform(40, 70):.2f} %")
+        self._println(f"Peso: {self.azar.uniform(100, 900):.2f} g")
+        if solo is not None and not self.delegado:
+            self._println()
+            self._println(f"Creando la ruta en Firebase: {uid}...")
+            if alta_nueva:
+                time.sleep(self.retardos.firebase)
+            self._println("Datos fijos omitidos (etiqueta conocida).")
+        else:
+            self._enviar_firebase(uid)
+        if self.delegado:
+            self._println("Registro de uso delegado al equipo.")
+            return
+        time.sleep(self.retardos.firebase * 5)  # fecha, hora, temperatura, humedad y peso
+        if self.azar.random() < self.prob_error_firebase:
+            self._println("Error al enviar el peso: connection lost")
+        else:
+            self._println("Registro de uso guardado en la nube.")
+
+    def _registrar_baja(self):
+        self._println("Comando 'OUT' recibido. Esperando etiqueta...")
+        uid = self._detectar()
+        if uid is None:
+            return
+        self._println("Etiqueta detectada. Verificando campos...")
+        if not self._leer_bloques():
+            return
+        if not self.tags[uid]["Baja"]:
+            self.tags[uid]["Baja"] = self._fecha()
+            self._escribir_bloque("baja")
+            self._println()
+            self._leer_datos_gui(uid)
+            self._println()
+            self._println("Fecha de baja registrada: " + self.tags[uid]["Baja"])
+        else:
+            self._println("Fecha de baja previamente registrada. Leyendo bloques...")
+            self._imprimir_datos(uid, "Datos del reactivo:", con_baja_vacia=True)
+        self._enviar_firebase(uid)
+        self._println("Lectura completa.")
+
+    def _programar_etiqueta(self):
+        self._println("Comando 'WRITE' recibido. Esperando datos...")
+        uid = self._detectar()
+        if uid is None:
+            return
+        if self.cache:
+            self._println("UID detectado: " + uid)
+        self._println("Etiqueta detectada. Esperando valores...")
+        datos = self._leer_linea()
+        if datos is None:
+            return
+        self._println("Datos recibidos: " + datos)
+        valores = (datos.split(",") + [""] * 7)[:7]
+        for i, valor in enumerate(valores):
+            if len(valor) > 16:
+                self._println(f"Error: El valor {i} excede el límite de 16 caracteres.")
+                return
+            self._println(f"Valor {i}: {valor}")
+        for campo, valor in zip(CAMPOS_ESCRITURA, valores):
+            if valor:
+                self.tags[uid][campo] = valor
+                self._escribir_bloque("valor")
+        self._println("Datos guardados exitosamente.")
+
+
+if __name__ == "__main__":
+    simulador = SimuladorESP32().iniciar()
+    print(f"ESP32 simulado en {simulador.puerto} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulador.detener()
@@ -2,51 +2,106 @@
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import serial
+import queue
 import time
 
-# Inicialización de la conexión serial
-ser = None
-conectado = False  # Variable para controlar el estado de la conexión
+from cache_etiquetas import CacheEtiquetas
+from comunicacion_serial import Comando
+from diario_eventos import DiarioEventos, SincronizadorFirebase
+from gestor_estaciones import GestorEstaciones
+from inventario import Inventario
+from metricas import Metricas, RegistroMetricas, ServidorMetricas
+from monitor_estado import MonitorEstado
+from protocolo_esp32 import ALTA_REGISTRADA, BAJA_REGISTRADA, SIN_ETIQUETA
+
+# Puertos de las estaciones lectoras; si la lista está vacía se detectan automáticamente
+PUERTOS = ['COM8']  # Ajusta los puertos según tu configuración
+
+# Subida de datos a Firebase desde el equipo; si la URL está vacía, cada ESP32 sube sus datos
+FIREBASE_URL = ""  # Ejemplo: "https://<your-project-id>.firebaseio.com"
+FIREBASE_AUTH = ""  # Token de autenticación de Firebase
+
+# Monitor de estado: líneas visibles como máximo e historial completo en un archivo con rotación
+MAX_LINEAS_MONITOR = 2000
+ARCHIVO_HISTORIAL = "historial_monitor.log"  # "" para no guardar el historial
+
+# Métricas de rendimiento de las estaciones (tiempos por fase, bytes, timeouts)
+PUERTO_METRICAS = 9108  # Endpoint local http://127.0.0.1:9108/metrics; 0 para desactivarlo
+ARCHIVO_METRICAS = "metricas.jsonl"  # Instantánea JSON por minuto, con rotación; "" para desactivarla
 
-def limpiar_buffer_serial():
-    """Función para limpiar el buffer serial antes de enviar un comando."""
-    if ser and ser.is_open:
-        ser.reset_input_buffer()
+# Protocolo binario con tramas: menos bytes por etiqueta; con un firmware anterior se sigue en modo texto
+PROTOCOLO_BINARIO = False  # Negociar las tramas de protocolo_binario al conectar
+BAUDIOS_BINARIO = None  # Ejemplo: 921600 para subir la velocidad una vez negociado el protocolo
+
+conectado = False  # Variable para controlar el estado de la conexión
 
 def conectar_desconectar():
-    global ser, conectado
+    global conectado
 
     if not conectado:
-        # Intentar conectar
-        try:
-            ser = serial.Serial('COM8', 115200, timeout=1)  # Ajusta el puerto y la velocidad según tu configuración
-            actualizar_monitor_estado("Estado de Conexión: Conectado.\n\n")
+        # Intentar conectar todas las estaciones
+        fallidos = gestor.conectar(PUERTOS)
+        for puerto in fallidos:
+            actualizar_monitor_estado(f"No se pudo abrir el puerto {puerto}.\n")
+        if gestor.nombres:
+            combo_estacion.config(values=gestor.nombres)
+            estacion_seleccionada.set(gestor.nombres[0])
+            actualizar_monitor_estado(f"Estado de Conexión: Conectado ({', '.join(gestor.nombres)}).\n\n")
             btn_conectar.config(text="Desconectar")  # Cambiar el texto del botón
             conectado = True
-        except:
+        else:
             messagebox.showerror("Error", "No se pudo establecer conexión con el sistema.")
     else:
         # Desconectar si ya está conectado
         try:
-            if ser and ser.is_open:
-                ser.close()
-                actualizar_monitor_estado("Estado de Conexión: Desconectado.\n")
-                btn_conectar.config(text="Conectar")  # Cambiar el texto del botón
-                conectado = False
+            gestor.desconectar()
+            combo_estacion.config(values=[])
+            estacion_seleccionada.set("")
+            actualizar_monitor_estado("Estado de Conexión: Desconectado.\n")
+            btn_conectar.config(text="Conectar")  # Cambiar el texto del botón
+            conectado = False
         except:
             messagebox.showerror("Error", "No se pudo desconectar del sistema.")
 
 def actualizar_monitor_estado(texto):
-    """Función para actualizar el monitor de estado, solo lectura."""
-    monitor_estado.config(state=tk.NORMAL)  # Habilitar escritura temporalmente
-    monitor_estado.insert(tk.END, texto)  # Insertar el texto
-    monitor_estado.config(state=tk.DISABLED)  # Volver a deshabilitar escritura
-    monitor_estado.see(tk.END)  # Desplazarse al final del texto
+    """Agrega texto al monitor de estado; se muestra en el próximo volcado por lotes."""
+    monitor.agregar(texto)
 
-def programar_etiqueta():
-    if not conectado or ser is None or not ser.is_open:
+def procesar_cola_serial():
+    """Vacía la cola del hilo serial en el hilo de Tkinter y se vuelve a programar."""
+    try:
+        # Con un límite por ciclo, una ráfaga de mensajes no deja a la interfaz sin responder
+        for _ in range(500):
+            mensaje = cola_serial.get_nowait()
+            tipo, estacion = mensaje[0], mensaje[1]
+            # Con varias estaciones, cada línea del monitor indica de cuál proviene
+            prefijo = f"[{estacion}] " if len(gestor.nombres) > 1 else ""
+            if tipo == "evento":
+                actualizar_monitor_estado(f"{prefijo}{mensaje[2].texto}\n")
+            elif tipo == "error":
+                actualizar_monitor_estado(f"{prefijo}Error de comunicación: {mensaje[2]}\n")
+            elif tipo == "fin":
+                _, _, comando, resultado = mensaje
+                gestor.registrar_resultado(estacion, resultado)
+                if comando.al_terminar:
+                    comando.al_terminar(resultado)
+    except queue.Empty:
+        pass
+    root.after(50, procesar_cola_serial)
+
+def verificar_conexion():
+    """Muestra una advertencia y devuelve False si no hay conexión con el sistema."""
+    if not conectado or estacion_seleccionada.get() not in gestor.estaciones:
         messagebox.showwarning("Advertencia", "Primero debes establecer conexión con el sistema.")
+        return False
+    return True
+
+def enviar_comando(comando):
+    """Envía un comando a la estación seleccionada en la interfaz."""
+    gestor.enviar(estacion_seleccionada.get(), comando)
+
+def programar_etiqueta():
+    if not verificar_conexion():
         return
 
     ventana_programar = tk.Toplevel(root)
@@ -61,42 +116,22 @@ def programar_etiqueta():
         entradas[etiqueta] = tk.Entry(ventana_programar, width=40)
         entradas[etiqueta].grid(row=i, column=1, padx=10, pady=5)
 
+    def al_terminar(resultado):
+        # Verificar si los datos fueron guardados correctamente
+        if resultado.exito:
+            messagebox.showinfo("Éxito", "Etiqueta programada correctamente.")
+        else:
+            messagebox.showerror("Error", "Hubo un problema al programar la etiqueta.")
+        ventana_programar.destroy()
+
     def guardar_datos():
         # Crear una cadena concatenada con los valores de los campos separados por comas
         datos_concatenados = ",".join(entrada.get() for entrada in entradas.values())
         print(f"Datos enviados: {datos_concatenados}")  # Imprimir la cadena completa para verificar
-        try:
-            limpiar_buffer_serial()  # Limpiar el buffer antes de enviar comandos
-
-            ser.write(b'WRITE\n')  # Envía el comando "WRITE" para iniciar el proceso
-            actualizar_monitor_estado("Enviando comando WRITE...\n")
-            time.sleep(2)  # Incrementar el tiempo de espera
-
-            # Enviar la cadena concatenada con los datos
-            ser.write((datos_concatenados + "\n").encode('utf-8'))
-            actualizar_monitor_estado(f"Datos enviados: {datos_concatenados}\n")
-
-            # Leer la respuesta del ESP32 en un bucle hasta recibir el mensaje de éxito o hasta timeout
-            respuesta = ""
-            timeout = time.time() + 10  # Tiempo límite de 10 segundos
-            while time.time() < timeout:
-                line = ser.readline().decode('utf-8').strip()
-                if line:
-                    actualizar_monitor_estado(f"{line}\n")
-                    respuesta += line
-                if "Datos guardados exitosamente" in line:
-                    break  # Salir del bucle cuando llegue la respuesta final
-
-            # Verificar si los datos fueron guardados correctamente
-            if "Datos guardados exitosamente" in respuesta:
-                messagebox.showinfo("Éxito", "Etiqueta programada correctamente.")
-            else:
-                messagebox.showerror("Error", "Hubo un problema al programar la etiqueta.")
-                
-            ventana_programar.destroy()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al enviar los datos: {e}")
+        btn_guardar.config(state=tk.DISABLED)  # Evitar envíos duplicados mientras se programa
+
+        # El hilo serial envía "WRITE" y, cuando el ESP32 detecta la etiqueta, los datos
+        enviar_comando(Comando("WRITE", datos=datos_concatenados, al_terminar=al_terminar))
 
     # Botón para guardar los datos
     btn_guardar = ttk.Button(ventana_programar, text="Guardar datos", command=guardar_datos)
@@ -104,179 +139,288 @@ def programar_etiqueta():
 
 # Función para leer los datos de la etiqueta NFC (Registrar Alta)
 def leer_etiqueta():
-    if not conectado or ser is None or not ser.is_open:
-        messagebox.showwarning("Advertencia", "Primero debes establecer conexión con el sistema.")
+    if not verificar_conexion():
         return
-    
-    try:
-        limpiar_buffer_serial()  # Limpiar el buffer antes de enviar comandos
-
-        ser.write(b'READ\n')  # Enviar el comando "READ"
-        actualizar_monitor_estado("Enviando comando 'READ'...\n")
-        
-        time.sleep(2)  # Esperar más tiempo para que el ESP32 responda
-
-        datos_leidos = False  # Variable para verificar si se leen datos
-        respuesta_completa = ""  # Acumula toda la respuesta para mostrarla en el monitor
-
-        # Leer las respuestas bloque por bloque
-        timeout = time.time() + 10  # Tiempo límite de 10 segundos
-        while ser.in_waiting > 0 or time.time() < timeout:
-            respuesta = ser.readline().decode('utf-8').strip()
-            if respuesta:
-                # Acumular toda la respuesta en el monitor de estado
-                respuesta_completa += f"{respuesta}\n"
-                datos_leidos = True
-
-            # Verificar si la respuesta contiene la confirmación de actualización de fecha y datos en Firebase
-            if "Fecha de alta registrada" in respuesta:
-                messagebox.showinfo("Actualización", "Fecha de alta registrada con éxito.")
-            elif "Lectura completa" in respuesta:
-                messagebox.showinfo("Registro completado", "Datos registrados y enviados a Firebase correctamente.")
-                actualizar_monitor_estado(f"{respuesta_completa}\n")
-                break  # Termina el ciclo si ya se completó la lectura y envío a Firebase
+
+    def al_terminar(resultado):
+        # Verificar si la respuesta contiene la confirmación de actualización de fecha y datos en Firebase
+        if resultado.contiene(ALTA_REGISTRADA):
+            messagebox.showinfo("Actualización", "Fecha de alta registrada con éxito.")
+        if resultado.exito:
+            messagebox.showinfo("Registro completado", "Datos registrados y enviados a Firebase correctamente.")
 
         # Mostrar advertencia si no se leyeron datos
-        if not datos_leidos:
+        elif not resultado.campos:
             actualizar_monitor_estado("No se leyeron o mostraron datos de la etiqueta.\n")
             messagebox.showwarning("Advertencia", "No se leyeron o mostraron datos de la etiqueta.")
 
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al leer la etiqueta: {e}")
+    enviar_comando(Comando("READ", al_terminar=al_terminar))
 
 # Función para registrar el uso de un reactivo
 def registrar_uso():
-    if not conectado or ser is None or not ser.is_open:
-        messagebox.showwarning("Advertencia", "Primero debes establecer conexión con el sistema.")
+    if not verificar_conexion():
         return
 
-    try:
-        limpiar_buffer_serial()  # Limpiar el buffer antes de enviar comandos
-
-        ser.write(b'TRACK\n')  # Enviar el comando "TRACK" para registrar el uso
-        actualizar_monitor_estado("Enviando comando 'TRACK'...\n")
-        
-        time.sleep(1.5)  # Esperar para que el ESP32 procese la lectura
-
-        datos_leidos = False  # Variable para verificar si se leen datos
-        respuesta_completa = ""  # Acumular todas las respuestas para mostrar en el monitor
-        confirmacion_firebase = False  # Verificar si llegó confirmación de Firebase
-        peso_detectado = False  # Verificar si se recibió el peso del reactivo
-
-
-        # Leer las respuestas del ESP32
-        timeout = time.time() + 30  # Tiempo límite de 10 segundos
-        while time.time() < timeout:
-            if ser.in_waiting > 0:
-                respuesta = ser.readline().decode('utf-8').strip()
-                if respuesta:
-                    respuesta_completa += f"{respuesta}\n"  # Acumular toda la respuesta
-                    datos_leidos = True
-
-                    # Verificar y capturar el peso solo una vez
-                    if "Peso:" in respuesta and not peso_detectado:
-                        peso_detectado = True
-                    # Verificar y capturar la confirmación de Firebase solo una vez
-                    elif "Datos enviados con éxito" in respuesta and not confirmacion_firebase:
-                        confirmacion_firebase = True
-                        messagebox.showinfo("Registro completado", "Uso del reactivo registrado y enviado a Firebase.")
-                        actualizar_monitor_estado(f"{respuesta_completa}\n")  # Mostrar la respuesta en el monitor
-                        break  # Termina el ciclo al recibir la confirmación
-
+    def al_terminar(resultado):
+        if resultado.exito and resultado.firebase_ok:
+            messagebox.showinfo("Registro completado", "Uso del reactivo registrado y enviado a Firebase.")
         # Mensaje en caso de que no se reciban datos o confirmación de Firebase
-        if not datos_leidos:
+        elif not resultado.campos or resultado.motivo == SIN_ETIQUETA:
             actualizar_monitor_estado("No se completó el registro de uso.\n")
             messagebox.showwarning("Advertencia", "No se completó el registro de uso.")
-        elif not confirmacion_firebase:
-            respuesta_completa += "Confirmación de Firebase no recibida.\n"
-            actualizar_monitor_estado(f"{respuesta_completa}\n")
+        else:
+            actualizar_monitor_estado("Confirmación de Firebase no recibida.\n")
             messagebox.showwarning("Advertencia", "Confirmación de Firebase no recibida para el uso del reactivo.")
 
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al registrar el uso: {e}")
+    enviar_comando(Comando("TRACK", al_terminar=al_terminar))
 
 # Función para registrar la baja de un reactivo
 def registrar_baja():
-    if not conectado or ser is None or not ser.is_open:
-        messagebox.showwarning("Advertencia", "Primero debes establecer conexión con el sistema.")
+    if not verificar_conexion():
         return
 
-    try:
-        limpiar_buffer_serial()  # Limpiar el buffer antes de enviar comandos
-
-        ser.write(b'OUT\n')  # Enviar el comando "OUT" para registrar la baja
-        actualizar_monitor_estado("Enviando comando 'OUT'...\n")
-        
-        time.sleep(2)  # Esperar para que el ESP32 procese la lectura
-
-        datos_leidos = False  # Verificar si se leen datos
-        respuesta_completa = ""  # Acumula toda la respuesta para mostrarla en el monitor
-
-        # Leer las respuestas del ESP32 bloque por bloque
-        timeout = time.time() + 10  # Tiempo límite de 10 segundos
-        while ser.in_waiting > 0 or time.time() < timeout:
-            respuesta = ser.readline().decode('utf-8').strip()
-            if respuesta:
-                # Acumular toda la respuesta en el monitor de estado
-                respuesta_completa += f"{respuesta}\n"
-                datos_leidos = True
-
-            # Verificar si la respuesta contiene confirmación de registro de baja en Firebase
-            if "Fecha de baja registrada" in respuesta:
-                messagebox.showinfo("Actualización", "Fecha de baja registrada con éxito.")
-            elif "Lectura completa." in respuesta:
-                messagebox.showinfo("Registro completado", "Baja registrada y enviada a Firebase correctamente.")
-                actualizar_monitor_estado(f"{respuesta_completa}\n")
-                break  # Termina el ciclo si ya se completó el registro de baja y envío a Firebase
+    def al_terminar(resultado):
+        # Verificar si la respuesta contiene confirmación de registro de baja en Firebase
+        if resultado.contiene(BAJA_REGISTRADA):
+            messagebox.showinfo("Actualización", "Fecha de baja registrada con éxito.")
+        if resultado.exito:
+            messagebox.showinfo("Registro completado", "Baja registrada y enviada a Firebase correctamente.")
 
         # Mostrar advertencia si no se leyeron datos
-        if not datos_leidos:
+        elif not resultado.campos:
             actualizar_monitor_estado("No se completó el registro de baja del reactivo.\n")
             messagebox.showwarning("Advertencia", "No se completó el registro de baja del reactivo.")
 
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al registrar la baja: {e}")
-
+    enviar_comando(Comando("OUT", al_terminar=al_terminar))
 
-# Configuración de la ventana principal
-root = tk.Tk()
-root.title("Sistema de Gestión de Reactivos")
-root.geometry("680x540")
-
-# Etiqueta y botón para conectar/desconectar al ESP32
-tk.Label(root, text="Establece Conexión con el Sistema").pack(pady=(20, 5))
-btn_conectar = ttk.Button(root, text="Conectar", command=conectar_desconectar)
-btn_conectar.pack(pady=(0, 10))
-
-# Monitor de estado (solo lectura)
-monitor_estado = scrolledtext.ScrolledText(root, height=17, width=70, state=tk.DISABLED)  # Inicialmente en modo solo lectura
-monitor_estado.pack(padx=10, pady=10)
-
-# Texto para indicar ingreso de nuevo reactivo
-ttk.Label(root, text="Nuevo Reactivo:").pack(pady=(10, 1))
-
-# Botón para programar una nueva etiqueta, centrado
-btn_programar = ttk.Button(root, text="Programar Etiqueta", command=programar_etiqueta)
-btn_programar.pack(pady=5)
-
-# Texto para indicar selección de opciones
-ttk.Label(root, text="Opciones de Registro:").pack(pady=(20, 5))
+# Función para registrar muchos reactivos seguidos sin volver a presionar el botón
+def escaneo_continuo():
+    if not verificar_conexion():
+        return
 
-# Frame para organizar los botones horizontalmente, centrado
-frame_botones = tk.Frame(root)
-frame_botones.pack()
+    ventana_escaneo = tk.Toplevel(root)
+    ventana_escaneo.title("Escaneo Continuo")
+
+    opciones = {"Registrar Alta": "READ", "Registrar Uso": "TRACK", "Registrar Baja": "OUT"}
+    opcion = tk.StringVar(value="Registrar Uso")
+    estado = {"comando": None, "estacion": None, "inicio": 0.0, "procesadas": 0, "exitos": 0, "errores": 0}
+
+    # Selección del comando que queda armado
+    frame_opciones = tk.Frame(ventana_escaneo)
+    frame_opciones.pack(pady=(10, 5))
+    for i, texto in enumerate(opciones):
+        ttk.Radiobutton(frame_opciones, text=texto, value=texto, variable=opcion).grid(row=0, column=i, padx=5)
+
+    # Tabla con el resultado de cada etiqueta procesada
+    columnas = ("N°", "Hora", "UID", "Producto", "Lote", "Resultado", "Duración (s)")
+    tabla = ttk.Treeview(ventana_escaneo, columns=columnas, show="headings", height=15)
+    for columna in columnas:
+        tabla.heading(columna, text=columna)
+        tabla.column(columna, width=90, anchor="center")
+    tabla.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+    # Contadores de rendimiento
+    contadores = ttk.Label(ventana_escaneo, text="Procesadas: 0 | Éxitos: 0 | Errores: 0 | Etiquetas/min: 0.0")
+    contadores.pack(pady=5)
+
+    def actualizar_contadores():
+        minutos = max(time.monotonic() - estado["inicio"], 1e-6) / 60
+        contadores.config(text=f"Procesadas: {estado['procesadas']} | Éxitos: {estado['exitos']} | "
+                               f"Errores: {estado['errores']} | "
+                               f"Etiquetas/min: {estado['procesadas'] / minutos:.1f}")
+
+    def al_terminar(resultado):
+        # Sin etiqueta frente al lector: el comando simplemente se vuelve a armar
+        if resultado.motivo in (SIN_ETIQUETA, "cancelado") or not ventana_escaneo.winfo_exists():
+            return
+        estado["procesadas"] += 1
+        if resultado.exito:
+            estado["exitos"] += 1
+            texto_resultado = "OK" if resultado.firebase_ok else "OK (sin confirmación Firebase)"
+        else:
+            estado["errores"] += 1
+            texto_resultado = "Timeout" if resultado.motivo == "timeout" else "Error"
+        tabla.insert("", 0, values=(estado["procesadas"], time.strftime("%H:%M:%S"),
+                                    resultado.campos.get("UID", ""), resultado.campos.get("Producto", ""),
+                                    resultado.campos.get("Lote", ""), texto_resultado,
+                                    f"{resultado.duracion:.2f}"))
+        actualizar_contadores()
+
+    def iniciar_detener():
+        if estado["comando"] is None:
+            if not verificar_conexion():
+                return
+            estado.update(inicio=time.monotonic(), procesadas=0, exitos=0, errores=0)
+            estado["comando"] = Comando(opciones[opcion.get()], al_terminar=al_terminar, continuo=True)
+            estado["estacion"] = estacion_seleccionada.get()
+            gestor.enviar(estado["estacion"], estado["comando"])
+            actualizar_monitor_estado(f"Escaneo continuo iniciado en {estado['estacion']}: {opcion.get()}.\n")
+            btn_iniciar.config(text="Detener")
+        else:
+            estado["comando"].cancelar()
+            estado["comando"] = None
+            actualizar_monitor_estado("Escaneo continuo detenido.\n")
+            btn_iniciar.config(text="Iniciar")
+
+    def cerrar():
+        if estado["comando"] is not None:
+            estado["comando"].cancelar()
+        ventana_escaneo.destroy()
+
+    btn_iniciar = ttk.Button(ventana_escaneo, text="Iniciar", command=iniciar_detener)
+    btn_iniciar.pack(pady=(0, 10))
+    ventana_escaneo.protocol("WM_DELETE_WINDOW", cerrar)
+
+# Función para consultar el inventario local sin volver a leer Firebase ni la planilla
+def ver_inventario():
+    ventana_inventario = tk.Toplevel(root)
+    ventana_inventario.title("Inventario de Reactivos")
+
+    # Stock actual por producto
+    ttk.Label(ventana_inventario, text="Stock por producto:").pack(pady=(10, 2))
+    tabla_stock = ttk.Treeview(ventana_inventario, columns=("Producto", "Cantidad"), show="headings", height=8)
+    for columna in ("Producto", "Cantidad"):
+        tabla_stock.heading(columna, text=columna)
+        tabla_stock.column(columna, width=200 if columna == "Producto" else 90, anchor="center")
+    tabla_stock.pack(padx=10, pady=5, fill=tk.X)
+
+    # Reactivos que vencen dentro de los próximos días
+    frame_dias = tk.Frame(ventana_inventario)
+    frame_dias.pack(pady=(10, 2))
+    ttk.Label(frame_dias, text="Vencen en los próximos").grid(row=0, column=0)
+    dias = tk.IntVar(value=30)
+    ttk.Spinbox(frame_dias, from_=1, to=3650, textvariable=dias, width=6).grid(row=0, column=1, padx=5)
+    ttk.Label(frame_dias, text="días:").grid(row=0, column=2)
+    columnas = ("UID", "Producto", "Lote", "Vencimiento")
+    tabla_vencen = ttk.Treeview(ventana_inventario, columns=columnas, show="headings", height=10)
+    for columna in columnas:
+        tabla_vencen.heading(columna, text=columna)
+        tabla_vencen.column(columna, width=110, anchor="center")
+    tabla_vencen.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+    def actualizar():
+        tabla_stock.delete(*tabla_stock.get_children())
+        for producto, cantidad in inventario.stock().items():
+            tabla_stock.insert("", tk.END, values=(producto, cantidad))
+        tabla_vencen.delete(*tabla_vencen.get_children())
+        try:
+            reactivos = inventario.por_vencer(dias.get())
+        except tk.TclError:
+            reactivos = []  # Cantidad de días no válida
+        for reactivo in reactivos:
+            tabla_vencen.insert("", tk.END, values=(reactivo.uid, reactivo.producto, reactivo.lote,
+                                                     reactivo.vencimiento))
 
-# Botón para registrar la alta de un reactivo
-btn_leer = ttk.Button(frame_botones, text="Registrar Alta", command=leer_etiqueta)
-btn_leer.grid(row=0, column=0, padx=5)
+    ttk.Button(ventana_inventario, text="Actualizar", command=actualizar).pack(pady=(0, 10))
+    actualizar()
 
-# Botón para registrar el uso de un reactivo
-btn_registrar_uso = ttk.Button(frame_botones, text="Registrar Uso", command=registrar_uso)
-btn_registrar_uso.grid(row=0, column=1, padx=5)
 
-# Botón para registrar la baja de un reactivo
-btn_registrar_baja = ttk.Button(frame_botones, text="Registrar Baja", command=registrar_baja)
-btn_registrar_baja.grid(row=0, column=2, padx=5)
+def main():
+    """Construye las conexiones y la ventana principal y atiende la interfaz hasta cerrarla."""
+    global root, gestor, cola_serial, monitor, inventario, combo_estacion, estacion_seleccionada, btn_conectar
 
-root.mainloop()
+    metricas = Metricas()
+    if PUERTO_METRICAS:
+        try:
+            ServidorMetricas(metricas, PUERTO_METRICAS).iniciar()
+        except OSError as e:
+            print(f"No se pudo abrir el endpoint de métricas en el puerto {PUERTO_METRICAS}: {e}")
+    registro_metricas = None
+    if ARCHIVO_METRICAS:
+        registro_metricas = RegistroMetricas(metricas, ARCHIVO_METRICAS)
+        registro_metricas.start()
+
+    # Diario local de escaneos y su sincronización por lotes con Firebase
+    diario = DiarioEventos("diario_eventos.db")
+    sincronizador = None
+    if FIREBASE_URL:
+        sincronizador = SincronizadorFirebase(diario, FIREBASE_URL, FIREBASE_AUTH or None, metricas=metricas)
+        sincronizador.start()  # Reenvía también lo que quedó pendiente en la ejecución anterior
+
+    # Inventario local de reactivos, reconstruido a partir de los escaneos del diario
+    inventario = Inventario()
+    inventario.cargar_diario(diario)
+
+    # Inicialización de las conexiones seriales
+    cola_serial = queue.Queue()  # Mensajes de los hilos seriales hacia la interfaz
+    cache_etiquetas = CacheEtiquetas("cache_etiquetas.json")  # TRACK no vuelve a leer los campos fijos
+    gestor = GestorEstaciones(cola_serial, diario=diario, delegar=bool(FIREBASE_URL),
+                              inventario=inventario, cache=cache_etiquetas,
+                              metricas=metricas, binario=PROTOCOLO_BINARIO,
+                              baudios_binario=BAUDIOS_BINARIO)  # Un hilo de E/S por estación
+
+    # Configuración de la ventana principal
+    root = tk.Tk()
+    root.title("Sistema de Gestión de Reactivos")
+    root.geometry("680x610")
+
+    # Etiqueta y botón para conectar/desconectar al ESP32
+    tk.Label(root, text="Establece Conexión con el Sistema").pack(pady=(20, 5))
+    btn_conectar = ttk.Button(root, text="Conectar", command=conectar_desconectar)
+    btn_conectar.pack(pady=(0, 5))
+
+    # Selección de la estación a la que se envían los comandos
+    frame_estacion = tk.Frame(root)
+    frame_estacion.pack(pady=(0, 5))
+    ttk.Label(frame_estacion, text="Estación:").grid(row=0, column=0, padx=5)
+    estacion_seleccionada = tk.StringVar()
+    combo_estacion = ttk.Combobox(frame_estacion, textvariable=estacion_seleccionada, state="readonly", width=20)
+    combo_estacion.grid(row=0, column=1, padx=5)
+
+    # Monitor de estado (solo lectura)
+    monitor_estado = scrolledtext.ScrolledText(root, height=17, width=70, state=tk.DISABLED)  # Inicialmente en modo solo lectura
+    monitor_estado.pack(padx=10, pady=10)
+    monitor = MonitorEstado(monitor_estado, MAX_LINEAS_MONITOR, archivo_historial=ARCHIVO_HISTORIAL)
+
+    # Texto para indicar ingreso de nuevo reactivo
+    ttk.Label(root, text="Nuevo Reactivo:").pack(pady=(10, 1))
+
+    # Botón para programar una nueva etiqueta, centrado
+    btn_programar = ttk.Button(root, text="Programar Etiqueta", command=programar_etiqueta)
+    btn_programar.pack(pady=5)
+
+    # Texto para indicar selección de opciones
+    ttk.Label(root, text="Opciones de Registro:").pack(pady=(20, 5))
+
+    # Frame para organizar los botones horizontalmente, centrado
+    frame_botones = tk.Frame(root)
+    frame_botones.pack()
+
+    # Botón para registrar la alta de un reactivo
+    btn_leer = ttk.Button(frame_botones, text="Registrar Alta", command=leer_etiqueta)
+    btn_leer.grid(row=0, column=0, padx=5)
+
+    # Botón para registrar el uso de un reactivo
+    btn_registrar_uso = ttk.Button(frame_botones, text="Registrar Uso", command=registrar_uso)
+    btn_registrar_uso.grid(row=0, column=1, padx=5)
+
+    # Botón para registrar la baja de un reactivo
+    btn_registrar_baja = ttk.Button(frame_botones, text="Registrar Baja", command=registrar_baja)
+    btn_registrar_baja.grid(row=0, column=2, padx=5)
+
+    # Botones para procesar varias etiquetas seguidas y para consultar el inventario
+    frame_herramientas = tk.Frame(root)
+    frame_herramientas.pack(pady=10)
+    btn_escaneo = ttk.Button(frame_herramientas, text="Escaneo Continuo", command=escaneo_continuo)
+    btn_escaneo.grid(row=0, column=0, padx=5)
+    btn_inventario = ttk.Button(frame_herramientas, text="Inventario", command=ver_inventario)
+    btn_inventario.grid(row=0, column=1, padx=5)
+
+    # Atender los mensajes del hilo serial sin bloquear la interfaz
+    root.after(50, procesar_cola_serial)
 
+    try:
+        root.mainloop()
+    finally:
+        # Cerrar los puertos y dejar el diario, las métricas y el historial al día
+        gestor.desconectar()
+        if sincronizador is not None:
+            sincronizador.detener()
+        if registro_metricas is not None:
+            registro_metricas.detener()
+        diario.cerrar()
+        monitor.cerrar()  # Guardar en el historial lo que quedó sin volcar
+
+
+if __name__ == "__main__":
+    main()
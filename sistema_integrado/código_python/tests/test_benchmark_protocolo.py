@@ -0,0 +1,26 @@
+import sys
+
+import pytest
+
+from benchmark_protocolo import ejecutar, percentil
+from simulador_esp32 import Retardos
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="el simulador necesita pty")
+
+
+def test_percentil():
+    valores = [5, 1, 4, 2, 3]
+    assert [percentil(valores, p) for p in (0, 50, 99, 100)] == [1, 3, 5, 5]
+
+
+def test_comandos_sin_terminar_cuentan_como_fallos():
+    # Con los retardos reales, un READ tarda más que el plazo total del benchmark
+    duraciones, fallos, _ = ejecutar(1, ("READ",), 2, Retardos(), timeout_total=0.2)
+    assert duraciones == {"READ": []}
+    assert fallos == {"READ": 2}
+
+
+def test_sin_retardos_todos_terminan():
+    duraciones, fallos, _ = ejecutar(1, ("READ", "TRACK"), 3, Retardos().escalar(0))
+    assert fallos == {"READ": 0, "TRACK": 0}
+    assert [len(valores) for valores in duraciones.values()] == [3, 3]
@@ -0,0 +1,51 @@
+from cache_etiquetas import CAMPOS_FIJOS, CacheEtiquetas
+
+
+def lectura(uid="04a1", **cambios):
+    campos = {"UID": uid, "Alta": "2024-01-01", "Baja": ""}
+    campos.update({campo: f"{campo} de {uid}" for campo in CAMPOS_FIJOS})
+    campos.update(cambios)
+    return campos
+
+
+def test_lectura_completa_y_parcial(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    cache = CacheEtiquetas(ruta=ruta)
+    assert cache.procesar({"UID": "04a1", "Alta": "2024-01-01"}) is None  # Desconocida y parcial
+    assert cache.procesar(lectura()) == "nueva"
+    assert cache.procesar(lectura()) == "igual"
+
+    parcial = {"UID": "04a1", "Alta": "2024-01-01", "Baja": "2024-02-01"}
+    assert CacheEtiquetas(ruta=ruta).procesar(parcial) == "completada"  # Persistida en el archivo
+    assert parcial == lectura(Baja="2024-02-01")
+
+
+def test_cambio_detectado_por_la_suma_de_control():
+    cache = CacheEtiquetas(ruta=None)
+    cache.procesar(lectura())
+    assert cache.procesar(lectura(Lote="L-2")) == "cambio"
+    assert cache.cambios == 1
+
+
+def test_conocida_pide_una_lectura_completa_periodica():
+    cache = CacheEtiquetas(ruta=None, verificar_cada=3)
+    assert not cache.conocida("04a1")
+    cache.procesar(lectura())
+    assert [cache.conocida("04a1") for _ in range(3)] == [True, True, False]
+    cache.procesar(lectura())  # La lectura completa reinicia la cuenta
+    assert cache.conocida("04a1")
+
+
+def test_invalidar_descarta_la_etiqueta(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    cache = CacheEtiquetas(ruta=ruta)
+    cache.procesar(lectura())
+    cache.invalidar("04a1")
+    assert not cache.conocida("04a1")
+    assert len(CacheEtiquetas(ruta=ruta)) == 0
+
+
+def test_archivo_danado_se_ignora(tmp_path):
+    ruta = tmp_path / "cache.json"
+    ruta.write_text("{no es json", encoding="utf-8")
+    assert len(CacheEtiquetas(ruta=str(ruta))) == 0
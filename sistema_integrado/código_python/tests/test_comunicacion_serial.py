@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+
+from comunicacion_serial import Comando, TrabajadorSerial
+
+
+class SerialGuion:
+    """Puerto que responde a cada comando con las líneas que devuelve `responder(comando)`."""
+
+    port = "guion"
+    baudrate = 115200
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.escritos = []
+        self._lineas = queue.Queue()
+
+    def reset_input_buffer(self):
+        pass
+
+    def write(self, datos):
+        linea = datos.decode("utf-8").strip()
+        self.escritos.append(linea)
+        for respuesta in self.responder(linea):
+            self._lineas.put((respuesta + "\r\n").encode("utf-8"))
+        return len(datos)
+
+    def readline(self):
+        try:
+            return self._lineas.get(timeout=0.01)
+        except queue.Empty:
+            return b""
+
+
+def finales(trabajador, cantidad, timeout=5):
+    """Espera `cantidad` mensajes "fin" y devuelve sus resultados."""
+    resultados, limite = [], time.monotonic() + timeout
+    while len(resultados) < cantidad:
+        mensaje = trabajador.salida.get(timeout=max(limite - time.monotonic(), 0.01))
+        if mensaje[0] == "fin":
+            resultados.append(mensaje[3])
+    return resultados
+
+
+def sin_etiqueta(comando):
+    return ["Comando 'TRACK' recibido. Esperando etiqueta...", "No se detectó ninguna etiqueta."]
+
+
+def test_continuo_se_vuelve_a_armar_hasta_cancelarlo():
+    trabajador = TrabajadorSerial(SerialGuion(sin_etiqueta))
+    trabajador.start()
+    try:
+        comando = Comando("TRACK", continuo=True)
+        trabajador.enviar(comando)
+        assert [r.motivo for r in finales(trabajador, 3)] == ["sin_etiqueta"] * 3
+        comando.cancelar()
+        time.sleep(0.2)
+        vueltas = len(trabajador.ser.escritos)
+        time.sleep(0.2)
+        assert len(trabajador.ser.escritos) == vueltas  # Ya no se vuelve a enviar
+    finally:
+        trabajador.detener()
+
+
+def test_cancelar_corta_la_transaccion_en_curso():
+    # El ESP32 queda esperando una etiqueta que no llega: sin cancelar, TRACK duraría 30 s
+    ser = SerialGuion(lambda comando: ["Comando 'TRACK' recibido. Esperando etiqueta..."])
+    trabajador = TrabajadorSerial(ser)
+    trabajador.start()
+    try:
+        comando = Comando("TRACK", continuo=True)
+        trabajador.enviar(comando)
+        time.sleep(0.1)
+        threading.Timer(0.1, comando.cancelar).start()
+        resultado, = finales(trabajador, 1, timeout=2)
+        assert resultado.motivo == "cancelado" and not resultado.exito
+        assert resultado.duracion < 2
+        trabajador.enviar(Comando("READ", timeout=0.1))  # La estación queda libre para otro comando
+        assert finales(trabajador, 1)[0].nombre == "READ"
+        assert ser.escritos == ["TRACK", "READ"]
+    finally:
+        trabajador.detener()
+
+
+def test_cancelado_en_la_cola_no_se_envia():
+    ser = SerialGuion(sin_etiqueta)
+    trabajador = TrabajadorSerial(ser)
+    comando = Comando("TRACK", continuo=True)
+    comando.cancelar()
+    trabajador.enviar(comando)
+    trabajador.start()
+    try:
+        assert finales(trabajador, 1)[0].motivo == "cancelado"
+        assert ser.escritos == []
+    finally:
+        trabajador.detener()
+
+
+def lectura_completa(comando):
+    return [f"Comando '{comando}' recibido. Esperando etiqueta...", "UID: 04a1", "Producto: Metanol",
+            "Datos enviados con éxito.", "Lectura completa."]
+
+
+def test_comandos_en_orden_de_llegada():
+    ser = SerialGuion(lectura_completa)
+    trabajador = TrabajadorSerial(ser)
+    trabajador.start()
+    try:
+        for nombre in ("READ", "OUT", "READ"):
+            trabajador.enviar(Comando(nombre))
+        resultados = finales(trabajador, 3)
+    finally:
+        trabajador.detener()
+    assert [r.nombre for r in resultados] == ["READ", "OUT", "READ"] == ser.escritos
+    assert all(r.exito and r.motivo == "lectura_completa" for r in resultados)
+    assert resultados[0].campos == {"UID": "04a1", "Producto": "Metanol"}
+
+
+def test_eventos_publicados_antes_del_fin():
+    trabajador = TrabajadorSerial(SerialGuion(lectura_completa))
+    trabajador.start()
+    try:
+        trabajador.enviar(Comando("READ"))
+        mensajes = []
+        while not mensajes or mensajes[-1][0] != "fin":
+            mensajes.append(trabajador.salida.get(timeout=5))
+    finally:
+        trabajador.detener()
+    textos = [m[2].texto for m in mensajes if m[0] == "evento"]
+    assert textos[0] == "Enviando comando 'READ'..." and textos[-1] == "Lectura completa."
+    assert all(m[1] == "guion" for m in mensajes)  # La estación es el puerto
+
+
+def test_timeout_sin_evento_final():
+    # Una respuesta incompleta no bloquea al hilo: vence el timeout del comando y sigue el siguiente
+    trabajador = TrabajadorSerial(SerialGuion(lambda comando: ["Leyendo bloques..."]))
+    trabajador.start()
+    try:
+        trabajador.enviar(Comando("READ", timeout=0.2))
+        trabajador.enviar(Comando("OUT", timeout=0.2))
+        vencido, siguiente = finales(trabajador, 2)
+    finally:
+        trabajador.detener()
+    assert vencido.motivo == siguiente.motivo == "timeout"
+    assert 0.2 <= vencido.duracion < 1
+
+
+def test_detener_termina_el_hilo():
+    trabajador = TrabajadorSerial(SerialGuion(lambda comando: []))
+    trabajador.start()
+    trabajador.enviar(Comando("TRACK"))  # Espera hasta 30 s una respuesta que no llega
+    time.sleep(0.1)
+    inicio = time.monotonic()
+    trabajador.detener()
+    assert not trabajador.is_alive() and time.monotonic() - inicio < 1
+    assert finales(trabajador, 1)[0].motivo == "timeout"
@@ -0,0 +1,93 @@
+import io
+import json
+import queue
+
+import pytest
+
+from comunicacion_serial import Comando, TrabajadorSerial
+from estacion_cli import ServicioEstacion, interpretar_orden
+
+
+@pytest.mark.parametrize("linea", [
+    '{"comando": "TRACK", "timeout": "5"}',
+    '{"comando": "TRACK", "timeout": 0}',
+    '{"comando": "TRACK", "timeout": -1}',
+    '{"comando": "TRACK", "timeout": true}',
+    '{"comando": "WRITE", "datos": ["Metanol"]}',
+    '{"comando": "WRITE", "datos": 5}',
+    '{"comando": "TRACK", "continuo": true}',
+    '{"comando": "TRACK", "estacion": ["COM8"]}',
+    '{"comando": "TRACK", "id": {"a": 1}}',
+    '{"cancelar": ["escaneo1"]}',
+    '{"comando": "TRACK", "datos": "x"}',
+    '{"comando": "WRITE"}',
+    '{"comando": "FORMAT"}',
+    '{"comando": ',
+])
+def test_ordenes_invalidas(linea):
+    with pytest.raises(ValueError):
+        interpretar_orden(linea)
+
+
+def test_ordenes_validas():
+    assert interpretar_orden("track") == {"comando": "TRACK"}
+    assert interpretar_orden("WRITE Metanol,1") == {"comando": "WRITE", "datos": "Metanol,1"}
+    assert interpretar_orden('{"comando": "track", "timeout": 2.5}')["timeout"] == 2.5
+    assert interpretar_orden('{"comando": "TRACK", "continuo": true, "id": 7}')["id"] == 7
+    assert interpretar_orden("   ") is None
+
+
+class GestorFalso:
+    nombres = ["COM8"]
+    estaciones = {"COM8": None}
+
+    def __init__(self):
+        self.salida = queue.Queue()
+        self.enviados = []
+
+    def enviar(self, estacion, comando):
+        self.enviados.append(comando)
+
+
+def test_servicio_publica_el_rechazo():
+    salida = io.StringIO()
+    gestor = GestorFalso()
+    ServicioEstacion(gestor, salida).ordenar('{"comando": "TRACK", "timeout": "5"}')
+    mensaje = json.loads(salida.getvalue())
+    assert mensaje["tipo"] == "rechazado" and "timeout" in mensaje["motivo"]
+    assert not gestor.enviados
+
+
+class SerialMudo:
+    """Puerto que acepta escrituras y nunca responde."""
+
+    port = "falso"
+    baudrate = 115200
+
+    def reset_input_buffer(self):
+        pass
+
+    def write(self, datos):
+        return len(datos)
+
+    def readline(self):
+        return b""
+
+
+def test_error_inesperado_no_termina_el_hilo():
+    trabajador = TrabajadorSerial(SerialMudo())
+    trabajador.start()
+    try:
+        malo = Comando("TRACK", continuo=True)
+        malo.timeout = "5"  # time.monotonic() + "5" -> TypeError dentro de _ejecutar
+        trabajador.enviar(malo)
+        trabajador.enviar(Comando("READ", timeout=0.1))
+        mensajes = []
+        while not any(m[0] == "fin" and m[2].nombre == "READ" for m in mensajes):
+            mensajes.append(trabajador.salida.get(timeout=5))
+    finally:
+        trabajador.detener()
+    finales = [m[3].motivo for m in mensajes if m[0] == "fin"]
+    assert finales == ["error_interno", "timeout"]  # El comando continuo no se volvió a armar
+    assert any(m[0] == "error" and "TypeError" in m[2] for m in mensajes)
+    assert not malo.activo
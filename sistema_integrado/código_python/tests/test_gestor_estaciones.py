@@ -0,0 +1,99 @@
+import sys
+
+import pytest
+
+import gestor_estaciones
+from cache_etiquetas import CacheEtiquetas
+from comunicacion_serial import Comando
+from diario_eventos import DiarioEventos
+from gestor_estaciones import GestorEstaciones
+from simulador_esp32 import Retardos, SimuladorESP32
+
+
+class TrabajadorFalso:
+    """Registra los comandos que el gestor envía al conectar."""
+
+    def __init__(self, ser, salida, **opciones):
+        self.ser = ser
+        self.enviados = []
+
+    def start(self):
+        pass
+
+    def enviar(self, comando):
+        self.enviados.append(comando.nombre)
+
+
+@pytest.fixture
+def conectar(monkeypatch):
+    monkeypatch.setattr(gestor_estaciones.serial, "Serial", lambda puerto, baudios, timeout: puerto)
+    monkeypatch.setattr(gestor_estaciones, "TrabajadorSerial", TrabajadorFalso)
+
+    def conectar(**opciones):
+        gestor = GestorEstaciones(archivo_registro=None, **opciones)
+        assert gestor.conectar(["COM1"]) == []
+        return gestor.estaciones["COM1"].enviados
+    return conectar
+
+
+def test_conectar_desactiva_la_delegacion_explicitamente(conectar, tmp_path):
+    assert conectar() == ["DELEGATE OFF", "CACHE OFF"]
+    assert conectar(delegar=True) == ["DELEGATE OFF", "CACHE OFF"]  # Sin diario no hay quien suba lo delegado
+    assert conectar(diario=DiarioEventos(tmp_path / "diario.db"), delegar=True) == ["DELEGATE ON", "CACHE OFF"]
+
+
+def test_conectar_activa_la_cache_solo_si_hay_una(conectar):
+    assert conectar(cache=CacheEtiquetas(ruta=None)) == ["DELEGATE OFF", "CACHE ON"]
+
+
+def test_conectar_negocia_el_protocolo_binario_primero(conectar):
+    assert conectar(binario=True) == ["BINARY ON", "DELEGATE OFF", "CACHE OFF"]
+
+
+class PuertoListado:
+    def __init__(self, device, vid):
+        self.device, self.vid = device, vid
+
+
+def test_descubrir_puertos_filtra_por_fabricante(monkeypatch):
+    puertos = [PuertoListado("COM9", 0x1A86), PuertoListado("COM1", None), PuertoListado("COM3", 0x10C4),
+               PuertoListado("/dev/ttyACM0", 0x2341)]  # Arduino: no es un ESP32
+    monkeypatch.setattr(gestor_estaciones.list_ports, "comports", lambda: puertos)
+    assert gestor_estaciones.descubrir_puertos() == ["COM3", "COM9"]
+
+
+def test_conectar_devuelve_los_puertos_que_fallan(monkeypatch):
+    def abrir(puerto, baudios, timeout):
+        if puerto == "COM2":
+            raise gestor_estaciones.serial.SerialException("ocupado")
+        return puerto
+    monkeypatch.setattr(gestor_estaciones.serial, "Serial", abrir)
+    monkeypatch.setattr(gestor_estaciones, "TrabajadorSerial", TrabajadorFalso)
+    monkeypatch.setattr(gestor_estaciones, "descubrir_puertos", lambda: ["COM1", "COM2", "COM3"])
+    gestor = GestorEstaciones(archivo_registro=None)
+    assert gestor.conectar() == ["COM2"]
+    assert gestor.nombres == ["COM1", "COM3"]
+    assert gestor.conectar(["COM1"]) == [] and gestor.nombres == ["COM1", "COM3"]  # Ya conectado
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="el simulador necesita pty")
+def test_comando_llega_solo_a_la_estacion_elegida():
+    simuladores = [SimuladorESP32(Retardos().escalar(0), semilla=i).iniciar() for i in range(2)]
+    gestor = GestorEstaciones(archivo_registro=None)
+    try:
+        assert gestor.conectar([s.puerto for s in simuladores]) == []
+        elegida = simuladores[1].puerto
+        gestor.enviar(elegida, Comando("READ"))
+        fines = []
+        while not any(m[3].nombre == "READ" for m in fines):
+            mensaje = gestor.salida.get(timeout=5)
+            if mensaje[0] == "fin":
+                fines.append(mensaje)
+        assert [m[1] for m in fines if m[3].nombre == "READ"] == [elegida]
+        uids = {m[3].campos["UID"] for m in fines if m[3].nombre == "READ"}
+        assert uids and uids <= set(simuladores[1].tags)  # Leída por el simulador de esa estación
+    finally:
+        gestor.desconectar()
+        for simulador in simuladores:
+            simulador.detener()
+    assert gestor.nombres == []
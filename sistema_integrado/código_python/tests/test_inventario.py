@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+from diario_eventos import DiarioEventos
+from inventario import Inventario, interpretar_fecha
+from protocolo_esp32 import Resultado
+
+HOY = datetime.date(2025, 3, 1)
+
+
+def campos(uid, producto="Metanol", lote="L1", vencimiento="12/2025", **otros):
+    resultado = {"UID": uid, "Producto": producto, "Lote": lote, "Vencimiento": vencimiento, "Alta": "1/1/2025",
+                 "Baja": ""}
+    resultado.update(otros)
+    return resultado
+
+
+@pytest.mark.parametrize("texto, fin_de_mes, fecha", [
+    ("5/3/2025", False, datetime.date(2025, 3, 5)),
+    ("5/3/25", False, datetime.date(2025, 3, 5)),
+    ("2025-03-05", False, datetime.date(2025, 3, 5)),
+    ("2/2024", False, datetime.date(2024, 2, 1)),
+    ("2/2024", True, datetime.date(2024, 2, 29)),
+    ("31/2/2025", False, None),
+    ("", False, None),
+    (None, False, None),
+    ("sin fecha", False, None),
+])
+def test_interpretar_fecha(texto, fin_de_mes, fecha):
+    assert interpretar_fecha(texto, fin_de_mes) == fecha
+
+
+def test_indices_siguen_a_las_actualizaciones():
+    inventario = Inventario()
+    inventario.actualizar(campos("a", lote="L1", vencimiento="3/2025"))
+    inventario.actualizar(campos("b", lote="L1", vencimiento="10/3/2025"))
+    inventario.actualizar(campos("c", producto="Hexano", lote="L2", vencimiento="1/2026"))
+    assert [r.uid for r in inventario.por_lote("L1")] == ["a", "b"]
+    assert inventario.stock() == {"Hexano": 1, "Metanol": 2}
+    assert [r.uid for r in inventario.por_vencer(dias=9, hoy=HOY)] == ["b"]  # Hasta el 10/3 inclusive
+    assert [r.uid for r in inventario.por_vencer(dias=31, hoy=HOY)] == ["b", "a"]
+
+    # Cambio de lote y vencimiento (p. ej. tras un WRITE): los índices se mueven con el reactivo
+    inventario.actualizar({"UID": "a", "Lote": "L2", "Vencimiento": "2/2026"})
+    assert [r.uid for r in inventario.por_lote("L1")] == ["b"]
+    assert [r.uid for r in inventario.por_lote("L2")] == ["a", "c"]
+    assert [r.uid for r in inventario.vencen_antes(datetime.date(2026, 2, 28))] == ["b", "c", "a"]
+    assert inventario.get("a").producto == "Metanol"  # Los campos ausentes no se tocan
+
+
+def test_baja_descuenta_el_stock():
+    inventario = Inventario()
+    inventario.actualizar(campos("a"))
+    inventario.actualizar(campos("b"))
+    inventario.actualizar({"UID": "a", "Baja": "2/3/2025"}, "OUT")
+    assert inventario.stock("Metanol") == 1 and not inventario.get("a").activo
+    assert [r.uid for r in inventario.por_vencer(hoy=HOY, dias=365)] == ["b"]
+    assert len(inventario.por_vencer(hoy=HOY, dias=365, solo_activos=False)) == 2
+    inventario.actualizar({"UID": "b", "Baja": "2/3/2025"}, "OUT")
+    assert inventario.stock() == {} and inventario.stock("Metanol") == 0
+
+
+def test_track_registra_usos():
+    inventario = Inventario()
+    assert inventario.actualizar({"Producto": "sin UID"}) is None
+    inventario.actualizar(campos("a", Temperatura="21.5", Humedad="40", Peso="error"), "TRACK", 100.0)
+    inventario.actualizar(campos("a"), "READ", 101.0)
+    assert inventario.get("a").usos == [(100.0, 21.5, 40.0, None)]
+
+
+def test_cargar_diario(tmp_path):
+    diario = DiarioEventos(str(tmp_path / "diario.db"))
+    for i, (nombre, datos) in enumerate([("READ", campos("a")), ("TRACK", campos("a", Peso="12")),
+                                         ("OUT", {"UID": "a", "Baja": "2/3/2025"})]):
+        resultado = Resultado(nombre)
+        resultado.campos = datos
+        diario.registrar("COM1", resultado, marca_tiempo=float(i))
+    inventario = Inventario()
+    inventario.cargar_diario(diario)
+    diario.cerrar()
+    reactivo = inventario.get("a")
+    assert reactivo.baja == datetime.date(2025, 3, 2) and reactivo.usos[0].peso == 12.0
+    assert len(inventario) == 1 and "a" in inventario
@@ -0,0 +1,102 @@
+import json
+import math
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metricas import Histograma, Metricas, RegistroMetricas, ServidorMetricas, describir_metricas_estaciones
+
+# Una línea de muestra del formato de texto de Prometheus: nombre{etiqueta="valor",...} número
+MUESTRA = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*"'
+                     r'(,[a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*")*\})? (\+Inf|-?[0-9.e+-]+)$')
+
+
+def metricas_de_prueba():
+    metricas = Metricas(limites=(0.1, 1))
+    describir_metricas_estaciones(metricas)
+    metricas.incrementar("comandos_total", estacion="/dev/ttyUSB0", comando="READ", motivo="lectura_completa")
+    metricas.incrementar("comandos_total", 2, estacion='COM"3\\', comando="TRACK", motivo="timeout")
+    for segundos in (0.05, 0.1, 0.5, 3):
+        metricas.observar("comando_fase_segundos", segundos, estacion="COM3", comando="READ", fase="total")
+    return metricas
+
+
+def test_histograma_acumulado_y_percentiles():
+    histograma = Histograma(limites=(1, 2))
+    for valor in (0.5, 1, 1.5, 2, 7):
+        histograma.observar(valor)
+    assert histograma.acumulados() == [(1, 2), (2, 4), (math.inf, 5)]  # Los límites son inclusivos
+    assert histograma.percentil(40) == 1 and histograma.percentil(60) == 1.5
+    assert histograma.percentil(100) == 2  # Sobre el último límite no hay más resolución
+    assert Histograma().percentil(50) is None
+
+
+def test_formato_de_texto_de_prometheus():
+    texto = metricas_de_prueba().texto_prometheus()
+    assert texto.endswith("\n")
+    lineas = texto.splitlines()
+    comentarios = [linea for linea in lineas if linea.startswith("#")]
+    assert all(MUESTRA.match(linea) for linea in lineas if not linea.startswith("#"))
+
+    # HELP y TYPE una sola vez por métrica, antes de sus muestras
+    assert comentarios.count("# TYPE rfid_comandos_total counter") == 1
+    assert comentarios.count("# TYPE rfid_comando_fase_segundos histogram") == 1
+    assert lineas.index("# TYPE rfid_comandos_total counter") < lineas.index(
+        'rfid_comandos_total{comando="READ",estacion="/dev/ttyUSB0",motivo="lectura_completa"} 1')
+    assert 'rfid_comandos_total{comando="TRACK",estacion="COM\\"3\\\\",motivo="timeout"} 2' in lineas
+
+    # Intervalos acumulados, con +Inf igual a la cantidad de observaciones
+    etiquetas = 'comando="READ",estacion="COM3",fase="total"'
+    assert [linea for linea in lineas if linea.startswith("rfid_comando_fase_segundos_")] == [
+        f'rfid_comando_fase_segundos_bucket{{{etiquetas},le="0.1"}} 2',
+        f'rfid_comando_fase_segundos_bucket{{{etiquetas},le="1.0"}} 3',
+        f'rfid_comando_fase_segundos_bucket{{{etiquetas},le="+Inf"}} 4',
+        f"rfid_comando_fase_segundos_sum{{{etiquetas}}} 3.65",
+        f"rfid_comando_fase_segundos_count{{{etiquetas}}} 4",
+    ]
+
+
+def test_servidor_http():
+    servidor = ServidorMetricas(metricas_de_prueba(), puerto=0).iniciar()
+    base = f"http://127.0.0.1:{servidor.puerto}"
+    try:
+        with urllib.request.urlopen(base + "/metrics", timeout=5) as respuesta:
+            assert respuesta.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "rfid_comandos_total" in respuesta.read().decode("utf-8")
+        with urllib.request.urlopen(base + "/metrics.json", timeout=5) as respuesta:
+            instantanea = json.load(respuesta)
+        assert instantanea["histogramas"][0]["cantidad"] == 4
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(base + "/otra", timeout=5)
+        assert error.value.code == 404
+    finally:
+        servidor.detener()
+
+
+def test_registro_rota_el_archivo(tmp_path):
+    ruta = tmp_path / "metricas.jsonl"
+    registro = RegistroMetricas(metricas_de_prueba(), str(ruta), max_bytes=2000, copias=2)
+    for _ in range(10):
+        registro.escribir()
+    registro.detener()
+    archivos = sorted(p.name for p in tmp_path.iterdir())
+    assert archivos == ["metricas.jsonl", "metricas.jsonl.1", "metricas.jsonl.2"]  # Solo `copias` copias
+    for archivo in tmp_path.iterdir():
+        assert archivo.stat().st_size <= 2000
+        for linea in archivo.read_text(encoding="utf-8").splitlines():
+            assert json.loads(linea)["contadores"][0]["nombre"] == "comandos_total"
+
+
+def test_registro_escribe_la_ultima_instantanea_al_detenerse(tmp_path):
+    ruta = tmp_path / "metricas.jsonl"
+    metricas = Metricas()
+    registro = RegistroMetricas(metricas, str(ruta), intervalo=3600)
+    registro.start()
+    metricas.incrementar("timeouts_total", estacion="COM3", comando="TRACK")
+    registro.detener()
+    assert not registro.is_alive()
+    linea, = ruta.read_text(encoding="utf-8").splitlines()
+    assert json.loads(linea)["contadores"] == [
+        {"nombre": "timeouts_total", "etiquetas": {"comando": "TRACK", "estacion": "COM3"}, "valor": 1}]
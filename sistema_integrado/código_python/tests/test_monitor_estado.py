@@ -0,0 +1,127 @@
+import tkinter as tk
+
+import pytest
+
+from monitor_estado import MonitorEstado
+
+
+class TextoFalso:
+    """Lo que MonitorEstado usa de un tk.Text, sin pantalla: el contenido y los after pendientes."""
+
+    def __init__(self):
+        self.contenido = ""
+        self.programados = []
+        self.inserciones = 0
+        self.estado = tk.DISABLED
+        self.desplazado = False  # El usuario subió para leer líneas anteriores
+
+    def after(self, ms, funcion):
+        self.programados.append(funcion)
+
+    def correr_programados(self):
+        programados, self.programados = self.programados, []
+        for funcion in programados:
+            funcion()
+
+    def yview(self):
+        return (0.0, 0.5 if self.desplazado else 1.0)
+
+    def config(self, state):
+        self.estado = state
+
+    def insert(self, indice, texto):
+        assert indice == tk.END and self.estado == tk.NORMAL
+        self.contenido += texto
+        self.inserciones += 1
+
+    def index(self, indice):
+        # Como en Tk, el texto siempre termina en un salto de línea implícito
+        assert indice == "end-1c"
+        return f"{self.contenido.count(chr(10)) + 1}.{len(self.contenido.rsplit(chr(10), 1)[-1])}"
+
+    def delete(self, desde, hasta):
+        assert desde == "1.0" and hasta.endswith(".0") and self.estado == tk.NORMAL
+        lineas = self.contenido.split("\n")
+        self.contenido = "\n".join(lineas[int(hasta.split(".")[0]) - 1:])
+
+    def see(self, indice):
+        self.visto = indice
+
+    def lineas(self):
+        return self.contenido.splitlines()
+
+
+def test_agrupa_las_lineas_en_un_volcado():
+    widget = TextoFalso()
+    monitor = MonitorEstado(widget, archivo_historial=None)
+    for i in range(50):
+        monitor.agregar(f"Línea {i}\n")
+    assert len(widget.programados) == 1 and widget.contenido == ""  # Un solo volcado programado
+    widget.correr_programados()
+    assert widget.inserciones == 1 and widget.lineas() == [f"Línea {i}" for i in range(50)]
+    assert widget.estado == tk.DISABLED and widget.visto == tk.END
+    monitor.agregar("Otra\n")
+    assert len(widget.programados) == 1  # Después de volcar se programa el siguiente
+
+
+def test_recorta_las_lineas_mas_antiguas():
+    widget = TextoFalso()
+    monitor = MonitorEstado(widget, max_lineas=10, archivo_historial=None)
+    for lote in range(5):
+        for i in range(7):
+            monitor.agregar(f"{lote}-{i}\n")
+        widget.correr_programados()
+        assert len(widget.lineas()) <= 10
+    assert widget.lineas() == [f"{lote}-{i}" for lote in range(5) for i in range(7)][-10:]
+
+
+def test_linea_sin_terminar_se_completa_en_el_siguiente_lote():
+    widget = TextoFalso()
+    monitor = MonitorEstado(widget, max_lineas=2, archivo_historial=None)
+    monitor.agregar("Leyendo ")
+    widget.correr_programados()
+    monitor.agregar("bloques...\nLectura completa.\n")
+    widget.correr_programados()
+    assert widget.lineas() == ["Leyendo bloques...", "Lectura completa."]
+
+
+def test_no_sigue_el_final_si_el_usuario_se_desplazo():
+    widget = TextoFalso()
+    widget.desplazado = True
+    monitor = MonitorEstado(widget, archivo_historial=None)
+    monitor.agregar("Línea\n")
+    widget.correr_programados()
+    assert not hasattr(widget, "visto")
+
+
+def test_historial_completo_con_rotacion(tmp_path):
+    ruta = tmp_path / "historial.log"
+    widget = TextoFalso()
+    monitor = MonitorEstado(widget, max_lineas=5, archivo_historial=str(ruta), max_bytes=400, copias=1)
+    for i in range(40):
+        monitor.agregar(f"Evento {i}\n\n")  # Las líneas vacías no se guardan
+        if i % 4 == 3:
+            widget.correr_programados()
+    monitor.agregar("Sin volcar\n")
+    monitor.cerrar()  # Lo pendiente llega al historial aunque el widget ya no se actualice
+    assert widget.lineas() == ["", "Evento 38", "", "Evento 39", ""]  # max_lineas líneas completas
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["historial.log", "historial.log.1"]
+    lineas = ruta.read_text(encoding="utf-8").splitlines()
+    assert lineas[-1].endswith(" Sin volcar") and all(linea.split(" ", 2)[2] for linea in lineas)
+
+
+def test_con_un_widget_de_tk():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("Sin pantalla para Tk")
+    try:
+        widget = tk.Text(root, state=tk.DISABLED)
+        monitor = MonitorEstado(widget, max_lineas=3, archivo_historial=None)
+        for i in range(8):
+            monitor.agregar(f"Línea {i}\n")
+        monitor.volcar()
+        assert widget.get("1.0", "end-1c").splitlines() == ["Línea 5", "Línea 6", "Línea 7"]
+        assert widget.cget("state") == tk.DISABLED
+    finally:
+        root.destroy()
@@ -0,0 +1,162 @@
+import pytest
+
+from comunicacion_serial import Comando, TrabajadorSerial
+from protocolo_binario import (COMANDOS, DATOS, LINEAS, SYNC, TEXTO_BINARIO, DecodificadorTramas,
+                               codificar_linea, codificar_orden, extraer_trama, trama)
+from protocolo_esp32 import interpretar_linea
+
+LINEAS_ESP32 = LINEAS + (
+    "UID detectado: 04a1b2c3",
+    "Producto: Metanol",
+    "Peso: 123.40 g",
+    "Lote: Sin valor",
+    "Error al leer el bloque 5",
+    "Creando la ruta en Firebase: 04a1b2c3...",
+    "Línea libre con ñ, ¥ y °C",
+)
+
+
+def decodificar(datos, de_a=None):
+    """Eventos de alimentar los bytes de una vez, o de a `de_a` bytes."""
+    decodificador = DecodificadorTramas()
+    if de_a is None:
+        return decodificador.alimentar(datos), decodificador
+    eventos = []
+    for i in range(0, len(datos), de_a):
+        eventos += decodificador.alimentar(datos[i:i + de_a])
+    return eventos, decodificador
+
+
+@pytest.mark.parametrize("de_a", [None, 1, 7])
+def test_ida_y_vuelta(de_a):
+    datos = b"".join(codificar_linea(linea) for linea in LINEAS_ESP32)
+    eventos, decodificador = decodificar(datos, de_a)
+    assert eventos == [interpretar_linea(linea) for linea in LINEAS_ESP32]
+    assert decodificador.invalidas == 0
+
+
+def test_ordenes_del_equipo():
+    for orden, codigo, datos in [("READ", 0x01, b""), ("KNOWN 04a1", 0x11, b"04a1"), ("1,2,3", DATOS, b"1,2,3")]:
+        assert extraer_trama(codificar_orden(orden)) == (codigo, datos, len(datos) + 5)
+
+
+def test_trama_rechaza_datos_de_mas():
+    assert extraer_trama(trama(TEXTO_BINARIO, b"x" * 254))[1] == b"x" * 254
+    with pytest.raises(ValueError):
+        trama(TEXTO_BINARIO, b"x" * 255)
+
+
+def test_texto_y_tramas_mezclados():
+    datos = b"ets Jun  8 2016\r\n" + codificar_linea("Lectura completa.") + "Precio: 5 ¥\n".encode("utf-8")
+    eventos, decodificador = decodificar(datos, 1)
+    assert [e.texto for e in eventos] == ["ets Jun  8 2016", "Lectura completa.", "Precio: 5 ¥"]
+    assert decodificador.invalidas == 0
+
+
+def test_sync_en_texto_utf8_no_retiene_la_linea():
+    # "¥" es C2 A5: el 0xA5 no inicia una trama y la línea no queda esperando bytes
+    eventos, _ = decodificar("¥\n".encode("utf-8"))
+    assert [e.texto for e in eventos] == ["¥"]
+
+
+def test_trama_danada_se_descarta_entera():
+    danada = bytearray(codificar_linea("Línea libre con datos\n variados"[:21]))
+    danada[5] ^= 0xFF
+    danada[7] = ord("\n")  # Un fin de línea dentro de la trama dañada no genera un evento
+    datos = bytes(danada) + codificar_linea("Lectura completa.")
+    eventos, decodificador = decodificar(datos)
+    assert [e.texto for e in eventos] == ["Lectura completa."]
+    assert decodificador.invalidas == 1
+
+
+def test_trama_danada_seguida_de_texto():
+    danada = bytearray(codificar_linea("UID detectado: 04a1"))
+    danada[-1] ^= 0xFF
+    eventos, decodificador = decodificar(bytes(danada) + b"\nSetup completado\n")
+    assert [e.texto for e in eventos] == ["Setup completado"]
+    assert decodificador.invalidas == 1
+
+
+def test_trama_cortada_expira():
+    # Un 0xA5 suelto con una longitud que nunca llega no retiene la trama siguiente
+    decodificador = DecodificadorTramas()
+    assert decodificador.alimentar(bytes((SYNC, 200)) + codificar_linea("Lectura completa.")) == []
+    assert [e.texto for e in decodificador.expirar()] == ["Lectura completa."]
+    assert decodificador.invalidas == 1
+    assert decodificador.expirar() == []
+
+
+def test_reiniciar_descarta_lo_pendiente():
+    decodificador = DecodificadorTramas()
+    decodificador.alimentar(codificar_linea("Lectura completa.")[:4])
+    decodificador.reiniciar()
+    assert [e.texto for e in decodificador.alimentar(codificar_linea("Leyendo bloques..."))] == [
+        "Leyendo bloques..."]
+
+
+class EspBinario:
+    """Puerto de un ESP32 que quedó en modo binario, a `baudios`, de una sesión anterior."""
+
+    port = "falso"
+
+    def __init__(self, baudios):
+        self.baudrate = 115200
+        self.baudios_esp32 = baudios
+        self.binario = True
+        self.escrito = []
+        self._respuesta = b""
+
+    def reset_input_buffer(self):
+        self._respuesta = b""
+
+    def write(self, datos):
+        self.escrito.append((self.baudrate, datos))
+        if self.baudrate != self.baudios_esp32:
+            return  # A otra velocidad el ESP32 solo recibe basura
+        if datos[0] == SYNC:
+            assert extraer_trama(datos)[0] == COMANDOS["BINARY OFF"]
+            orden = "BINARY OFF"
+        else:
+            orden = datos.decode("utf-8").strip()
+        activar = orden.startswith("BINARY ON")
+        linea = "Protocolo binario: activado." if activar else "Protocolo binario: desactivado."
+        self._respuesta += codificar_linea(linea) if self.binario else (linea + "\r\n").encode()
+        self.binario = activar
+        self.baudios_esp32 = int(orden[10:] or self.baudios_esp32) if activar else 115200
+
+    @property
+    def in_waiting(self):
+        return len(self._respuesta)
+
+    def read(self, cantidad=1):
+        datos, self._respuesta = self._respuesta[:cantidad], self._respuesta[cantidad:]
+        return datos
+
+    def readline(self):
+        return self.read(len(self._respuesta))
+
+    def flush(self):
+        pass
+
+
+@pytest.mark.parametrize("baudios", [115200, 921600])
+def test_negociacion_con_esp32_en_modo_binario(baudios):
+    ser = EspBinario(baudios)
+    trabajador = TrabajadorSerial(ser, baudios_binario=921600)
+    resultado = trabajador._ejecutar(Comando("BINARY ON", timeout=0.3))
+    assert resultado.exito
+    assert trabajador.decodificador is not None and ser.baudrate == 921600
+
+    # Al detenerse deja al ESP32 en modo texto y a la velocidad inicial
+    trabajador.detener()
+    assert ser.escrito[-1] == (921600, codificar_orden("BINARY OFF"))
+    assert not ser.binario and ser.baudios_esp32 == 115200
+
+
+def test_negociacion_fallida_conserva_el_modo_texto():
+    ser = EspBinario(460800)
+    trabajador = TrabajadorSerial(ser, baudios_binario=921600)
+    resultado = trabajador._ejecutar(Comando("BINARY ON", timeout=0.2))
+    assert resultado.motivo == "timeout"
+    assert trabajador.decodificador is None and ser.baudrate == 115200
+    assert [b for b, _ in ser.escrito] == [115200, 921600]
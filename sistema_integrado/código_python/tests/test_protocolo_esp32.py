@@ -0,0 +1,111 @@
+from protocolo_esp32 import (CAMPO, CAMPO_REGISTRADO, ERROR, ERROR_FATAL, FIREBASE_OK, LECTURA_COMPLETA,
+                             SIN_ETIQUETA, TEXTO, UID_DETECTADO, Resultado, interpretar_linea)
+
+
+def alimentar(nombre, lineas):
+    """Resultado de un comando tras recibir las líneas; None si quedaron líneas después del fin."""
+    resultado = Resultado(nombre)
+    for i, linea in enumerate(lineas):
+        if resultado.agregar(interpretar_linea(linea)):
+            assert i == len(lineas) - 1, f"El comando terminó antes de tiempo en {linea!r}"
+    return resultado
+
+
+def test_interpretar_lineas():
+    assert interpretar_linea("Lectura completa.").tipo == LECTURA_COMPLETA
+    assert interpretar_linea("Campo 'alta' registrado con éxito!").tipo == CAMPO_REGISTRADO
+    assert interpretar_linea("Error al leer el bloque 5").tipo == ERROR_FATAL
+    assert interpretar_linea("Error al enviar 01_producto: timeout").tipo == ERROR
+    assert interpretar_linea("UID detectado: 04a1b2").valor == "04a1b2"
+    assert interpretar_linea("UID detectado: 04a1b2").tipo == UID_DETECTADO
+    assert interpretar_linea("cualquier cosa").tipo == TEXTO
+
+
+def test_interpretar_campos_con_unidad_y_sin_valor():
+    assert interpretar_linea("Peso: 123.40 g") == (CAMPO, "Peso: 123.40 g", "Peso", "123.40")
+    assert interpretar_linea("Lote: Sin valor").valor == ""
+    assert interpretar_linea("Producto: Metanol: grado HPLC").valor == "Metanol: grado HPLC"
+
+
+def test_read_completo_con_alta_nueva():
+    resultado = alimentar("READ", [
+        "Comando 'READ' recibido. Esperando etiqueta...",
+        "Etiqueta detectada. Verificando campos...",
+        "Campo 'alta' registrado con éxito!",
+        "Leyendo bloques...",
+        "UID: 04a1b2",
+        "Producto: Metanol",
+        "Lectura completa.",  # De la lectura intermedia: todavía falta Firebase
+        "Fecha de alta registrada: 18/10/2026",
+        "Creando la ruta en Firebase: 04a1b2...",
+        "Datos enviados con éxito.",
+        "Lectura completa.",
+    ])
+    assert resultado.terminado and resultado.exito and resultado.motivo == LECTURA_COMPLETA
+    assert resultado.campos["Producto"] == "Metanol"
+    assert resultado.firebase_ok
+
+
+def test_error_en_lectura_intermedia_no_termina_read():
+    # leerDatosGUI informa el error pero leerEtiqueta sigue hasta Firebase y "Lectura completa."
+    resultado = alimentar("READ", [
+        "Comando 'READ' recibido. Esperando etiqueta...",
+        "Etiqueta detectada. Verificando campos...",
+        "Campo 'alta' registrado con éxito!",
+        "Leyendo bloques...",
+        "Error al leer el bloque 9",
+        "Fecha de alta registrada: 18/10/2026",
+        "Fecha de alta previamente registrada. Leyendo bloques...",
+        "Creando la ruta en Firebase: 04a1b2...",
+        "Datos enviados con éxito.",
+        "Lectura completa.",
+    ])
+    assert resultado.exito and resultado.motivo == LECTURA_COMPLETA
+    assert any(e.tipo == ERROR and e.texto == "Error al leer el bloque 9" for e in resultado.eventos)
+    assert not resultado.contiene(ERROR_FATAL)
+
+
+def test_sin_etiqueta_en_lectura_intermedia_no_termina_out():
+    resultado = alimentar("OUT", [
+        "Comando 'OUT' recibido. Esperando etiqueta...",
+        "Etiqueta detectada. Verificando campos...",
+        "Campo 'baja' registrado con éxito!",
+        "No se detectó ninguna etiqueta.",
+        "Fecha de baja registrada: 18/10/2026",
+        "Creando la ruta en Firebase: 04a1b2...",
+        "Hubo errores al enviar los datos.",
+        "Lectura completa.",
+    ])
+    assert resultado.exito and not resultado.firebase_ok
+    assert not resultado.contiene(SIN_ETIQUETA)
+
+
+def test_error_antes_de_grabar_termina_el_comando():
+    resultado = alimentar("READ", [
+        "Comando 'READ' recibido. Esperando etiqueta...",
+        "Etiqueta detectada. Verificando campos...",
+        "Error al leer el bloque 5",
+    ])
+    assert resultado.terminado and not resultado.exito and resultado.motivo == ERROR_FATAL
+
+    resultado = alimentar("OUT", ["Comando 'OUT' recibido. Esperando etiqueta...",
+                                  "No se detectó ninguna etiqueta."])
+    assert resultado.terminado and resultado.motivo == SIN_ETIQUETA
+
+
+def test_track_no_tiene_lectura_intermedia():
+    resultado = alimentar("TRACK", [
+        "Comando 'TRACK' recibido. Esperando etiqueta...",
+        "Etiqueta detectada. Leyendo bloques...",
+        "Campo 'alta' registrado con éxito!",
+        "Error al enviar el peso: connection lost",
+    ])
+    assert resultado.terminado and resultado.motivo == ERROR_FATAL
+
+
+def test_exito_de_read_requiere_firebase():
+    resultado = Resultado("READ")
+    assert not resultado.agregar(interpretar_linea("Lectura completa."))
+    assert resultado.agregar(interpretar_linea("Datos enviados con éxito.")) is False
+    assert resultado.contiene(FIREBASE_OK)
+    assert resultado.agregar(interpretar_linea("Lectura completa."))
@@ -37,6 +37,19 @@ struct Reactivo {
 // Declaración de la variable para definir el modo de operación
 bool interfaceMode = false;  // Modo manual por defecto
 
+// En modo interfaz, el equipo (Python) puede encargarse de subir los datos a Firebase en lotes
+bool envioDelegado = false;
+
+// En modo interfaz, el equipo puede guardar los campos fijos de cada etiqueta: si ya la conoce,
+// TRACK solo lee los bloques de alta y baja
+bool cacheEtiquetas = false;
+
+// Protocolo binario con tramas, opcional: el equipo lo negocia con "BINARY ON" (ver protocolo_binario.py)
+// Trama: SYNC (0xA5) | LONGITUD | CÓDIGO | DATOS | CRC16 (CCITT-FALSE de LONGITUD, CÓDIGO y DATOS)
+const uint8_t SYNC_TRAMA = 0xA5;
+const long BAUDIOS_TEXTO = 115200;  // Velocidad inicial; "BINARY OFF" vuelve a ella
+bool modoBinario = false;
+
 // Clave predeterminada para autenticar los bloques en las etiquetas RFID
 const uint8_t DEFAULT_KEY[6] = { 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF };
 const int TOTAL_BLOCKS = 63;  // Número total de bloques en la tarjeta MIFARE Classic 1K
@@ -45,20 +58,228 @@ const int TOTAL_BLOCKS = 63;  // Número total de bloques en la tarjeta MIFARE C
 const int LOADCELL_DOUT_PIN = 18;
 const int LOADCELL_SCK_PIN = 19;
 
+// Códigos del protocolo binario. Las tablas deben tener el mismo orden que en protocolo_binario.py
+const char* const COMANDOS_BINARIOS[] = {"", "READ", "WRITE", "TRACK", "OUT", "DELEGATE ON", "DELEGATE OFF",
+                                         "CACHE ON", "CACHE OFF", "BINARY OFF"};  // Equipo -> ESP32, desde 0x01
+const uint8_t DATOS_BINARIOS = 0x10;  // Una línea de texto (p. ej. los valores de WRITE)
+const uint8_t KNOWN_BINARIO = 0x11;   // KNOWN <uid>
+const uint8_t UNKNOWN_BINARIO = 0x12;
+const uint8_t CAMPO_BINARIO = 0x20;   // ESP32 -> equipo: código del campo y valor
+const uint8_t PREFIJO_BASE = 0x30;    // 0x30 + índice en PREFIJOS_BINARIOS, seguido del resto de la línea
+const uint8_t LINEA_BASE = 0x40;      // 0x40 + índice en LINEAS_BINARIAS, sin datos
+const uint8_t TEXTO_BINARIO = 0x7F;   // La línea completa
+
+const char* const LINEAS_BINARIAS[] = {
+  "Etiqueta detectada. Verificando campos...",
+  "Etiqueta detectada. Leyendo bloques...",
+  "Etiqueta detectada. Esperando valores...",
+  "No se detectó ninguna etiqueta.",
+  "Datos enviados con éxito.",
+  "Hubo errores al enviar los datos.",
+  "Registro de uso guardado en la nube.",
+  "Datos delegados al equipo.",
+  "Registro de uso delegado al equipo.",
+  "Envío delegado: activado.",
+  "Envío delegado: desactivado.",
+  "Caché de etiquetas: activada.",
+  "Caché de etiquetas: desactivada.",
+  "Datos fijos omitidos (etiqueta conocida).",
+  "Lectura completa.",
+  "Datos guardados exitosamente.",
+  "Error al programar la etiqueta.",
+  "Error: UID inválido.",
+  "UID inválido",
+  "Protocolo binario: activado.",
+  "Protocolo binario: desactivado.",
+  "Comando 'READ' recibido. Esperando etiqueta...",
+  "Comando 'TRACK' recibido. Esperando etiqueta...",
+  "Comando 'OUT' recibido. Esperando etiqueta...",
+  "Comando 'WRITE' recibido. Esperando datos...",
+  "Leyendo bloques...",
+  "Datos del Reactivo:",
+  "Datos del reactivo:",
+  "Fecha de alta previamente registrada. Leyendo bloques...",
+  "Fecha de baja previamente registrada. Leyendo bloques...",
+  "Etiqueta conocida: solo se leen alta y baja.",
+  "Campo 'alta' registrado con éxito!",
+  "Campo 'baja' registrado con éxito!",
+  "Campo 'valor' registrado con éxito!",
+  "Error al leer datos del sensor DHT11!",
+  "Error: El HX711 no está listo. Reintentar...",
+  "Autenticación fallida después de varios intentos."
+};
+
+// En orden de prioridad: se usa el primero que coincide
+const char* const PREFIJOS_BINARIOS[] = {
+  "UID detectado: ",
+  "Fecha de alta registrada: ",
+  "Fecha de baja registrada: ",
+  "Creando la ruta en Firebase: ",
+  "Error al leer el bloque ",
+  "Error al enviar el peso: ",
+  "Error al enviar ",
+  "Valor vacío para ",
+  "Datos recibidos: ",
+  "Error: El valor ",
+  "Error de autenticación en el bloque ",
+  "Valor ",
+  "Comando '"
+};
+
+const char* const CAMPOS_BINARIOS[] = {
+  "UID",
+  "Producto",
+  "Número",
+  "Alta",
+  "Marca",
+  "Código",
+  "Presentación",
+  "Lote",
+  "Vencimiento",
+  "Baja",
+  "Temperatura",
+  "Humedad",
+  "Peso"
+};
+
+const int TOTAL_LINEAS_BINARIAS = sizeof(LINEAS_BINARIAS) / sizeof(LINEAS_BINARIAS[0]);
+const int TOTAL_PREFIJOS_BINARIOS = sizeof(PREFIJOS_BINARIOS) / sizeof(PREFIJOS_BINARIOS[0]);
+const int TOTAL_CAMPOS_BINARIOS = sizeof(CAMPOS_BINARIOS) / sizeof(CAMPOS_BINARIOS[0]);
+const int TOTAL_COMANDOS_BINARIOS = sizeof(COMANDOS_BINARIOS) / sizeof(COMANDOS_BINARIOS[0]);
+
+// CRC-16/CCITT-FALSE (polinomio 0x1021, valor inicial 0xFFFF)
+uint16_t crc16(const uint8_t* datos, size_t cantidad) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < cantidad; i++) {
+    crc ^= (uint16_t)datos[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Envía una trama con el código y hasta 254 bytes de datos (ninguna línea del sketch llega a ese largo)
+void enviarTrama(uint8_t codigo, const uint8_t* datos, size_t cantidad) {
+  if (cantidad > 254) cantidad = 254;
+  uint8_t trama[259];
+  trama[0] = SYNC_TRAMA;
+  trama[1] = cantidad + 1;
+  trama[2] = codigo;
+  if (cantidad > 0) memcpy(trama + 3, datos, cantidad);
+  uint16_t crc = crc16(trama + 1, cantidad + 2);
+  trama[cantidad + 3] = crc >> 8;
+  trama[cantidad + 4] = crc & 0xFF;
+  Serial.write(trama, cantidad + 5);
+}
+
+// Envía como trama una línea que en modo texto se imprimiría tal cual
+void enviarLineaBinaria(const String& linea) {
+  if (linea.length() == 0) return;
+  const char* texto = linea.c_str();
+
+  // Línea fija: solo el código
+  for (int i = 0; i < TOTAL_LINEAS_BINARIAS; i++) {
+    if (strcmp(texto, LINEAS_BINARIAS[i]) == 0) {
+      enviarTrama(LINEA_BASE + i, nullptr, 0);
+      return;
+    }
+  }
+
+  // Campo "Nombre: valor": código del campo y valor
+  for (int i = 0; i < TOTAL_CAMPOS_BINARIOS; i++) {
+    size_t largo = strlen(CAMPOS_BINARIOS[i]);
+    if (strncmp(texto, CAMPOS_BINARIOS[i], largo) == 0 && strncmp(texto + largo, ": ", 2) == 0) {
+      uint8_t datos[254];
+      size_t cantidad = min(linea.length() - largo - 2, (size_t)253);
+      datos[0] = i;
+      memcpy(datos + 1, texto + largo + 2, cantidad);
+      enviarTrama(CAMPO_BINARIO, datos, cantidad + 1);
+      return;
+    }
+  }
+
+  // Línea con un prefijo conocido: código del prefijo y el resto de la línea
+  for (int i = 0; i < TOTAL_PREFIJOS_BINARIOS; i++) {
+    size_t largo = strlen(PREFIJOS_BINARIOS[i]);
+    if (strncmp(texto, PREFIJOS_BINARIOS[i], largo) == 0) {
+      enviarTrama(PREFIJO_BASE + i, (const uint8_t*)texto + largo, linea.length() - largo);
+      return;
+    }
+  }
+
+  enviarTrama(TEXTO_BINARIO, (const uint8_t*)texto, linea.length());
+}
+
+// Salida de todos los mensajes: en modo texto escribe directamente en Serial; en modo
+// binario junta cada línea y la envía como una trama al llegar el salto de línea
+class SalidaProtocolo : public Print {
+ public:
+  size_t write(uint8_t c) override {
+    if (!modoBinario) return Serial.write(c);
+    if (c == '\n') {
+      enviarLineaBinaria(linea);
+      linea = "";
+    } else if (c != '\r') {
+      linea += (char)c;
+    }
+    return 1;
+  }
+
+  size_t write(const uint8_t* buffer, size_t cantidad) override {
+    if (!modoBinario) return Serial.write(buffer, cantidad);
+    for (size_t i = 0; i < cantidad; i++) write(buffer[i]);
+    return cantidad;
+  }
+
+ private:
+  String linea;
+};
+
+SalidaProtocolo salida;
+
+// Lee una orden del equipo, que puede llegar como trama o como línea de texto en cualquier modo.
+// Devuelve la misma línea que se hubiera recibido en modo texto ("" si la trama está dañada).
+String leerEntrada() {
+  if (Serial.peek() != SYNC_TRAMA) {
+    return Serial.readStringUntil('\n');
+  }
+  Serial.read();  // SYNC
+
+  // trama[0]: LONGITUD; trama[1]: CÓDIGO; luego los datos y el CRC
+  uint8_t trama[258];
+  if (Serial.readBytes(trama, 1) != 1 || trama[0] == 0) return "";
+  int longitud = trama[0];
+  if (Serial.readBytes(trama + 1, longitud + 2) != (size_t)(longitud + 2)) return "";
+  uint16_t crc = ((uint16_t)trama[longitud + 1] << 8) | trama[longitud + 2];
+  if (crc16(trama, longitud + 1) != crc) return "";
+
+  uint8_t codigo = trama[1];
+  String datos = "";
+  for (int i = 2; i <= longitud; i++) {
+    datos += (char)trama[i];
+  }
+  if (codigo > 0 && codigo < TOTAL_COMANDOS_BINARIOS) return COMANDOS_BINARIOS[codigo];
+  if (codigo == DATOS_BINARIOS) return datos;
+  if (codigo == KNOWN_BINARIO) return "KNOWN " + datos;
+  if (codigo == UNKNOWN_BINARIO) return "UNKNOWN";
+  return "";
+}
+
 // Inicializa la conexión WiFi
 void initWiFi() {
-  Serial.print("Conectando a WiFi");
+  salida.print("Conectando a WiFi");
   WiFi.begin(WIFI_SSID, WIFI_PASSWORD);  // Conectar a la red WiFi
   int retries = 0;
   while (WiFi.status() != WL_CONNECTED && retries < 10) {  // Intentar 10 veces
-    Serial.print(".");
+    salida.print(".");
     delay(1000);  // Espera entre intentos
     retries++;
   }
   if (WiFi.status() == WL_CONNECTED) {
-    Serial.println("\nConectado a WiFi con IP: " + WiFi.localIP().toString());
+    salida.println("\nConectado a WiFi con IP: " + WiFi.localIP().toString());
   } else {
-    Serial.println("\nError: No se pudo conectar a WiFi. Reintentando...");
+    salida.println("\nError: No se pudo conectar a WiFi. Reintentando...");
     delay(5000);  // Espera 5 segundos antes de reintentar
     initWiFi();  // Reintentar conexión
   }
@@ -72,9 +293,9 @@ void initFirebase() {
   Firebase.reconnectWiFi(true);  // Permitir reconexión automática
 
   if (Firebase.ready()) {
-    Serial.println("Conexión a Firebase exitosa.");
+    salida.println("Conexión a Firebase exitosa.");
   } else {
-    Serial.println("Error: No se pudo conectar a Firebase. Reintentando...");
+    salida.println("Error: No se pudo conectar a Firebase. Reintentando...");
     delay(5000);
     initFirebase();  // Reintentar conexión a Firebase
   }
@@ -85,20 +306,20 @@ void initNFC() {
   nfc.begin();  // Inicia la comunicación con el lector
   uint32_t versiondata = nfc.getFirmwareVersion();  // Obtiene la versión del firmware del lector
   if (!versiondata) {
-    Serial.println("No se encontró el Lector PN532. Verifique las conexiones.");
+    salida.println("No se encontró el Lector PN532. Verifique las conexiones.");
     while (1);  // Detiene el programa si no se detecta el lector
   }
   nfc.SAMConfig();  // Configuración del lector
-  Serial.println("Lector RFID inicializado correctamente.");
+  salida.println("Lector RFID inicializado correctamente.");
 }
 
 // Función setup: inicializa el sistema y los periféricos
 void setup() {
-  Serial.begin(115200);  // Inicialización del puerto serie a 115200 baudios
+  Serial.begin(BAUDIOS_TEXTO);  // Inicialización del puerto serie a 115200 baudios
   while (!Serial) delay(10);  // Espera a que el puerto serie esté listo
 
-  Serial.println();
-  Serial.println("Iniciando...");
+  salida.println();
+  salida.println("Iniciando...");
   
   // Inicialización de WiFi, Firebase y el lector NFC
   initWiFi();
@@ -116,22 +337,28 @@ void setup() {
 
   // Verificar que el HX711 esté listo
   if (!scale.is_ready()) {
-    Serial.println("No se encontró el amplificador HX711. Verifique las conexiones.");
+    salida.println("No se encontró el amplificador HX711. Verifique las conexiones.");
   } else {
-    Serial.println("Amplificador HX711 inicializado correctamente.");
+    salida.println("Amplificador HX711 inicializado correctamente.");
   }
 
-  Serial.printf("Setup completado. Memoria libre: %d bytes\n", ESP.getFreeHeap());
+  salida.printf("Setup completado. Memoria libre: %d bytes\n", ESP.getFreeHeap());
 }
 
 // Función para enviar los datos del reactivo a Firebase usando el UID como clave primaria
 void enviarDatosAFirebase(const Reactivo& reactivo, const String& uidString) {
+
+  // Si el equipo registra los datos en su diario local, no se suben desde aquí
+  if (interfaceMode && envioDelegado) {
+    salida.println("Datos delegados al equipo.");
+    return;
+  }
   
   // Usar el UID como clave principal en la ruta
   String path = uidString;  // Ruta donde se almacenarán los datos en Firebase
 
   if (path.length() == 0) {
-    Serial.println("Path inválido para Firebase");
+    salida.println("Path inválido para Firebase");
     return;
   }
 
@@ -146,22 +373,22 @@ void enviarDatosAFirebase(const Reactivo& reactivo, const String& uidString) {
       // Carpeta para almacenar información de reactivos
       if (!Firebase.setString(firebaseData, "/reactivos/" + path + "/" + campos[i], *valores[i])) {
         success = false;
-        Serial.println("Error al enviar " + campos[i] + ": " + firebaseData.errorReason());  // Error al enviar un campo a Firebase
+        salida.println("Error al enviar " + campos[i] + ": " + firebaseData.errorReason());  // Error al enviar un campo a Firebase
       }
     } else {
       // Notificar si un campo que no es "baja" está vacío
       if (campos[i] == "09_baja" && valores[i]->length() == 0) {
         continue;
       } else if (valores[i]->length() == 0) {
-        Serial.println("Valor vacío para " + campos[i] + ", no se enviará a Firebase.");  // No se envía si el valor está vacío y no es "baja"
+        salida.println("Valor vacío para " + campos[i] + ", no se enviará a Firebase.");  // No se envía si el valor está vacío y no es "baja"
       }
     }
   }
 
   if (success) {
-    Serial.println("Datos enviados con éxito.\n");  // Todos los datos se enviaron con éxito
+    salida.println("Datos enviados con éxito.\n");  // Todos los datos se enviaron con éxito
   } else {
-    Serial.println("Hubo errores al enviar los datos.");  // Algunos datos fallaron al enviarse
+    salida.println("Hubo errores al enviar los datos.");  // Algunos datos fallaron al enviarse
   }
 }
 
@@ -170,7 +397,7 @@ void loop() {
 
   // Lógica para escuchar comandos de python tkinter
   if (Serial.available()) {
-    String comando = Serial.readStringUntil('\n');
+    String comando = leerEntrada();
     comando.trim();
 
     // Verificar si el comando es desde la interfaz gráfica (Python/Tkinter)
@@ -186,6 +413,26 @@ void loop() {
     } else if (comando == "OUT") {
       interfaceMode = true;  // Entrar en modo interfaz
       registrarBaja();        // Ejecutar la función para registrar la fecha de baja del reactivo
+    } else if (comando == "DELEGATE ON" || comando == "DELEGATE OFF") {
+      interfaceMode = true;  // Entrar en modo interfaz
+      envioDelegado = (comando == "DELEGATE ON");  // El equipo sube los datos a Firebase
+      salida.println(envioDelegado ? "Envío delegado: activado." : "Envío delegado: desactivado.");
+    } else if (comando == "CACHE ON" || comando == "CACHE OFF") {
+      interfaceMode = true;  // Entrar en modo interfaz
+      cacheEtiquetas = (comando == "CACHE ON");  // El equipo guarda los campos fijos de las etiquetas
+      salida.println(cacheEtiquetas ? "Caché de etiquetas: activada." : "Caché de etiquetas: desactivada.");
+    } else if (comando.startsWith("BINARY ON") || comando == "BINARY OFF") {
+      interfaceMode = true;  // Entrar en modo interfaz
+      bool activar = comando.startsWith("BINARY ON");
+      // "BINARY ON <baudios>" cambia la velocidad; "BINARY OFF" vuelve a la inicial
+      long baudios = activar ? comando.substring(9).toInt() : BAUDIOS_TEXTO;
+      // La confirmación sale en el modo anterior; a partir de aquí se usa el nuevo
+      salida.println(activar ? "Protocolo binario: activado." : "Protocolo binario: desactivado.");
+      modoBinario = activar;
+      if (baudios > 0) {
+        Serial.flush();
+        Serial.updateBaudRate(baudios);
+      }
     } else {
       // Si no es un comando de la interfaz, suponer que es una opción del menú manual
       int option = comando.toInt();  // Convertir el comando en una opción del menú
@@ -193,9 +440,10 @@ void loop() {
       // Validar si la opción del menú es un número válido
       if (option > 0 && option <= 7) {  // Asegurar que sea una opción válida
         interfaceMode = false;         // Entrar en modo manual
+        modoBinario = false;           // El menú manual siempre se muestra como texto
         executeMenuOption(option);  // Ejecutar la opción del menú
       } else {
-        Serial.println("Opción no válida. Intente nuevamente.");
+        salida.println("Opción no válida. Intente nuevamente.");
         showMenu();  // Mostrar el menú nuevamente si la opción no es válida
       }
     }
@@ -212,14 +460,14 @@ void loop() {
 /////////////////// MODO INTERFAZ ////////////////////
 
 void leerEtiqueta() {
-  Serial.println("Comando 'READ' recibido. Esperando etiqueta...");
+  salida.println("Comando 'READ' recibido. Esperando etiqueta...");
   
   uint8_t uid[7];
   uint8_t uidLength;
 
   // Detectar la etiqueta NFC
   if (nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("Etiqueta detectada. Verificando campos...");
+    salida.println("Etiqueta detectada. Verificando campos...");
 
     // Limpiar el buffer del Serial para evitar residuos
     while (Serial.available()) {
@@ -242,8 +490,8 @@ void leerEtiqueta() {
     // Leer y almacenar los valores en el array 'valores'
     for (int i = 0; i < 9; i++) {
       if (!leerBloqueGUI(uid, uidLength, bloques[i], valores[i])) {
-        Serial.print("Error al leer el bloque ");
-        Serial.println(bloques[i]);
+        salida.print("Error al leer el bloque ");
+        salida.println(bloques[i]);
         return;
       }
     }
@@ -266,39 +514,39 @@ void leerEtiqueta() {
       fechaAlta.getBytes(buffer, 16);
       if (escribirBloqueGUI(uid, uidLength, 6, buffer, "alta")) {
         reactivo.alta = fechaAlta;
-        Serial.println();
+        salida.println();
         leerDatosGUI();
-        Serial.println();
-        Serial.println("Fecha de alta registrada: " + fechaAlta);
+        salida.println();
+        salida.println("Fecha de alta registrada: " + fechaAlta);
       }
     }
 
     // Imprimir los valores con el formato solicitado
-    Serial.println("Fecha de alta previamente registrada. Leyendo bloques...");
-    Serial.println("\nDatos del Reactivo:");
-    Serial.print("UID: ");
-    Serial.println(uidString);
+    salida.println("Fecha de alta previamente registrada. Leyendo bloques...");
+    salida.println("\nDatos del Reactivo:");
+    salida.print("UID: ");
+    salida.println(uidString);
     for (int i = 0; i < 9; i++) {
       if (etiquetas[i] == "Baja" && valores[i].length() == 0) {
         continue;  // Saltar mensaje para "baja" cuando está vacío
       }
-      Serial.print(etiquetas[i]);
-      Serial.print(": ");
+      salida.print(etiquetas[i]);
+      salida.print(": ");
       if (valores[i].length() > 0) {
-        Serial.println(valores[i]);
+        salida.println(valores[i]);
       } else {
-        Serial.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
+        salida.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
       }
     } 
 
-    Serial.print("Creando la ruta en Firebase: " + uidString);
-    Serial.println("...");
+    salida.print("Creando la ruta en Firebase: " + uidString);
+    salida.println("...");
 
     // Enviar los datos a Firebase
     enviarDatosAFirebase(reactivo, uidString);
-    Serial.println("Lectura completa.");
+    salida.println("Lectura completa.");
   } else {
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
   }
 }
 
@@ -309,7 +557,7 @@ void leerDatosGUI() {
 
   // Detectar la etiqueta NFC
   if (nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("Leyendo bloques...");
+    salida.println("Leyendo bloques...");
 
     // Limpiar el buffer del Serial para evitar residuos
     while (Serial.available()) {
@@ -318,7 +566,7 @@ void leerDatosGUI() {
 
     // Verificar longitud del UID
     if (uidLength == 0 || uidLength > 7) {
-      Serial.println("Error: UID inválido.");
+      salida.println("Error: UID inválido.");
       return;
     }
 
@@ -338,8 +586,8 @@ void leerDatosGUI() {
     // Leer y almacenar los valores en el array 'valores'
     for (int i = 0; i < 9; i++) {
       if (!leerBloqueGUI(uid, uidLength, bloques[i], valores[i])) {
-        Serial.print("Error al leer el bloque ");
-        Serial.println(bloques[i]);
+        salida.print("Error al leer el bloque ");
+        salida.println(bloques[i]);
         return;
       }
     }
@@ -348,41 +596,41 @@ void leerDatosGUI() {
     Reactivo reactivo = {valores[0], valores[1], valores[2], valores[3], valores[4], valores[5], valores[6], valores[7], valores[8]};
 
     // Imprimir los valores con el formato solicitado
-    Serial.println("\nDatos del Reactivo:");
-    Serial.print("UID: ");
-    Serial.println(uidString);
+    salida.println("\nDatos del Reactivo:");
+    salida.print("UID: ");
+    salida.println(uidString);
     for (int i = 0; i < 9; i++) {
       if (etiquetas[i] == "Baja" && valores[i].length() == 0) {
         continue;  // Saltar mensaje para "baja" cuando está vacío
       }
-      Serial.print(etiquetas[i]);
-      Serial.print(": ");
+      salida.print(etiquetas[i]);
+      salida.print(": ");
       if (valores[i].length() > 0) {
-        Serial.println(valores[i]);
+        salida.println(valores[i]);
       } else {
-        Serial.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
+        salida.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
       }
     } 
-    Serial.println("Lectura completa.");
+    salida.println("Lectura completa.");
   } else {
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
   }
 }
 
 // Función para registrar uso y mostrar los datos en el formato solicitado
 void registrarUso() {
-  Serial.println("Comando 'TRACK' recibido. Esperando etiqueta...");
+  salida.println("Comando 'TRACK' recibido. Esperando etiqueta...");
 
   uint8_t uid[7];
   uint8_t uidLength;
 
   // Detectar la etiqueta NFC
   if (!nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
     return;
   }
 
-  Serial.println("Etiqueta detectada. Leyendo bloques...");
+  salida.println("Etiqueta detectada. Leyendo bloques...");
 
   // Limpiar el buffer del Serial para evitar residuos
   while (Serial.available()) {
@@ -391,7 +639,7 @@ void registrarUso() {
 
   // Verificar el UID después de la lectura
   if (!uid || uidLength == 0) {
-    Serial.println("UID inválido");
+    salida.println("UID inválido");
     return;
   }
 
@@ -403,16 +651,33 @@ void registrarUso() {
     uidString += String(uid[i], HEX);
   }
 
+  // Con la caché activa, preguntar al equipo si ya tiene los campos fijos de esta etiqueta
+  bool conocida = false;
+  if (cacheEtiquetas) {
+    salida.println("UID detectado: " + uidString);
+    unsigned long limite = millis() + 500;
+    while (!Serial.available() && millis() < limite) delay(1);
+    String respuesta = Serial.available() ? leerEntrada() : "";
+    respuesta.trim();
+    conocida = (respuesta == "KNOWN " + uidString);
+    if (conocida) {
+      salida.println("Etiqueta conocida: solo se leen alta y baja.");
+    }
+  }
+
   // Bloques donde se leerán los valores
   int bloques[] = {4, 5, 6, 8, 9, 10, 12, 13, 14};
     String etiquetas[] = {"Producto", "Número", "Alta", "Marca", "Código", "Presentación", "Lote", "Vencimiento", "Baja"};
     String valores[9];  // Almacenar los valores leídos
 
-  // Leer y almacenar los valores en el array 'valores'
+  // Leer y almacenar los valores en el array 'valores' (de una etiqueta conocida, solo alta y baja)
   for (int i = 0; i < 9; i++) {
+    if (conocida && bloques[i] != 6 && bloques[i] != 14) {
+      continue;
+    }
     if (!leerBloqueGUI(uid, uidLength, bloques[i], valores[i])) {
-      Serial.print("Error al leer el bloque ");
-      Serial.println(bloques[i]);
+      salida.print("Error al leer el bloque ");
+      salida.println(bloques[i]);
       return;
     }
   }
@@ -421,6 +686,7 @@ void registrarUso() {
   Reactivo reactivo = {valores[0], valores[1], valores[2], valores[3], valores[4], valores[5], valores[6], valores[7], valores[8]};
 
   // Verificar si ya tiene un alta
+  bool altaNueva = false;
   if (reactivo.alta.length() == 0) {
     // Si no hay alta, escribir la fecha actual obtenida por NTP
     timeClient.update();
@@ -436,22 +702,26 @@ void registrarUso() {
     fechaAlta.getBytes(buffer, 16);
     escribirBloqueGUI(uid, uidLength, 6, buffer, "alta");
     reactivo.alta = fechaAlta;
+    altaNueva = true;
   }
 
   // Imprimir los valores con el formato solicitado
-    Serial.println("\nDatos del Reactivo:");
-    Serial.print("UID: ");
-    Serial.println(uidString);
+    salida.println("\nDatos del Reactivo:");
+    salida.print("UID: ");
+    salida.println(uidString);
     for (int i = 0; i < 9; i++) {
       if (etiquetas[i] == "Baja" && valores[i].length() == 0) {
         continue;  // Saltar mensaje para "baja" cuando está vacío
       }
-      Serial.print(etiquetas[i]);
-      Serial.print(": ");
+      if (conocida && valores[i].length() == 0) {
+        continue;  // Campo fijo no leído: el equipo ya lo tiene
+      }
+      salida.print(etiquetas[i]);
+      salida.print(": ");
       if (valores[i].length() > 0) {
-        Serial.println(valores[i]);
+        salida.println(valores[i]);
       } else {
-        Serial.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
+        salida.println("Sin valor");  // Opcional: indicar campos vacíos, excluyendo "baja"
       }
     } 
     
@@ -460,37 +730,52 @@ void registrarUso() {
     float humedad = dht.readHumidity();
 
     if (isnan(temperatura) || isnan(humedad)) {
-      Serial.println("Error al leer datos del sensor DHT11!");
+      salida.println("Error al leer datos del sensor DHT11!");
     } else {
-      Serial.print("Temperatura: ");
-      Serial.print(temperatura);
-      Serial.println(" °C");
-      Serial.print("Humedad: ");
-      Serial.print(humedad);
-      Serial.println(" %");
+      salida.print("Temperatura: ");
+      salida.print(temperatura);
+      salida.println(" °C");
+      salida.print("Humedad: ");
+      salida.print(humedad);
+      salida.println(" %");
     }
     
     // Leer sensor HX711
     float peso = 0;
     if (scale.is_ready()) {
       peso = scale.get_units(20);  // Obtener el promedio de 10 lecturas
-      Serial.print("Peso: ");
-      Serial.print(peso);  // Imprimir el peso con 2 decimales
-      Serial.println(" g");
+      salida.print("Peso: ");
+      salida.print(peso);  // Imprimir el peso con 2 decimales
+      salida.println(" g");
     } else {
-      Serial.println("Error: El HX711 no está listo. Reintentar...");
+      salida.println("Error: El HX711 no está listo. Reintentar...");
       delay(100);  // Retraso antes de reintentar
     }
     
     // Crear la ruta usando el UID como clave
     String path = uidString;
 
-    Serial.println();
-    Serial.print("Creando la ruta en Firebase: " + uidString);
-    Serial.println("...");
+    salida.println();
+    salida.print("Creando la ruta en Firebase: " + uidString);
+    salida.println("...");
 
-    // Enviar los datos a Firebase
-    enviarDatosAFirebase(reactivo, path);
+    // Enviar los datos a Firebase; de una etiqueta conocida, los campos fijos ya están en la nube
+    if (conocida && !envioDelegado) {
+      if (altaNueva && !Firebase.setString(firebaseData, "/reactivos/" + path + "/03_alta", reactivo.alta)) {
+        salida.println("Error al enviar 03_alta: " + firebaseData.errorReason());
+        salida.println("Hubo errores al enviar los datos.");
+      } else {
+        salida.println("Datos fijos omitidos (etiqueta conocida).");
+      }
+    } else {
+      enviarDatosAFirebase(reactivo, path);
+    }
+
+    // El equipo registra el uso con los valores impresos arriba
+    if (envioDelegado) {
+      salida.println("Registro de uso delegado al equipo.");
+      return;
+    }
 
     // Leer la fecha y hora actual (uso)
     timeClient.update();
@@ -505,37 +790,37 @@ void registrarUso() {
     // Crear una nueva entrada en Firebase con la fecha, hora, temperatura y humedad
     String usoPath = "/reactivos/" + path + "/Registros de Uso/" + timestamp;
     if (!Firebase.setString(firebaseData, usoPath + "/fecha_uso", fechaUso)) {
-      Serial.println("Error al enviar la fecha de uso: " + firebaseData.errorReason());
+      salida.println("Error al enviar la fecha de uso: " + firebaseData.errorReason());
     }
 
     if (!Firebase.setString(firebaseData, usoPath + "/hora_uso", horaUso)) {
-      Serial.println("Error al enviar la hora de uso: " + firebaseData.errorReason());
+      salida.println("Error al enviar la hora de uso: " + firebaseData.errorReason());
     }
 
     if (!Firebase.setFloat(firebaseData, usoPath + "/temperatura", temperatura)) {
-      Serial.println("Error al enviar la temperatura: " + firebaseData.errorReason());
+      salida.println("Error al enviar la temperatura: " + firebaseData.errorReason());
     }
 
     if (!Firebase.setFloat(firebaseData, usoPath + "/humedad", humedad)) {
-      Serial.println("Error al enviar la humedad: " + firebaseData.errorReason());
+      salida.println("Error al enviar la humedad: " + firebaseData.errorReason());
     }
     if (!Firebase.setFloat(firebaseData, usoPath + "/peso", peso)) {
-      Serial.println("Error al enviar el peso: " + firebaseData.errorReason());
+      salida.println("Error al enviar el peso: " + firebaseData.errorReason());
       } else {
-    Serial.println("Registro de uso guardado en la nube.");
+    salida.println("Registro de uso guardado en la nube.");
   }
 }
 
 // Función para registrar fecha de baja cuando se acaba un reactivo
 void registrarBaja() {
-  Serial.println("Comando 'OUT' recibido. Esperando etiqueta...");
+  salida.println("Comando 'OUT' recibido. Esperando etiqueta...");
 
   uint8_t uid[7];
   uint8_t uidLength;
 
   // Detectar la etiqueta NFC
   if (nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("Etiqueta detectada. Verificando campos...");
+    salida.println("Etiqueta detectada. Verificando campos...");
 
     // Limpiar el buffer del Serial para evitar residuos
     while (Serial.available()) {
@@ -558,8 +843,8 @@ void registrarBaja() {
     // Leer y almacenar los valores en el array 'valores'
     for (int i = 0; i < 9; i++) {
       if (!leerBloqueGUI(uid, uidLength, bloques[i], valores[i])) {
-        Serial.print("Error al leer el bloque ");
-        Serial.println(bloques[i]);
+        salida.print("Error al leer el bloque ");
+        salida.println(bloques[i]);
         return;
       }
     }
@@ -584,35 +869,35 @@ void registrarBaja() {
       // Escribir la fecha en el bloque 14
       if (escribirBloqueGUI(uid, uidLength, 14, buffer, "baja")) {
         reactivo.baja = fechaBaja;  // Actualizar el campo "baja" en el objeto
-        Serial.println();
+        salida.println();
         leerDatosGUI();
-        Serial.println();
-        Serial.println("Fecha de baja registrada: " + fechaBaja);
+        salida.println();
+        salida.println("Fecha de baja registrada: " + fechaBaja);
       }
     } else{
     
-      Serial.println("Fecha de baja previamente registrada. Leyendo bloques...");
+      salida.println("Fecha de baja previamente registrada. Leyendo bloques...");
       // Imprimir los valores con el formato solicitado
-      Serial.println("\nDatos del reactivo:");
-      Serial.print("UID: ");
-      Serial.println(uidString);
+      salida.println("\nDatos del reactivo:");
+      salida.print("UID: ");
+      salida.println(uidString);
       for (int i = 0; i < 9; i++) {
-        Serial.print(etiquetas[i]);
-        Serial.print(": ");
-        Serial.println(valores[i]);
+        salida.print(etiquetas[i]);
+        salida.print(": ");
+        salida.println(valores[i]);
       }
     }
 
 
-    Serial.println();
-    Serial.print("Creando la ruta en Firebase: " + uidString);
-    Serial.println("...");
+    salida.println();
+    salida.print("Creando la ruta en Firebase: " + uidString);
+    salida.println("...");
 
     // Enviar los datos a Firebase
     enviarDatosAFirebase(reactivo, uidString);
-    Serial.println("Lectura completa.");
+    salida.println("Lectura completa.");
   } else{
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
   }
 }
 
@@ -628,8 +913,8 @@ bool leerBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, String &destino)
     if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, block, 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
       autenticado = true;
     } else {
-      Serial.print("Error de autenticación en el bloque ");
-      Serial.println(block);
+      salida.print("Error de autenticación en el bloque ");
+      salida.println(block);
       intentos++;
       delay(100); // Esperar antes de reintentar
     }
@@ -637,7 +922,7 @@ bool leerBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, String &destino)
   
   // Si la autenticación falla después de 3 intentos
   if (!autenticado) {
-    Serial.println("Autenticación fallida después de varios intentos.");
+    salida.println("Autenticación fallida después de varios intentos.");
     return false;
   }
   
@@ -647,8 +932,8 @@ bool leerBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, String &destino)
     destino.trim();  // Elimina espacios en blanco al inicio y final
     return true;
   } else {
-    Serial.print("Error al leer el bloque ");
-    Serial.println(block);
+    salida.print("Error al leer el bloque ");
+    salida.println(block);
     return false;
   }
 }
@@ -656,18 +941,27 @@ bool leerBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, String &destino)
 
 // Función para programar una etiqueta NFC en modo interfaz
 void programarEtiqueta() {
-  Serial.println("Comando 'WRITE' recibido. Esperando datos...");
+  salida.println("Comando 'WRITE' recibido. Esperando datos...");
   
   uint8_t uid[7];
   uint8_t uidLength;
 
   // Detectar la etiqueta NFC
   if (nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("Etiqueta detectada. Esperando valores...");
+    // Con la caché activa, el equipo descarta los campos que tenía guardados de esta etiqueta
+    if (cacheEtiquetas) {
+      String uidString = "";
+      for (uint8_t i = 0; i < uidLength; i++) {
+        if (uid[i] < 0x10) uidString += "0";
+        uidString += String(uid[i], HEX);
+      }
+      salida.println("UID detectado: " + uidString);
+    }
+    salida.println("Etiqueta detectada. Esperando valores...");
     
     // Esperar a que lleguen los datos concatenados desde Python
     while (!Serial.available()) delay(10);  
-    String datos = Serial.readStringUntil('\n');
+    String datos = leerEntrada();
     datos.trim();
 
     // Limpiar el buffer del Serial para evitar caracteres residuales
@@ -676,8 +970,8 @@ void programarEtiqueta() {
     }
 
     // Verificar los datos recibidos
-    Serial.print("Datos recibidos: ");
-    Serial.println(datos);
+    salida.print("Datos recibidos: ");
+    salida.println(datos);
 
     // Separar los datos recibidos por comas
     String valores[7];
@@ -693,16 +987,16 @@ void programarEtiqueta() {
 
       // Verificar la longitud de los datos (no deben exceder 16 caracteres)
       if (valores[i].length() > 16) {
-        Serial.print("Error: El valor ");
-        Serial.print(i);
-        Serial.println(" excede el límite de 16 caracteres.");
+        salida.print("Error: El valor ");
+        salida.print(i);
+        salida.println(" excede el límite de 16 caracteres.");
         return;
       }
 
-      Serial.print("Valor ");
-      Serial.print(i);
-      Serial.print(": ");
-      Serial.println(valores[i]);
+      salida.print("Valor ");
+      salida.print(i);
+      salida.print(": ");
+      salida.println(valores[i]);
     }
 
     // Bloques donde se guardarán los valores
@@ -714,16 +1008,16 @@ void programarEtiqueta() {
         uint8_t buffer[16] = {0};
         valores[i].getBytes(buffer, 16);  // Convertir el valor en bytes
         if (!escribirBloqueGUI(uid, uidLength, bloques[i], buffer, "valor")) {
-          Serial.println("Error al programar la etiqueta.");
+          salida.println("Error al programar la etiqueta.");
           return;
         }
       }
     }
 
     // Confirmar que los datos han sido guardados
-    Serial.println("Datos guardados exitosamente.");
+    salida.println("Datos guardados exitosamente.");
   } else {
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
   }
 }
 
@@ -737,8 +1031,8 @@ bool escribirBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, uint8_t* buff
     if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, block, 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
       autenticado = true;
     } else {
-      Serial.print("Error de autenticación en el bloque ");
-      Serial.println(block);
+      salida.print("Error de autenticación en el bloque ");
+      salida.println(block);
       intentos++;
       delay(100); // Esperar antes de reintentar
     }
@@ -746,20 +1040,20 @@ bool escribirBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, uint8_t* buff
 
   // Si la autenticación falla después de 3 intentos
   if (!autenticado) {
-    Serial.println("Autenticación fallida después de varios intentos.");
+    salida.println("Autenticación fallida después de varios intentos.");
     return false;
   }
   
   // Escribir datos en el bloque
   if (nfc.mifareclassic_WriteDataBlock(block, buffer)) {
-    Serial.print("Campo '");
-    Serial.print(titulo);
-    Serial.println("' registrado con éxito!");
-    Serial.println();
+    salida.print("Campo '");
+    salida.print(titulo);
+    salida.println("' registrado con éxito!");
+    salida.println();
     return true;
   } else {
-    Serial.print("Error al escribir el bloque ");
-    Serial.println(block);
+    salida.print("Error al escribir el bloque ");
+    salida.println(block);
     return false;
   }
 }
@@ -770,16 +1064,16 @@ bool escribirBloqueGUI(uint8_t* uid, uint8_t uidLength, int block, uint8_t* buff
 
 // Función para mostrar menú principal en modo manual
 void showMenu() {
-  Serial.println("\nPosicione el contenedor en la balanza y acerque una etiqueta MIFARE Classic 1K al lector...");
-  Serial.println("\nMenú Principal:");
-  Serial.println("1. Leer datos");
-  Serial.println("2. Ingresar datos");
-  Serial.println("3. Editar datos");
-  Serial.println("4. Formatear etiqueta");
-  Serial.println("5. Leer todos los sectores");
-  Serial.println("6. Mostrar información");
-  Serial.println("7. Salir");
-  Serial.print("\nSeleccione una opción: ");
+  salida.println("\nPosicione el contenedor en la balanza y acerque una etiqueta MIFARE Classic 1K al lector...");
+  salida.println("\nMenú Principal:");
+  salida.println("1. Leer datos");
+  salida.println("2. Ingresar datos");
+  salida.println("3. Editar datos");
+  salida.println("4. Formatear etiqueta");
+  salida.println("5. Leer todos los sectores");
+  salida.println("6. Mostrar información");
+  salida.println("7. Salir");
+  salida.print("\nSeleccione una opción: ");
 }
 
 // Función para ejecutar menú principal en modo manual
@@ -789,7 +1083,7 @@ void executeMenuOption(int option) {
 
   if (option != 7) {
     if (nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-      Serial.println("Etiqueta detectada.");
+      salida.println("Etiqueta detectada.");
       switch (option) {
         case 1: leerDatosReactivo(uid, uidLength); break;
         case 2: ingresarDatosReactivo(uid, uidLength); break;
@@ -797,17 +1091,17 @@ void executeMenuOption(int option) {
         case 4: formatCard(uid, uidLength); break;
         case 5: printSectorMatrix(uid, uidLength); break;
         case 6: dumpInfo(uid, uidLength); break;
-        default: Serial.println("Opción no válida.");
+        default: salida.println("Opción no válida.");
       }
     } else {
-      Serial.println("No se detectó ninguna etiqueta.");
+      salida.println("No se detectó ninguna etiqueta.");
     }
   } else {
-    Serial.println("Saliendo del programa...");
+    salida.println("Saliendo del programa...");
   }
 
   if (!interfaceMode) {
-    Serial.println("Presione cualquier tecla para continuar...");
+    salida.println("Presione cualquier tecla para continuar...");
     while (!Serial.available()) {
       delay(100);
     }
@@ -823,7 +1117,7 @@ void executeMenuOption(int option) {
 void leerDatosReactivo(uint8_t* uid, uint8_t uidLength) {
   // Detectar la etiqueta NFC
   if (!nfc.readPassiveTargetID(PN532_MIFARE_ISO14443A, uid, &uidLength)) {
-    Serial.println("No se detectó ninguna etiqueta.");
+    salida.println("No se detectó ninguna etiqueta.");
     return;
   }
 
@@ -835,7 +1129,7 @@ void leerDatosReactivo(uint8_t* uid, uint8_t uidLength) {
     uidString += String(uid[i], HEX);
   }
 
-  Serial.println("UID generado: " + uidString);
+  salida.println("UID generado: " + uidString);
 
   Reactivo reactivo;
   int bloques[] = {4, 5, 6, 8, 9, 10, 12, 13, 14};  // Bloques de memoria donde se almacenan los datos
@@ -858,16 +1152,16 @@ void leerDatosReactivo(uint8_t* uid, uint8_t uidLength) {
     fechaAlta.getBytes(buffer, 16);
     escribirBloque(uid, uidLength, 6, buffer, "alta");
     reactivo.alta = fechaAlta;
-    Serial.println("Fecha de alta escrita: " + fechaAlta);
+    salida.println("Fecha de alta escrita: " + fechaAlta);
   }
 
   // Imprimir datos del Reactivo
-  Serial.println("\nDatos del Reactivo:");
+  salida.println("\nDatos del Reactivo:");
   for (int i = 0; i < 9; i++) {
     if (leerBloque(uid, uidLength, bloques[i], *campos[i])) {
-      Serial.println(campos[i]->c_str());  // Imprime el campo leído
+      salida.println(campos[i]->c_str());  // Imprime el campo leído
     } else {
-      Serial.println("Error leyendo bloque " + String(bloques[i]));
+      salida.println("Error leyendo bloque " + String(bloques[i]));
     }
   }
 
@@ -876,38 +1170,38 @@ void leerDatosReactivo(uint8_t* uid, uint8_t uidLength) {
   float humedad = dht.readHumidity();
 
   if (isnan(temperatura) || isnan(humedad)) {
-    Serial.println("Error al leer datos del sensor DHT11!");
+    salida.println("Error al leer datos del sensor DHT11!");
   } else {
-    Serial.print("Temperatura: ");
-    Serial.print(temperatura);
-    Serial.println(" °C");
-    Serial.print("Humedad: ");
-    Serial.print(humedad);
-    Serial.println(" %");
+    salida.print("Temperatura: ");
+    salida.print(temperatura);
+    salida.println(" °C");
+    salida.print("Humedad: ");
+    salida.print(humedad);
+    salida.println(" %");
   }
 
   // Leer sensor HX711
   float peso = 0;
   if (scale.is_ready()) {
     peso = scale.get_units(20);  // Obtener el promedio de 10 lecturas
-    Serial.print("Peso: ");
-    Serial.print(peso);  // Imprimir el peso con 2 decimales
-    Serial.println(" g");
+    salida.print("Peso: ");
+    salida.print(peso);  // Imprimir el peso con 2 decimales
+    salida.println(" g");
   } else {
-    Serial.println("Error: El HX711 no está listo. Reintentar...");
+    salida.println("Error: El HX711 no está listo. Reintentar...");
     delay(100);  // Retraso antes de reintentar
   }
 
   // Crear la ruta usando el UID como clave
   String path = uidString;
 
-  Serial.println();
-  Serial.print("Creando la ruta en Firebase: " + path);
-  Serial.println("...");
+  salida.println();
+  salida.print("Creando la ruta en Firebase: " + path);
+  salida.println("...");
 
   // Enviar datos a Firebase
-  Serial.println();
-  Serial.println("Enviando datos...");
+  salida.println();
+  salida.println("Enviando datos...");
   enviarDatosAFirebase(reactivo, path);
 
   // Leer la fecha y hora actual (uso)
@@ -923,33 +1217,33 @@ void leerDatosReactivo(uint8_t* uid, uint8_t uidLength) {
   // Crear una nueva entrada en Firebase con la fecha, hora, temperatura y humedad
   String usoPath = "/reactivos/" + path + "/Registros de Uso/" + timestamp;
   if (!Firebase.setString(firebaseData, usoPath + "/fecha_uso", fechaUso)) {
-    Serial.println("Error al enviar la fecha de uso: " + firebaseData.errorReason());
+    salida.println("Error al enviar la fecha de uso: " + firebaseData.errorReason());
   }
 
   if (!Firebase.setString(firebaseData, usoPath + "/hora_uso", horaUso)) {
-    Serial.println("Error al enviar la hora de uso: " + firebaseData.errorReason());
+    salida.println("Error al enviar la hora de uso: " + firebaseData.errorReason());
   }
 
   if (!Firebase.setFloat(firebaseData, usoPath + "/temperatura", temperatura)) {
-    Serial.println("Error al enviar la temperatura: " + firebaseData.errorReason());
+    salida.println("Error al enviar la temperatura: " + firebaseData.errorReason());
   }
 
   if (!Firebase.setFloat(firebaseData, usoPath + "/humedad", humedad)) {
-    Serial.println("Error al enviar la humedad: " + firebaseData.errorReason());
+    salida.println("Error al enviar la humedad: " + firebaseData.errorReason());
   }
 
   if (!Firebase.setFloat(firebaseData, usoPath + "/peso", peso)) {
-    Serial.println("Error al enviar el peso: " + firebaseData.errorReason());
+    salida.println("Error al enviar el peso: " + firebaseData.errorReason());
   }
 
-  Serial.println("Uso registrado correctamente en Firebase.");
+  salida.println("Uso registrado correctamente en Firebase.");
 }
 
   
 // Función para leer los datos almacenados en la etiqueta sin enviar datos a Firebase
 void leerDatosReactivoEdit(uint8_t* uid, uint8_t uidLength) {
   if (!uid || uidLength == 0) {
-    Serial.println("UID inválido");
+    salida.println("UID inválido");
     return;
   }
 
@@ -958,12 +1252,12 @@ void leerDatosReactivoEdit(uint8_t* uid, uint8_t uidLength) {
   String* campos[] = {&reactivo.producto, &reactivo.numero, &reactivo.alta, &reactivo.marca, 
                       &reactivo.codigo, &reactivo.presentacion, &reactivo.lote, &reactivo.vencimiento, &reactivo.baja};
 
-  Serial.println("\nDatos del Reactivo:");
+  salida.println("\nDatos del Reactivo:");
   for (int i = 0; i < 9; i++) {
     if (leerBloque(uid, uidLength, bloques[i], *campos[i])) {
-      Serial.println(campos[i]->c_str());  // Imprime el campo leído
+      salida.println(campos[i]->c_str());  // Imprime el campo leído
     } else {
-      Serial.println("Error leyendo bloque " + String(bloques[i]));  // Error al leer un bloque
+      salida.println("Error leyendo bloque " + String(bloques[i]));  // Error al leer un bloque
     }
   }
 }
@@ -971,7 +1265,7 @@ void leerDatosReactivoEdit(uint8_t* uid, uint8_t uidLength) {
 // Función para leer datos almacenados en la etiqueta y comprobar si el UID ya existe en la base de datos
 void leerDatosReactivoUID(uint8_t* uid, uint8_t uidLength) {
   if (!uid || uidLength == 0) {
-    Serial.println("UID inválido");
+    salida.println("UID inválido");
     return;
   }
 
@@ -983,7 +1277,7 @@ void leerDatosReactivoUID(uint8_t* uid, uint8_t uidLength) {
     uidString += String(uid[i], HEX);
   }
 
-  Serial.println("UID generado: " + uidString);
+  salida.println("UID generado: " + uidString);
 
 
   Reactivo reactivo;
@@ -991,34 +1285,34 @@ void leerDatosReactivoUID(uint8_t* uid, uint8_t uidLength) {
   String* campos[] = {&reactivo.producto, &reactivo.numero, &reactivo.alta, &reactivo.marca, 
                       &reactivo.codigo, &reactivo.presentacion, &reactivo.lote, &reactivo.vencimiento, &reactivo.baja};
 
-  Serial.println("\nDatos del Reactivo:");
+  salida.println("\nDatos del Reactivo:");
   for (int i = 0; i < 9; i++) {
     if (leerBloque(uid, uidLength, bloques[i], *campos[i])) {
-      Serial.println(campos[i]->c_str());  // Imprime el campo leído
+      salida.println(campos[i]->c_str());  // Imprime el campo leído
     } else {
-      Serial.println("Error leyendo bloque " + String(bloques[i]));  // Error al leer un bloque
+      salida.println("Error leyendo bloque " + String(bloques[i]));  // Error al leer un bloque
     }
   }
 
   String path = uidString;
 
-  Serial.println("\nVerificando UID " + path + " en la ruta de Firebase...");  // Imprime la ruta para verificarla
-  Serial.println();
+  salida.println("\nVerificando UID " + path + " en la ruta de Firebase...");  // Imprime la ruta para verificarla
+  salida.println();
 
   // Verificar si el UID ya existe en Firebase
   if (Firebase.get(firebaseData, "/reactivos/" + path)) {
     if (firebaseData.dataType() == "null" || !firebaseData.dataAvailable()) {
       // Si no existe, crear un nuevo registro en Firebase
-      Serial.println("Etiqueta no encontrada. Registra la etiqueta antes de editarla\n");
+      salida.println("Etiqueta no encontrada. Registra la etiqueta antes de editarla\n");
     } else {
       // Si ya existe, actualizar los datos en Firebase
-      Serial.println("Etiqueta encontrada, enviando información a Firebase...");
-      Serial.println();
+      salida.println("Etiqueta encontrada, enviando información a Firebase...");
+      salida.println();
       enviarDatosAFirebase(reactivo, path);  // Actualiza los datos en Firebase
-      Serial.println("La información ha sido correctamente actualizada!\n.");
+      salida.println("La información ha sido correctamente actualizada!\n.");
     }
   } else {
-    Serial.println("Error al verificar la etiqueta en Firebase: " + firebaseData.errorReason());
+    salida.println("Error al verificar la etiqueta en Firebase: " + firebaseData.errorReason());
   }
 }
 
@@ -1030,9 +1324,9 @@ void ingresarDatosReactivo(uint8_t* uid, uint8_t uidLength) {
   for (int i = 0; i < 9; i++) {
     if (i == 2) continue;  // Saltar el campo "alta" (bloque 6)
     
-    Serial.print("Ingrese ");
-    Serial.print(campos[i]);
-    Serial.println(" (máx. 16 caracteres):");
+    salida.print("Ingrese ");
+    salida.print(campos[i]);
+    salida.println(" (máx. 16 caracteres):");
     
     while (!Serial.available()) delay(10);
     String dato = Serial.readStringUntil('\n');  // Lee la entrada del usuario
@@ -1045,9 +1339,9 @@ void ingresarDatosReactivo(uint8_t* uid, uint8_t uidLength) {
 
     // Verificar la longitud de los datos (no deben exceder 16 caracteres)
     if (dato.length() > 16) {
-      Serial.print("Error: El valor para ");
-      Serial.print(campos[i]);
-      Serial.println(" excede el límite de 16 caracteres. Ingrese nuevamente:");
+      salida.print("Error: El valor para ");
+      salida.print(campos[i]);
+      salida.println(" excede el límite de 16 caracteres. Ingrese nuevamente:");
       dato = Serial.readStringUntil('\n');
       dato.trim();
     }
@@ -1069,8 +1363,8 @@ bool leerBloque(uint8_t* uid, uint8_t uidLength, int block, String &destino) {
     if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, block, 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
       autenticado = true;
     } else {
-      Serial.print("Error de autenticación en el bloque ");
-      Serial.println(block);
+      salida.print("Error de autenticación en el bloque ");
+      salida.println(block);
       intentos++;
       delay(100); // Esperar antes de reintentar
     }
@@ -1078,7 +1372,7 @@ bool leerBloque(uint8_t* uid, uint8_t uidLength, int block, String &destino) {
   
   // Si la autenticación falla después de 3 intentos
   if (!autenticado) {
-    Serial.println("Autenticación fallida después de varios intentos.");
+    salida.println("Autenticación fallida después de varios intentos.");
     return false;
   }
   
@@ -1088,8 +1382,8 @@ bool leerBloque(uint8_t* uid, uint8_t uidLength, int block, String &destino) {
     destino.trim();  // Elimina espacios en blanco al inicio y final
     return true;
   } else {
-    Serial.print("Error al leer el bloque ");
-    Serial.println(block);
+    salida.print("Error al leer el bloque ");
+    salida.println(block);
     return false;
   }
 }
@@ -1104,8 +1398,8 @@ void escribirBloque(uint8_t* uid, uint8_t uidLength, int block, uint8_t* buffer,
     if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, block, 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
       autenticado = true;
     } else {
-      Serial.print("Error de autenticación en el bloque ");
-      Serial.println(block);
+      salida.print("Error de autenticación en el bloque ");
+      salida.println(block);
       intentos++;
       delay(100); // Esperar antes de reintentar
     }
@@ -1113,19 +1407,19 @@ void escribirBloque(uint8_t* uid, uint8_t uidLength, int block, uint8_t* buffer,
 
   // Si la autenticación falla después de 3 intentos
   if (!autenticado) {
-    Serial.println("Autenticación fallida después de varios intentos.");
+    salida.println("Autenticación fallida después de varios intentos.");
     return;
   }
   
   // Escribir datos en el bloque
   if (nfc.mifareclassic_WriteDataBlock(block, buffer)) {
     
-    Serial.print(titulo);
-    Serial.println(" editado exitosamente!");
-    Serial.println();
+    salida.print(titulo);
+    salida.println(" editado exitosamente!");
+    salida.println();
   } else {
-    Serial.print("Error al escribir el bloque ");
-    Serial.println(block);
+    salida.print("Error al escribir el bloque ");
+    salida.println(block);
   }
 }
 
@@ -1146,28 +1440,28 @@ void editarDatosReactivo(uint8_t* uid, uint8_t uidLength) {
 
   String path = uidString;
 
-  Serial.println("\nVerificando la ruta en Firebase: " + path);  // Imprime la ruta para verificarla
-  Serial.println();
+  salida.println("\nVerificando la ruta en Firebase: " + path);  // Imprime la ruta para verificarla
+  salida.println();
 
   // Verificar si el UID ya existe en Firebase
   if (Firebase.get(firebaseData, "/reactivos/" + path)) {
     if (firebaseData.dataType() == "null" || !firebaseData.dataAvailable()) {
       // Si no existe, crear un nuevo registro en Firebase
-      Serial.println("Etiqueta no encontrada. Registra la etiqueta antes de editarla\n");
+      salida.println("Etiqueta no encontrada. Registra la etiqueta antes de editarla\n");
     } else {
       // Si ya existe, actualizar los datos en Firebase
-      Serial.println("UID encontrado!\n");
+      salida.println("UID encontrado!\n");
     }
   } else { // Este else cierra el if principal
-    Serial.println("Error al verificar la etiqueta en Firebase: " + firebaseData.errorReason());
+    salida.println("Error al verificar la etiqueta en Firebase: " + firebaseData.errorReason());
   }
 
   String campos[] = {"producto", "numero", "alta", "marca", "codigo", "presentacion", "lote", "vencimiento", "baja"};
   int bloques[] = {4, 5, 6, 8, 9, 10, 12, 13, 14};
   
-  Serial.println("\n¿Qué campo(s) desea editar? (Ingrese los números separados por comas, o 0 para editar todos)");
+  salida.println("\n¿Qué campo(s) desea editar? (Ingrese los números separados por comas, o 0 para editar todos)");
   for (int i = 0; i < 9; i++) {
-    Serial.printf("%d. %s\n", i + 1, campos[i].c_str());
+    salida.printf("%d. %s\n", i + 1, campos[i].c_str());
   }
 
   while (!Serial.available()) {
@@ -1180,8 +1474,8 @@ void editarDatosReactivo(uint8_t* uid, uint8_t uidLength) {
   
   for (int i = 0; i < 9; i++) {
     if (editarTodos || input.indexOf(String(i + 1)) != -1) {
-      Serial.println();
-      Serial.printf("Ingrese nuevo valor para %s (máx. 16 caracteres):\n", campos[i].c_str());
+      salida.println();
+      salida.printf("Ingrese nuevo valor para %s (máx. 16 caracteres):\n", campos[i].c_str());
       while (!Serial.available()) {
         delay(100);
       }
@@ -1190,15 +1484,15 @@ void editarDatosReactivo(uint8_t* uid, uint8_t uidLength) {
 
       uint8_t buffer[16] = {0};
       nuevoValor.getBytes(buffer, 16);
-      Serial.println("Procesando cambios...");
+      salida.println("Procesando cambios...");
       escribirBloque(uid, uidLength, bloques[i], buffer, campos[i].c_str());
     }
   }
 
-  Serial.println("Leyendo nuevos datos...");
-  Serial.println();
+  salida.println("Leyendo nuevos datos...");
+  salida.println();
   leerDatosReactivoUID(uid, uidLength); 
-  Serial.println();
+  salida.println();
 }
 
 // Función para formatear uno o todos los bloques específicos de la tarjeta NFC
@@ -1207,9 +1501,9 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
   String campos[] = {"producto", "numero", "alta", "marca", "codigo", "presentacion", "lote", "vencimiento", "baja"};
   int bloques[] = {4, 5, 6, 8, 9, 10, 12, 13, 14};
 
-  Serial.println("\n¿Desea formatear un solo campo o todos los campos?");
-  Serial.println("1. Formatear un solo campo");
-  Serial.println("2. Formatear todos los campos");
+  salida.println("\n¿Desea formatear un solo campo o todos los campos?");
+  salida.println("1. Formatear un solo campo");
+  salida.println("2. Formatear todos los campos");
 
   // Esperar la selección del usuario
   while (!Serial.available()) {
@@ -1224,9 +1518,9 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
 
   if (opcion == 1) {
     // Formatear un solo campo
-    Serial.println("\n¿Qué campo desea formatear?");
+    salida.println("\n¿Qué campo desea formatear?");
     for (int i = 0; i < 9; i++) {
-      Serial.printf("%d. %s\n", i + 1, campos[i].c_str());
+      salida.printf("%d. %s\n", i + 1, campos[i].c_str());
     }
 
     // Esperar la selección del usuario
@@ -1235,7 +1529,7 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     }
     int seleccion = Serial.parseInt();
     if (seleccion < 1 || seleccion > 9) {
-      Serial.println("Selección inválida.");
+      salida.println("Selección inválida.");
       return;
     }
 
@@ -1248,9 +1542,9 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     int bloqueSeleccionado = bloques[seleccion - 1];
 
     // Confirmar con el usuario si realmente desea formatear el bloque
-    Serial.print("¿Está seguro que desea formatear el bloque para el campo '");
-    Serial.print(campos[seleccion - 1]);
-    Serial.println("'? (S/N):");
+    salida.print("¿Está seguro que desea formatear el bloque para el campo '");
+    salida.print(campos[seleccion - 1]);
+    salida.println("'? (S/N):");
 
     // Esperar confirmación del usuario
     while (!Serial.available()) {
@@ -1264,7 +1558,7 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     }
 
     if (confirmacion != 'S' && confirmacion != 's') {
-      Serial.println("Formateo cancelado.");
+      salida.println("Formateo cancelado.");
       return;
     }
 
@@ -1272,18 +1566,18 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     uint8_t emptyBlock[16] = {0};  // Bloque vacío para sobrescribir la tarjeta
     if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, bloqueSeleccionado, 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
       if (nfc.mifareclassic_WriteDataBlock(bloqueSeleccionado, emptyBlock)) {
-        Serial.print("El bloque del campo '");
-        Serial.print(campos[seleccion - 1]);
-        Serial.println("' ha sido formateado con éxito.");
+        salida.print("El bloque del campo '");
+        salida.print(campos[seleccion - 1]);
+        salida.println("' ha sido formateado con éxito.");
       } else {
-        Serial.println("Error al formatear el bloque.");
+        salida.println("Error al formatear el bloque.");
       }
     } else {
-      Serial.println("Error de autenticación en el bloque.");
+      salida.println("Error de autenticación en el bloque.");
     }
   } else if (opcion == 2) {
     // Formatear todos los campos
-    Serial.println("¿Está seguro que desea formatear todos los campos? (S/N):");
+    salida.println("¿Está seguro que desea formatear todos los campos? (S/N):");
     
     // Esperar confirmación del usuario
     while (!Serial.available()) {
@@ -1297,7 +1591,7 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     }
 
     if (confirmacion != 'S' && confirmacion != 's') {
-      Serial.println("Formateo cancelado.");
+      salida.println("Formateo cancelado.");
       return;
     }
 
@@ -1306,18 +1600,18 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
     for (int i = 0; i < 9; i++) {
       if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, bloques[i], 0, const_cast<uint8_t*>(DEFAULT_KEY))) {
         if (nfc.mifareclassic_WriteDataBlock(bloques[i], emptyBlock)) {
-          Serial.print("El bloque del campo '");
-          Serial.print(campos[i]);
-          Serial.println("' ha sido formateado con éxito.");
+          salida.print("El bloque del campo '");
+          salida.print(campos[i]);
+          salida.println("' ha sido formateado con éxito.");
         } else {
-          Serial.println("Error al formatear el bloque.");
+          salida.println("Error al formatear el bloque.");
         }
       } else {
-        Serial.println("Error de autenticación en el bloque.");
+        salida.println("Error de autenticación en el bloque.");
       }
     }
   } else {
-    Serial.println("Opción inválida.");
+    salida.println("Opción inválida.");
   }
 }
 
@@ -1325,27 +1619,27 @@ void formatCard(uint8_t* uid, uint8_t uidLength) {
 
 // Función para imprimir una matriz de los datos de la etiqueta NFC
 void printSectorMatrix(uint8_t* uid, uint8_t uidLength) {
-  Serial.println("\nMatriz de datos de la etiqueta MIFARE Classic 1K:");
+  salida.println("\nMatriz de datos de la etiqueta MIFARE Classic 1K:");
   for (int sector = 0; sector < 16; sector++) {
-    Serial.print("Sector ");
-    Serial.println(sector);
+    salida.print("Sector ");
+    salida.println(sector);
     for (int block = 0; block < 4; block++) {
       uint8_t blockAddress = sector * 4 + block;
       uint8_t data[16];  // Buffer para leer los datos del bloque
       if (nfc.mifareclassic_AuthenticateBlock(uid, uidLength, blockAddress, 0, const_cast<uint8_t*>(DEFAULT_KEY)) &&
           nfc.mifareclassic_ReadDataBlock(blockAddress, data)) {
-        Serial.print("  Bloque ");
-        Serial.print(blockAddress);
-        Serial.print(": ");
+        salida.print("  Bloque ");
+        salida.print(blockAddress);
+        salida.print(": ");
         for (int i = 0; i < 16; i++) {
-          if (data[i] < 0x10) Serial.print("0");
-          Serial.print(data[i], HEX);  // Imprime los datos en formato hexadecimal
-          Serial.print(" ");
+          if (data[i] < 0x10) salida.print("0");
+          salida.print(data[i], HEX);  // Imprime los datos en formato hexadecimal
+          salida.print(" ");
         }
-        Serial.println();
+        salida.println();
       } else {
-        Serial.print("  Error en el bloque ");
-        Serial.println(blockAddress);
+        salida.print("  Error en el bloque ");
+        salida.println(blockAddress);
         break;
       }
     }
@@ -1354,13 +1648,13 @@ void printSectorMatrix(uint8_t* uid, uint8_t uidLength) {
 
 // Función para mostrar información básica de la etiqueta NFC
 void dumpInfo(uint8_t* uid, uint8_t uidLength) {
-  Serial.println("Información de la etiqueta MIFARE Classic:");
-  Serial.print("  UID: ");
+  salida.println("Información de la etiqueta MIFARE Classic:");
+  salida.print("  UID: ");
   for (uint8_t i = 0; i < uidLength; i++) {
-    if (uid[i] < 0x10) Serial.print("0");
-    Serial.print(uid[i], HEX);  // Imprime el UID en formato hexadecimal
-    Serial.print(" ");
+    if (uid[i] < 0x10) salida.print("0");
+    salida.print(uid[i], HEX);  // Imprime el UID en formato hexadecimal
+    salida.print(" ");
   }
-  Serial.println("\n  Tipo: MIFARE Classic 1K");
-  Serial.println("  Capacidad: 1024 bytes, 16 sectores de 4 bloques de 16 bytes cada uno");
+  salida.println("\n  Tipo: MIFARE Classic 1K");
+  salida.println("  Capacidad: 1024 bytes, 16 sectores de 4 bloques de 16 bytes cada uno");
 }
\ No newline at end of file